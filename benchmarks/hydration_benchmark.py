@@ -0,0 +1,83 @@
+# benchmarks/hydration_benchmark.py
+"""
+Compare validated and trusted hydration of stored orders.
+
+Orders read back from the state store are dictionaries in their JSON form.
+Order.create_from_dict() runs full pydantic validation, including the
+OrderItem validators of every line; Order.create_from_stored(), which the
+entity stores use, converts the stored values with precomputed converters
+and builds the models with model_construct(). The benchmark hydrates
+orders with increasing numbers of lines both ways, checks that the
+results agree, and reports the time per order.
+
+Usage:
+    python benchmarks/hydration_benchmark.py --lines 100 250 500 --repeat 200
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.p2p import Order, OrderItem
+
+def stored_order(lines: int) -> dict:
+    """Build the stored dictionary form of an order with the given number of lines"""
+    order = Order(
+        document_number="PO000001",
+        description="Benchmark order",
+        requester="Benchmark",
+        vendor="Acme",
+        items=[
+            OrderItem(
+                item_number=i + 1,
+                material_number=f"MAT{i:05d}",
+                description=f"Line {i + 1}",
+                quantity=10 + i % 7,
+                unit="EA",
+                price=1.5 + i,
+                delivery_date=date(2024, 1, 1) + timedelta(days=i % 30),
+                received_quantity=i % 3
+            )
+            for i in range(lines)
+        ]
+    )
+    return order.model_dump(mode="json")
+
+def time_per_call(hydrate, data: dict, repeat: int) -> float:
+    """Return the mean seconds per hydration of fresh copies of data"""
+    # create_from_dict() modifies its argument, so each call gets a copy;
+    # the copies are made outside the timed loop
+    copies = [copy.deepcopy(data) for _ in range(repeat)]
+    started = time.perf_counter()
+    for item in copies:
+        hydrate(item)
+    return (time.perf_counter() - started) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[100, 250, 500], help="lines per order")
+    parser.add_argument("--repeat", type=int, default=200, help="hydrations per measurement")
+    args = parser.parse_args()
+
+    print(f"{'lines':>6}  {'validated ms':>12}  {'trusted ms':>10}  speedup")
+    for lines in args.lines:
+        data = stored_order(lines)
+
+        # Both paths must produce the same order (updated_at aside, which
+        # the validated path resets to the current time)
+        validated = Order.create_from_dict(copy.deepcopy(data)).model_dump(exclude={"updated_at"})
+        trusted = Order.create_from_stored(copy.deepcopy(data)).model_dump(exclude={"updated_at"})
+        assert validated == trusted, "trusted hydration differs from validated hydration"
+
+        validated_time = time_per_call(Order.create_from_dict, data, args.repeat)
+        trusted_time = time_per_call(Order.create_from_stored, data, args.repeat)
+        print(f"{lines:>6}  {validated_time * 1000:>12.3f}  {trusted_time * 1000:>10.3f}  "
+              f"{validated_time / trusted_time:6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/state_backend_benchmark.py
+"""
+Compare restart time and memory of the state manager backends.
+
+Creates N orders through the P2P data layer, stores them with each
+backend (JSON snapshot, binary snapshot loaded eagerly and lazily,
+SQLite), then measures for a fresh instance:
+- startup: opening the store and reading one order
+- full load: opening the store and hydrating every order
+
+Usage:
+    python benchmarks/state_backend_benchmark.py --count 1000000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.state_manager import StateManager
+from services.sqlite_state_manager import SQLiteStateManager
+from models.p2p import Order, OrderItem, P2PDataLayer
+
+def make_order(i: int) -> Order:
+    """Build a small purchase order"""
+    return Order(
+        id=f"PO{i:08d}",
+        document_number=f"PO{i:08d}",
+        description=f"Benchmark order {i}",
+        requester="Benchmark",
+        vendor=f"Vendor {i % 50}",
+        items=[
+            OrderItem(item_number=n, material_number=f"MAT{n:05d}", description=f"Item {n}",
+                      quantity=n, unit="EA", price=9.5)
+            for n in range(1, 4)
+        ]
+    )
+
+def populate(temp_dir: str, count: int) -> dict:
+    """Write the same orders with every backend"""
+    paths = {
+        "json": os.path.join(temp_dir, "state.json"),
+        "binary": os.path.join(temp_dir, "state.bin"),
+        "sqlite": os.path.join(temp_dir, "state.db"),
+    }
+
+    manager = StateManager()
+    data_layer = P2PDataLayer(manager)
+    for i in range(count):
+        order = make_order(i)
+        data_layer.orders.save(order.document_number, order)
+
+    for snapshot_format in ("json", "binary"):
+        snapshot_manager = StateManager(persistence_file=paths[snapshot_format], snapshot_format=snapshot_format)
+        snapshot_manager._state = manager._state
+        snapshot_manager.compact()
+
+    sqlite_manager = SQLiteStateManager(paths["sqlite"])
+    with sqlite_manager.transaction():
+        for key in manager.get_keys("orders/"):
+            sqlite_manager.set(key, manager.get(key))
+    sqlite_manager.close()
+
+    return paths
+
+def measure(label: str, factory, count: int) -> None:
+    """Measure startup and full load for a backend"""
+    key = f"PO{count // 2:08d}"
+
+    started = time.perf_counter()
+    manager = factory()
+    P2PDataLayer(manager).get_order(key)
+    startup = time.perf_counter() - started
+    manager.close()
+
+    # Measured in a separate pass because tracing slows allocation down
+    tracemalloc.start()
+    manager = factory()
+    P2PDataLayer(manager).get_order(key)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    manager.close()
+
+    started = time.perf_counter()
+    manager = factory()
+    orders = P2PDataLayer(manager).list_orders()
+    full_load = time.perf_counter() - started
+    assert len(orders) == count
+    manager.close()
+
+    print(f"{label:<8} startup: {startup * 1000:10.1f} ms  peak memory: {peak / 1024 / 1024:8.1f} MiB"
+          f"  full load: {full_load * 1000:10.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000, help="number of orders")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        print(f"Writing {args.count} orders...")
+        paths = populate(temp_dir, args.count)
+
+        measure("json", lambda: StateManager(persistence_file=paths["json"]), args.count)
+        measure("binary", lambda: StateManager(persistence_file=paths["binary"]), args.count)
+        measure("lazy", lambda: StateManager(persistence_file=paths["binary"], lazy_load=True), args.count)
+        measure("sqlite", lambda: SQLiteStateManager(paths["sqlite"]), args.count)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/state_concurrency_benchmark.py
+"""
+Stress the state manager from several threads.
+
+Each thread runs a mix of reads (get and key listings) and read-modify-write
+updates of random counters, the way request handlers on FastAPI's worker
+threads do. The update function waits briefly (--work-us) to stand in for
+work that releases the GIL while the key is locked, such as validation or
+I/O. The benchmark reports throughput for a single global write lock
+(--stripes 1 equivalent) and for striped per-key locks, and checks that no
+increment was lost.
+
+Usage:
+    python benchmarks/state_concurrency_benchmark.py --ops 2000 --keys 1000
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.state_manager import StateManager
+
+def run(stripes: int, threads: int, ops: int, keys: int, read_ratio: float, work: float) -> float:
+    """
+    Run the workload and return operations per second.
+
+    Args:
+        stripes: Number of per-key lock stripes
+        threads: Number of worker threads
+        ops: Operations per thread
+        keys: Number of distinct counters
+        read_ratio: Fraction of operations that are reads
+        work: Seconds spent inside each update while the key is locked
+    """
+    manager = StateManager(lock_stripes=stripes)
+    for i in range(keys):
+        manager.set(f"counters/{i}", 0)
+
+    def increment(value):
+        if work:
+            time.sleep(work)
+        return value + 1
+
+    updates = [0] * threads
+    start = threading.Barrier(threads + 1)
+
+    def worker(n):
+        rng = random.Random(n)
+        start.wait()
+        for i in range(ops):
+            key = f"counters/{rng.randrange(keys)}"
+            if rng.random() < read_ratio:
+                if i % 100 == 0:
+                    manager.get_keys("counters/")
+                else:
+                    manager.get(key)
+            else:
+                manager.update(key, increment, 0)
+                updates[n] += 1
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(manager.get(key) for key in manager.get_keys("counters/"))
+    assert total == sum(updates), f"lost {sum(updates) - total} updates"
+    return threads * ops / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=2000, help="operations per thread")
+    parser.add_argument("--keys", type=int, default=1000, help="number of distinct keys")
+    parser.add_argument("--read-ratio", type=float, default=0.8, help="fraction of reads")
+    parser.add_argument("--work-us", type=float, default=100, help="microseconds of work per update")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    print(f"{'threads':>7}  {'global lock ops/s':>18}  {'striped ops/s':>14}  speedup")
+    for threads in args.threads:
+        global_lock = run(1, threads, args.ops, args.keys, args.read_ratio, args.work_us / 1e6)
+        striped = run(64, threads, args.ops, args.keys, args.read_ratio, args.work_us / 1e6)
+        print(f"{threads:>7}  {global_lock:>18,.0f}  {striped:>14,.0f}  {striped / global_lock:6.1f}x")
+
+if __name__ == "__main__":
+    main()
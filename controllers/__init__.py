@@ -20,6 +20,9 @@ logger = logging.getLogger("controllers")
 # Type variable for Pydantic models
 T = TypeVar('T', bound=BaseModel)
 
+# Page size of cursor-paginated API lists when no limit is given
+DEFAULT_PAGE_LIMIT = 50
+
 class BaseController:
     """
     Base controller class with common methods for request handling.
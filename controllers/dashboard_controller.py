@@ -92,12 +92,10 @@ def get_p2p_statistics() -> Dict[str, Any]:
         pending_order_value = sum(o.total_value for o in orders 
                                  if o.status.value == "APPROVED")
         
-        # Calculate recent activity (last 7 days)
+        # Calculate recent activity (last 7 days) from the creation time index
         one_week_ago = datetime.now() - timedelta(days=7)
-        recent_requisitions = len([r for r in requisitions 
-                                  if r.created_at > one_week_ago])
-        recent_orders = len([o for o in orders
-                           if o.created_at > one_week_ago])
+        recent_requisitions = p2p_service.count_requisitions(date_from=one_week_ago)
+        recent_orders = p2p_service.count_orders(date_from=one_week_ago)
         
         return {
             "total_requisitions": len(requisitions),
@@ -206,22 +204,9 @@ def get_recent_activities() -> List[Dict[str, Any]]:
             from services import get_p2p_service
             p2p_service = get_p2p_service()
             
-            # Get recent requisitions and orders
-            requisitions = p2p_service.list_requisitions()
-            orders = p2p_service.list_orders()
-            
-            # Sort by created_at (newest first)
-            recent_requisitions = sorted(
-                requisitions, 
-                key=lambda r: r.created_at, 
-                reverse=True
-            )[:3]
-            
-            recent_orders = sorted(
-                orders, 
-                key=lambda o: o.created_at, 
-                reverse=True
-            )[:3]
+            # Get the newest requisitions and orders
+            recent_requisitions = p2p_service.get_recent_requisitions(limit=3)
+            recent_orders = p2p_service.get_recent_orders(limit=3)
             
             # Add as activities
             for req in recent_requisitions:
@@ -0,0 +1,180 @@
+# controllers/export_api_controller.py
+"""
+API controller for streaming bulk exports.
+
+This module handles:
+- Exporting materials (GET /api/v1/export/materials)
+- Exporting requisitions (GET /api/v1/export/requisitions)
+- Exporting orders (GET /api/v1/export/orders)
+
+Exports are written from the service iterators as the response body is
+sent, one entity at a time, so memory use doesn't grow with the size of
+the export. format=ndjson (the default) writes one entity per line, with
+documents nested as in the API; format=csv writes one row per material,
+and one row per item for requisitions and orders, in the layout the
+P2P import reads (see services.p2p_service_csv).
+"""
+
+from datetime import date
+from fastapi import Request
+from typing import Optional
+from pydantic import BaseModel, Field
+import logging
+
+from controllers import BaseController
+from controllers.material_common import format_material_for_response
+from controllers.p2p_common import date_range_bounds, log_controller_error
+from models.material import MaterialStatus, MaterialType
+from models.p2p import DocumentStatus
+from services import get_material_service, get_p2p_service, get_monitor_service
+from services.p2p_service_csv import document_rows, export_columns
+from utils.error_utils import NotFoundError
+from utils.stream_utils import streaming_csv_response, streaming_list_response
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Exportable entities
+EXPORT_ENTITIES = ("materials", "requisitions", "orders")
+
+# Columns of a material CSV export, in the order of format_material_for_response
+MATERIAL_EXPORT_COLUMNS = [
+    "material_number", "name", "description", "type", "status", "base_unit",
+    "weight", "volume", "dimensions", "created_at", "updated_at"
+]
+
+class ExportParams(BaseModel):
+    """Parameters shared by all exports"""
+    format: str = Field("ndjson", pattern="^(ndjson|csv)$")
+    search: Optional[str] = None
+    sort: Optional[str] = None
+    order: Optional[str] = Field(None, pattern="^(asc|desc)$")
+
+class MaterialExportParams(ExportParams):
+    """Parameters of a material export"""
+    type: Optional[MaterialType] = None
+    status: Optional[MaterialStatus] = None
+
+class DocumentExportParams(ExportParams):
+    """Parameters shared by document exports"""
+    status: Optional[DocumentStatus] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+class RequisitionExportParams(DocumentExportParams):
+    """Parameters of a requisition export"""
+    requester: Optional[str] = None
+    department: Optional[str] = None
+
+class OrderExportParams(DocumentExportParams):
+    """Parameters of an order export"""
+    vendor: Optional[str] = None
+    requisition_reference: Optional[str] = None
+
+async def api_export(
+    request: Request,
+    entity: str,
+    material_service=None,
+    p2p_service=None,
+    monitor_service=None
+):
+    """
+    Stream an export of materials, requisitions or orders (API endpoint).
+
+    Takes the filters and sort order of the matching list endpoint (search,
+    status, sort, order, plus type for materials, date_from, date_to and
+    the document fields for documents) and format=ndjson or format=csv.
+    Invalid parameters are reported before the export starts.
+
+    Args:
+        request: FastAPI request
+        entity: "materials", "requisitions" or "orders"
+        material_service: Injected material service
+        p2p_service: Injected P2P service
+        monitor_service: Injected monitor service
+
+    Returns:
+        Streaming response with the export
+    """
+    # Get services if not provided (for testing)
+    if material_service is None:
+        material_service = get_material_service()
+    if p2p_service is None:
+        p2p_service = get_p2p_service()
+    if monitor_service is None:
+        monitor_service = get_monitor_service()
+
+    try:
+        if entity == "materials":
+            params = await BaseController.parse_query_params(request, MaterialExportParams)
+            materials = material_service.iter_materials(
+                status=params.status,
+                type=params.type,
+                search_term=params.search,
+                sort=params.sort,
+                descending=params.order == "desc"
+            )
+            records = (format_material_for_response(material) for material in materials)
+            columns = MATERIAL_EXPORT_COLUMNS
+        elif entity == "requisitions":
+            params = await BaseController.parse_query_params(request, RequisitionExportParams)
+            date_from, date_to = date_range_bounds(params.date_from, params.date_to)
+            documents = p2p_service.iter_requisitions(
+                status=params.status,
+                requester=params.requester,
+                department=params.department,
+                search_term=params.search,
+                date_from=date_from,
+                date_to=date_to,
+                sort=params.sort,
+                descending=params.order == "desc"
+            )
+            records, columns = _document_records(entity, documents, params.format)
+        elif entity == "orders":
+            params = await BaseController.parse_query_params(request, OrderExportParams)
+            date_from, date_to = date_range_bounds(params.date_from, params.date_to)
+            documents = p2p_service.iter_orders(
+                status=params.status,
+                vendor=params.vendor,
+                requisition_reference=params.requisition_reference,
+                search_term=params.search,
+                date_from=date_from,
+                date_to=date_to,
+                sort=params.sort,
+                descending=params.order == "desc"
+            )
+            records, columns = _document_records(entity, documents, params.format)
+        else:
+            raise NotFoundError(
+                message=f"Unknown export: {entity}",
+                details={"entity": entity, "allowed": list(EXPORT_ENTITIES)}
+            )
+
+        headers = {"Content-Disposition": f'attachment; filename="{entity}.{params.format}"'}
+        if params.format == "csv":
+            return streaming_csv_response(records, columns, headers=headers)
+        return streaming_list_response(records, "ndjson", headers=headers)
+    except Exception as e:
+        log_controller_error(monitor_service, e, request, "api_export")
+        return BaseController.handle_api_error(e)
+
+def _document_records(kind, documents, export_format):
+    """
+    Get the records of a document export and the CSV columns.
+
+    Args:
+        kind: "requisitions" or "orders"
+        documents: Iterator over the documents
+        export_format: "ndjson" or "csv"
+
+    Returns:
+        (iterator over the records, CSV columns): whole documents for
+        NDJSON, one row per item for CSV
+    """
+    if export_format == "csv":
+        rows = (
+            row for document in documents
+            for row in document_rows(kind, document.model_dump(mode="json"))
+        )
+        return rows, export_columns(kind)
+    return (document.model_dump(mode="json") for document in documents), None
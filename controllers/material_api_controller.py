@@ -6,6 +6,7 @@ This module handles all REST API routes for material management including:
 - Listing materials (GET /api/v1/materials)
 - Getting material details (GET /api/v1/materials/{material_id})
 - Creating materials (POST /api/v1/materials)
+- Creating or updating materials in bulk (POST /api/v1/materials/bulk)
 - Updating materials (PUT /api/v1/materials/{material_id})
 - Deprecating materials (POST /api/v1/materials/{material_id}/deprecate)
 """
@@ -16,9 +17,9 @@ from typing import Dict, Any, Optional, List
 import logging
 
 from models.material import (
-    Material, MaterialCreate, MaterialUpdate
+    Material, MaterialCreate, MaterialUpdate, MaterialBulkCreate
 )
-from controllers import BaseController
+from controllers import BaseController, DEFAULT_PAGE_LIMIT
 from controllers.material_common import (
     get_material_service_dependency,
     get_monitor_service_dependency,
@@ -30,7 +31,8 @@ from controllers.material_common import (
 from services import get_material_service, get_monitor_service
 from services.material_service import MaterialService
 from services.monitor_service import MonitorService
-from utils.error_utils import NotFoundError, ValidationError, BadRequestError
+from utils.error_utils import NotFoundError, ValidationError, BadRequestError, count_results
+from utils.stream_utils import streaming_list_response, window
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -150,6 +152,13 @@ async def api_list_materials(
     """
     List materials with optional filtering (API endpoint).
     
+    sort picks the field to order by (material_number by default,
+    created_at or updated_at) and order=desc reverses it; both are served
+    from sorted indexes. Passing limit or cursor (without offset) returns
+    one page, with the next page's cursor in next_cursor. stream=ndjson
+    or stream=json streams the matching materials as NDJSON lines or as
+    a bare JSON array instead, one material at a time.
+    
     Args:
         request: FastAPI request
         material_service: Injected material service
@@ -173,18 +182,52 @@ async def api_list_materials(
         # Parse query parameters
         params = await BaseController.parse_query_params(request, MaterialFilterParams)
         
-        # Get materials with filtering - only pass parameters supported by the service
-        materials = material_service.list_materials(
-            status=params.status,
-            type=params.type,
-            search_term=params.search
-        )
+        if params.stream:
+            # Materials are loaded and formatted one at a time as the body
+            # is written, so no list of the listing is ever built
+            materials = material_service.iter_materials(
+                status=params.status,
+                type=params.type,
+                search_term=params.search,
+                sort=params.sort,
+                descending=params.order == "desc",
+                cursor=params.cursor
+            )
+            return streaming_list_response(
+                (format_material_for_response(m) for m in window(materials, params.offset, params.limit)),
+                params.stream
+            )
         
-        # Apply pagination in memory if needed
-        if params.limit is not None or params.offset is not None:
-            offset = params.offset or 0
-            limit = params.limit or len(materials)
-            materials = materials[offset:offset + limit]
+        next_cursor = None
+        if params.offset is None and (params.limit is not None or params.cursor is not None):
+            # Keyset pagination: the page is read from the material number
+            # index starting at the cursor, without loading earlier pages
+            page = material_service.list_materials_page(
+                limit=params.limit or DEFAULT_PAGE_LIMIT,
+                cursor=params.cursor,
+                status=params.status,
+                type=params.type,
+                search_term=params.search,
+                sort=params.sort,
+                descending=params.order == "desc"
+            )
+            materials, next_cursor = page.items, page.next_cursor
+        else:
+            # Get materials with filtering - only pass parameters supported by the service
+            materials = material_service.list_materials(
+                status=params.status,
+                type=params.type,
+                search_term=params.search,
+                sort=params.sort,
+                descending=params.order == "desc"
+            )
+            
+            # Offset pagination is kept for existing clients; it is applied
+            # in memory, so deep pages cost the whole list
+            if params.limit is not None or params.offset is not None:
+                offset = params.offset or 0
+                limit = params.limit or len(materials)
+                materials = materials[offset:offset + limit]
         
         # Format the response
         response_data = format_materials_list(materials, {
@@ -192,8 +235,11 @@ async def api_list_materials(
             "type": params.type.value if params.type else None,
             "status": params.status.value if params.status else None,
             "limit": params.limit,
-            "offset": params.offset
-        })
+            "offset": params.offset,
+            "cursor": params.cursor,
+            "sort": params.sort,
+            "order": params.order
+        }, next_cursor=next_cursor)
         
         return JSONResponse(content=response_data)
     except Exception as e:
@@ -297,6 +343,60 @@ async def api_create_material(
         log_controller_error(monitor_service, e, request, "api_create_material")
         return BaseController.handle_api_error(e)
 
+async def api_bulk_create_materials(
+    request: Request,
+    material_service=None,
+    monitor_service=None
+):
+    """
+    Create or update materials in bulk (API endpoint).
+    
+    The body holds a materials list of material creation objects, an
+    optional upsert flag to update existing materials instead of reporting
+    them as conflicts, and an optional atomic flag to write nothing if any
+    item fails. Valid items are written in one state transaction; the
+    response reports each item's outcome, with status 201 if every item
+    was written and 207 otherwise.
+    
+    Args:
+        request: FastAPI request
+        material_service: Injected material service
+        monitor_service: Injected monitor service
+        
+    Returns:
+        JSON response with the result of each item and the totals
+    """
+    # Get services if not provided (for testing)
+    if material_service is None or (not isinstance(material_service, MaterialService) and hasattr(material_service, 'dependency')):
+        material_service = get_material_service_dependency()
+        if not isinstance(material_service, MaterialService) and hasattr(material_service, 'dependency'):
+            material_service = get_material_service()
+            
+    if monitor_service is None or (not isinstance(monitor_service, MonitorService) and hasattr(monitor_service, 'dependency')):
+        monitor_service = get_monitor_service_dependency()
+        if not isinstance(monitor_service, MonitorService) and hasattr(monitor_service, 'dependency'):
+            monitor_service = get_monitor_service()
+        
+    try:
+        # Parse request body using the helper method
+        bulk_data = await BaseController.parse_json_body(request, MaterialBulkCreate)
+        
+        results = material_service.create_materials(
+            bulk_data.materials, upsert=bulk_data.upsert, atomic=bulk_data.atomic
+        )
+        
+        totals = count_results(results, ("created", "updated", "failed", "skipped"))
+        written = totals["created"] + totals["updated"]
+        
+        return BaseController.create_success_response(
+            data={"results": results, "totals": totals},
+            message=f"{written} of {len(results)} materials written",
+            status_code=201 if written == len(results) else 207  # Created / Multi-Status
+        )
+    except Exception as e:
+        log_controller_error(monitor_service, e, request, "api_bulk_create_materials")
+        return BaseController.handle_api_error(e)
+
 async def api_update_material(
     request: Request,
     material_id: str,
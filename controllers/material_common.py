@@ -59,13 +59,15 @@ def format_material_for_response(material: Material) -> Dict[str, Any]:
         "updated_at": material.updated_at.isoformat()
     }
 
-def format_materials_list(materials: List[Material], filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+def format_materials_list(materials: List[Material], filters: Optional[Dict[str, Any]] = None,
+                          next_cursor: Optional[str] = None) -> Dict[str, Any]:
     """
     Format a list of materials for response.
     
     Args:
         materials: List of material objects
         filters: Optional filter criteria used
+        next_cursor: Cursor of the next page when the list is paginated
         
     Returns:
         Formatted materials list dictionary
@@ -73,7 +75,8 @@ def format_materials_list(materials: List[Material], filters: Optional[Dict[str,
     return {
         "materials": [format_material_for_response(m) for m in materials],
         "count": len(materials),
-        "filters": filters or {}
+        "filters": filters or {},
+        "next_cursor": next_cursor
     }
 
 def get_material_type_options() -> List[str]:
@@ -140,6 +143,10 @@ class MaterialFilterParams(BaseModel):
     status: Optional[MaterialStatus] = None
     limit: Optional[int] = Field(None, ge=1, le=100)
     offset: Optional[int] = Field(None, ge=0)
+    cursor: Optional[str] = None
+    sort: Optional[str] = None
+    order: Optional[str] = Field(None, pattern="^(asc|desc)$")
+    stream: Optional[str] = Field(None, pattern="^(ndjson|json)$")
 
 # Add imports for BaseModel and Field
 from pydantic import BaseModel, Field
\ No newline at end of file
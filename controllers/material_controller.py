@@ -26,6 +26,7 @@ from controllers.material_api_controller import (
     api_list_materials,
     api_get_material,
     api_create_material,
+    api_bulk_create_materials,
     api_update_material,
     api_deprecate_material
 )
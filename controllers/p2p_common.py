@@ -8,8 +8,8 @@ the P2P controllers (both UI and API).
 """
 
 import logging
-from typing import Dict, Any, Optional, List, Union
-from datetime import datetime, date
+from typing import Dict, Any, Optional, List, Tuple, Union
+from datetime import datetime, date, time
 from fastapi import Request, Depends
 from pydantic import BaseModel, Field
 
@@ -113,6 +113,10 @@ class DocumentFilterParams(BaseModel):
     date_to: Optional[date] = None
     limit: Optional[int] = Field(None, ge=1, le=100)
     offset: Optional[int] = Field(None, ge=0)
+    cursor: Optional[str] = None
+    sort: Optional[str] = None
+    order: Optional[str] = Field(None, pattern="^(asc|desc)$")
+    stream: Optional[str] = Field(None, pattern="^(ndjson|json)$")
 
 class RequisitionFilterParams(DocumentFilterParams):
     """Parameters for requisition search and filtering"""
@@ -125,6 +129,22 @@ class OrderFilterParams(DocumentFilterParams):
     vendor: Optional[str] = None
     requisition_reference: Optional[str] = None
 
+def date_range_bounds(date_from: Optional[date], date_to: Optional[date]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Convert a date filter to creation time bounds covering whole days.
+    
+    Args:
+        date_from: Optional first day of the range
+        date_to: Optional last day of the range
+        
+    Returns:
+        Start of the first day and end of the last day, None where not given
+    """
+    return (
+        datetime.combine(date_from, time.min) if date_from else None,
+        datetime.combine(date_to, time.max) if date_to else None
+    )
+
 # Common utility functions for formatting timestamps
 def format_timestamp(dt: datetime) -> str:
     """Format a datetime for display in the UI"""
@@ -39,7 +39,8 @@ from controllers.p2p_requisition_api_controller import (
     api_update_requisition,
     api_submit_requisition,
     api_approve_requisition,
-    api_reject_requisition
+    api_reject_requisition,
+    api_batch_requisitions
 )
 
 # Re-export API controller functions for orders
@@ -53,9 +54,13 @@ from controllers.p2p_order_api_controller import (
     api_approve_order,
     api_receive_order,
     api_complete_order,
-    api_cancel_order
+    api_cancel_order,
+    api_batch_orders
 )
 
+# Re-export API controller functions for imports
+from controllers.p2p_import_api_controller import api_import_documents
+
 # Import needed for FastAPI parameter type hints
 from fastapi import Request, Response, HTTPException, status
 import logging
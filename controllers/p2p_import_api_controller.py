@@ -0,0 +1,114 @@
+# controllers/p2p_import_api_controller.py
+"""
+API controller for streaming P2P document imports.
+
+This module handles:
+- Importing requisitions (POST /api/v1/p2p/import/requisitions)
+- Importing orders (POST /api/v1/p2p/import/orders)
+
+The request body is read as a stream and imported in chunks while it
+arrives, so bodies of any size are imported in bounded memory. Parsing,
+validation and writes run in the threadpool so that a large import
+doesn't block the event loop.
+"""
+
+from fastapi import Request
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from pydantic import BaseModel, Field
+import logging
+
+from controllers import BaseController
+from controllers.p2p_common import log_controller_error
+from services import get_p2p_service, get_monitor_service
+from services.p2p_service_import import IMPORT_CHUNK_SIZE
+from utils.error_utils import ValidationError
+from utils.import_utils import aiter_lines
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Largest chunk an API import may ask for
+MAX_IMPORT_CHUNK_SIZE = 5000
+
+class ImportParams(BaseModel):
+    """Query parameters of an import"""
+    format: Optional[str] = Field(None, pattern="^(ndjson|csv)$")
+    chunk_size: int = Field(IMPORT_CHUNK_SIZE, ge=1, le=MAX_IMPORT_CHUNK_SIZE)
+
+def _feed_lines(importer, lines: List[str]) -> None:
+    """Feed a batch of body lines to an importer"""
+    for line in lines:
+        importer.feed(line)
+
+async def api_import_documents(
+    request: Request,
+    kind: str,
+    p2p_service=None,
+    monitor_service=None
+):
+    """
+    Import requisitions or orders from an NDJSON or CSV body (API endpoint).
+
+    The format is taken from the format query parameter, or else from the
+    Content-Type (text/csv for CSV, NDJSON otherwise). NDJSON bodies hold
+    one document per line; CSV bodies have a header row and one row per
+    item, see services.p2p_service_csv. Documents keep the status and
+    timestamps they are imported with, if given; an invalid status or
+    timestamp fails the document. Documents are validated and written
+    chunk_size at a time; the response reports the counts and the first
+    failures, with status 201 if every document was imported and 207
+    otherwise.
+
+    The body is read asynchronously and handed to the importer
+    chunk_size lines at a time in the threadpool. An import is not atomic
+    as a whole: if writing a chunk fails, the import stops with a 400
+    bad_request response whose message and details report the documents
+    and chunks imported before it, which stay imported.
+
+    Args:
+        request: FastAPI request
+        kind: "requisitions" or "orders"
+        p2p_service: Injected P2P service
+        monitor_service: Injected monitor service
+
+    Returns:
+        JSON response with the import report
+    """
+    # Get services if not provided (for testing)
+    if p2p_service is None:
+        p2p_service = get_p2p_service()
+    if monitor_service is None:
+        monitor_service = get_monitor_service()
+
+    try:
+        params = await BaseController.parse_query_params(request, ImportParams)
+        import_format = params.format
+        if import_format is None:
+            content_type = request.headers.get("content-type", "")
+            import_format = "csv" if content_type.startswith("text/csv") else "ndjson"
+
+        importer = p2p_service.create_importer(kind, import_format, chunk_size=params.chunk_size)
+        lines = []
+        async for line in aiter_lines(request.stream()):
+            lines.append(line)
+            if len(lines) >= params.chunk_size:
+                await run_in_threadpool(_feed_lines, importer, lines)
+                lines = []
+        await run_in_threadpool(_feed_lines, importer, lines)
+        report = await run_in_threadpool(importer.finish)
+
+        if report.documents == 0:
+            raise ValidationError(
+                message="Import body contains no documents",
+                details={"kind": kind, "format": import_format}
+            )
+
+        return BaseController.create_success_response(
+            data=report.to_dict(),
+            message=f"{report.imported} of {report.documents} {kind} imported",
+            status_code=201 if report.failed == 0 else 207  # Created / Multi-Status
+        )
+    except Exception as e:
+        log_controller_error(monitor_service, e, request, "api_import_documents")
+        return BaseController.handle_api_error(e)
@@ -8,6 +8,7 @@ This module handles all REST API routes for order management including:
 - Creating orders (POST /api/v1/p2p/orders)
 - Updating orders (PUT /api/v1/p2p/orders/{document_number})
 - Workflow state transitions (submit, approve, receive, complete)
+- Batch workflow transitions (POST /api/v1/p2p/orders/batch/{action})
 """
 
 from fastapi import Request, Depends, Response, HTTPException, status
@@ -18,14 +19,15 @@ import json
 
 from models.p2p import (
     Order, OrderCreate, OrderUpdate, 
-    DocumentStatus
+    DocumentStatus, DocumentBatchTransition
 )
-from controllers import BaseController
+from controllers import BaseController, DEFAULT_PAGE_LIMIT
 from controllers.p2p_common import (
     get_p2p_service_dependency,
     get_monitor_service_dependency,
     get_material_service_dependency,
-    OrderFilterParams
+    OrderFilterParams,
+    date_range_bounds
 )
 from controllers.p2p_order_common import (
     format_order_for_response,
@@ -35,7 +37,8 @@ from controllers.p2p_order_common import (
 from services import get_p2p_service, get_monitor_service
 from services.p2p_service import P2PService
 from services.monitor_service import MonitorService
-from utils.error_utils import NotFoundError, ValidationError, BadRequestError
+from utils.error_utils import NotFoundError, ValidationError, BadRequestError, count_results
+from utils.stream_utils import streaming_list_response, window
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -139,10 +142,60 @@ class P2POrderAPIController:
             )
     
     async def api_list_orders(self, request: Request):
-        """API endpoint to list all orders."""
+        """
+        API endpoint to list orders.
+        
+        sort picks the field to order by (document_number by default,
+        created_at, updated_at or total_value) and order=desc reverses it;
+        both are served from sorted indexes. Passing limit or cursor (without
+        offset) returns one page, with the next page's cursor in next_cursor.
+        stream=ndjson or stream=json streams the matching orders as NDJSON
+        lines or as a bare JSON array instead, one at a time.
+        """
         try:
-            orders = self.p2p_service.list_orders()
+            params = await BaseController.parse_query_params(request, OrderFilterParams)
+            date_from, date_to = date_range_bounds(params.date_from, params.date_to)
+            filters = {
+                "status": params.status,
+                "vendor": params.vendor,
+                "requisition_reference": params.requisition_reference,
+                "search_term": params.search,
+                "date_from": date_from,
+                "date_to": date_to,
+                "sort": params.sort,
+                "descending": params.order == "desc"
+            }
+            
+            if params.stream:
+                orders = self.p2p_service.iter_orders(cursor=params.cursor, **filters)
+                return streaming_list_response(
+                    (order.model_dump(mode="json") for order in window(orders, params.offset, params.limit)),
+                    params.stream
+                )
+            
+            if params.offset is None and (params.limit is not None or params.cursor is not None):
+                page = self.p2p_service.list_orders_page(
+                    limit=params.limit or DEFAULT_PAGE_LIMIT,
+                    cursor=params.cursor,
+                    **filters
+                )
+                response = self._create_success_response(data=page.items)
+                response["next_cursor"] = page.next_cursor
+                return response
+            
+            orders = self.p2p_service.list_orders(**filters)
+            if params.offset is not None or params.limit is not None:
+                offset = params.offset or 0
+                orders = orders[offset:offset + (params.limit or len(orders))]
             return self._create_success_response(data=orders)
+        except ValidationError as e:
+            log_order_error(self.monitor_service, e, request, "api_list_orders")
+            return self._create_error_response(
+                message=str(e),
+                error_code="validation_error",
+                details=getattr(e, "details", {}),
+                status_code=400
+            )
         except Exception as e:
             logger.error(f"Error listing orders: {e}")
             log_order_error(self.monitor_service, e, request, "api_list_orders")
@@ -527,3 +580,54 @@ async def api_cancel_order(request: Request, order_id: str, p2p_service=None, mo
     """API endpoint to cancel an order."""
     controller = get_p2p_order_api_controller(p2p_service, monitor_service)
     return await controller.api_cancel_order(request, order_id)
+
+async def api_batch_orders(
+    request: Request,
+    action: str,
+    p2p_service=None,
+    monitor_service=None
+):
+    """
+    Submit, approve, receive, complete or cancel several orders at once (API endpoint).
+    
+    The body holds a document_numbers list, the reason for a cancellation,
+    for a receipt optional received_items mapping order numbers to item
+    quantities (orders left out are received in full), and an optional
+    atomic flag to change nothing if any order fails. Every order is
+    validated before the valid ones are written in one state transaction;
+    the response reports each order's outcome, with status 200 if every
+    order was updated and 207 otherwise.
+    
+    Args:
+        request: FastAPI request
+        action: "submit", "approve", "receive", "complete" or "cancel"
+        p2p_service: Injected P2P service
+        monitor_service: Injected monitor service
+        
+    Returns:
+        JSON response with the result of each order and the totals
+    """
+    # Get services if not provided (for testing)
+    if p2p_service is None:
+        p2p_service = get_p2p_service()
+    if monitor_service is None:
+        monitor_service = get_monitor_service()
+        
+    try:
+        batch_data = await BaseController.parse_json_body(request, DocumentBatchTransition)
+        
+        results = p2p_service.transition_orders(
+            action, batch_data.document_numbers, reason=batch_data.reason,
+            received_items=batch_data.received_items, atomic=batch_data.atomic
+        )
+        
+        totals = count_results(results, ("updated", "failed", "skipped"))
+        
+        return BaseController.create_success_response(
+            data={"action": action, "results": results, "totals": totals},
+            message=f"{totals['updated']} of {len(results)} orders updated",
+            status_code=200 if totals["updated"] == len(results) else 207  # OK / Multi-Status
+        )
+    except Exception as e:
+        log_order_error(monitor_service, e, request, "api_batch_orders")
+        return BaseController.handle_api_error(e)
@@ -8,6 +8,7 @@ This module handles all REST API routes for requisition management including:
 - Creating requisitions (POST /api/v1/p2p/requisitions)
 - Updating requisitions (PUT /api/v1/p2p/requisitions/{document_number})
 - Workflow state transitions (submit, approve, reject)
+- Batch workflow transitions (POST /api/v1/p2p/requisitions/batch/{action})
 """
 
 from fastapi import Request, Depends, Response, HTTPException, status
@@ -17,14 +18,15 @@ import logging
 
 from models.p2p import (
     Requisition, RequisitionCreate, RequisitionUpdate, 
-    DocumentStatus
+    DocumentStatus, DocumentBatchTransition
 )
-from controllers import BaseController
+from controllers import BaseController, DEFAULT_PAGE_LIMIT
 from controllers.p2p_common import (
     get_p2p_service_dependency,
     get_monitor_service_dependency,
     get_material_service_dependency,
-    RequisitionFilterParams
+    RequisitionFilterParams,
+    date_range_bounds
 )
 from controllers.p2p_requisition_common import (
     format_requisition_for_response,
@@ -34,7 +36,8 @@ from controllers.p2p_requisition_common import (
 from services import get_p2p_service, get_monitor_service
 from services.p2p_service import P2PService
 from services.monitor_service import MonitorService
-from utils.error_utils import NotFoundError, ValidationError, BadRequestError
+from utils.error_utils import NotFoundError, ValidationError, BadRequestError, count_results
+from utils.stream_utils import streaming_list_response, window
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -61,10 +64,63 @@ class P2PRequisitionAPIController:
             raise HTTPException(status_code=500, detail=str(e))
     
     async def api_list_requisitions(self, request: Request):
-        """API endpoint to list all requisitions."""
+        """
+        API endpoint to list requisitions.
+        
+        sort picks the field to order by (document_number by default,
+        created_at, updated_at or total_value) and order=desc reverses it;
+        both are served from sorted indexes. Passing limit or cursor (without
+        offset) returns one page, with the next page's cursor in next_cursor.
+        stream=ndjson or stream=json streams the matching requisitions as
+        NDJSON lines or as a bare JSON array instead, one at a time.
+        """
         try:
-            requisitions = self.p2p_service.list_requisitions()
+            params = await BaseController.parse_query_params(request, RequisitionFilterParams)
+            date_from, date_to = date_range_bounds(params.date_from, params.date_to)
+            filters = {
+                "status": params.status,
+                "requester": params.requester,
+                "department": params.department,
+                "search_term": params.search,
+                "date_from": date_from,
+                "date_to": date_to,
+                "sort": params.sort,
+                "descending": params.order == "desc"
+            }
+            
+            if params.stream:
+                requisitions = self.p2p_service.iter_requisitions(cursor=params.cursor, **filters)
+                return streaming_list_response(
+                    (requisition.model_dump(mode="json")
+                     for requisition in window(requisitions, params.offset, params.limit)),
+                    params.stream
+                )
+            
+            if params.offset is None and (params.limit is not None or params.cursor is not None):
+                page = self.p2p_service.list_requisitions_page(
+                    limit=params.limit or DEFAULT_PAGE_LIMIT,
+                    cursor=params.cursor,
+                    **filters
+                )
+                return {"status": "success", "data": page.items, "next_cursor": page.next_cursor}
+            
+            requisitions = self.p2p_service.list_requisitions(**filters)
+            if params.offset is not None or params.limit is not None:
+                offset = params.offset or 0
+                requisitions = requisitions[offset:offset + (params.limit or len(requisitions))]
             return {"status": "success", "data": requisitions}
+        except ValidationError as e:
+            log_requisition_error(self.monitor_service, e, request, "api_list_requisitions")
+            return JSONResponse(
+                content={
+                    "success": False,
+                    "status": "error",
+                    "message": str(e),
+                    "error_code": "validation_error",
+                    "details": getattr(e, "details", {})
+                },
+                status_code=400
+            )
         except Exception as e:
             logger.error(f"Error listing requisitions: {e}")
             raise HTTPException(status_code=500, detail=str(e))
@@ -443,3 +499,51 @@ async def api_reject_requisition(
     except Exception as e:
         log_requisition_error(monitor_service, e, request, "api_reject_requisition", document_number)
         return BaseController.handle_api_error(e)
+
+async def api_batch_requisitions(
+    request: Request,
+    action: str,
+    p2p_service=None,
+    monitor_service=None
+):
+    """
+    Submit, approve or reject several requisitions at once (API endpoint).
+    
+    The body holds a document_numbers list, the reason for a rejection and
+    an optional atomic flag to change nothing if any requisition fails.
+    Every requisition is validated before the valid ones are written in one
+    state transaction; the response reports each requisition's outcome,
+    with status 200 if every requisition was updated and 207 otherwise.
+    
+    Args:
+        request: FastAPI request
+        action: "submit", "approve" or "reject"
+        p2p_service: Injected P2P service
+        monitor_service: Injected monitor service
+        
+    Returns:
+        JSON response with the result of each requisition and the totals
+    """
+    # Get services if not provided (for testing)
+    if p2p_service is None:
+        p2p_service = get_p2p_service()
+    if monitor_service is None:
+        monitor_service = get_monitor_service()
+        
+    try:
+        batch_data = await BaseController.parse_json_body(request, DocumentBatchTransition)
+        
+        results = p2p_service.transition_requisitions(
+            action, batch_data.document_numbers, reason=batch_data.reason, atomic=batch_data.atomic
+        )
+        
+        totals = count_results(results, ("updated", "failed", "skipped"))
+        
+        return BaseController.create_success_response(
+            data={"action": action, "results": results, "totals": totals},
+            message=f"{totals['updated']} of {len(results)} requisitions updated",
+            status_code=200 if totals["updated"] == len(results) else 207  # OK / Multi-Status
+        )
+    except Exception as e:
+        log_requisition_error(monitor_service, e, request, "api_batch_requisitions")
+        return BaseController.handle_api_error(e)
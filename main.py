@@ -145,4 +145,15 @@ async def shutdown_event():
 # For running with uvicorn directly
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    
+    # Several worker processes only share data through the SQLite state
+    # backend; with in-memory state each worker would have its own copy
+    workers = int(os.environ.get("SAP_HARNESS_WORKERS", 1))
+    if workers > 1 and os.environ.get("SAP_HARNESS_STATE_BACKEND") != "sqlite":
+        logger.critical("SAP_HARNESS_WORKERS > 1 requires SAP_HARNESS_STATE_BACKEND=sqlite")
+        sys.exit(1)
+    
+    if workers > 1:
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -11,6 +11,7 @@ including:
 
 import json
 import logging
+import os
 import uuid
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Callable, Union
@@ -200,8 +201,128 @@ class SessionStore:
         
         return len(expired_sessions)
 
+class StateSessionStore(SessionStore):
+    """
+    Session storage in the state manager.
+    
+    Sessions are stored under "sessions/<session id>" keys together with
+    their expiry time, so every process sharing the state (e.g. uvicorn
+    workers on a SQLite state backend) sees the same sessions.
+    """
+    
+    # Expiry is only rewritten once it has moved by at least this much,
+    # so reading a session doesn't cost a state write on every request
+    REFRESH_GRANULARITY = timedelta(minutes=1)
+    
+    def __init__(self, state_manager, expiry_minutes: int = 30):
+        """
+        Initialize the session store.
+        
+        Args:
+            state_manager: State manager holding the sessions
+            expiry_minutes: Session expiry time in minutes
+        """
+        super().__init__(expiry_minutes)
+        self._state_manager = state_manager
+    
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a session by ID.
+        
+        Args:
+            session_id: Session identifier
+        
+        Returns:
+            Session data or None if not found or expired
+        """
+        record = self._state_manager.get(self._key(session_id))
+        if record is None:
+            return None
+        
+        expires_at = datetime.fromisoformat(record["expires_at"])
+        if datetime.now() > expires_at:
+            self.delete(session_id)
+            return None
+        
+        if self._new_expiry() - expires_at >= self.REFRESH_GRANULARITY:
+            self.set(session_id, record["data"])
+        
+        return record["data"]
+    
+    def set(self, session_id: str, data: Dict[str, Any]) -> None:
+        """
+        Set session data.
+        
+        Args:
+            session_id: Session identifier
+            data: Session data to store
+        """
+        self._state_manager.set(self._key(session_id), {
+            "data": data,
+            "expires_at": self._new_expiry().isoformat()
+        })
+    
+    def delete(self, session_id: str) -> None:
+        """
+        Delete a session.
+        
+        Args:
+            session_id: Session identifier
+        """
+        self._state_manager.delete(self._key(session_id))
+    
+    def create(self) -> str:
+        """
+        Create a new session.
+        
+        Returns:
+            New session identifier
+        """
+        session_id = str(uuid.uuid4())
+        self.set(session_id, {})
+        return session_id
+    
+    def cleanup(self) -> int:
+        """
+        Clean up expired sessions.
+        
+        Returns:
+            Number of sessions removed
+        """
+        now = datetime.now()
+        removed = 0
+        for key in self._state_manager.get_keys("sessions/"):
+            record = self._state_manager.get(key)
+            if record is not None and now > datetime.fromisoformat(record["expires_at"]):
+                self._state_manager.delete(key)
+                removed += 1
+        return removed
+    
+    def _key(self, session_id: str) -> str:
+        """Get the state key of a session"""
+        return f"sessions/{session_id}"
+    
+    def _new_expiry(self) -> datetime:
+        """Get the expiry time of a session used now"""
+        return datetime.now() + timedelta(minutes=self._expiry_minutes)
+
+def create_session_store() -> SessionStore:
+    """
+    Create the session store for the configured state backend.
+    
+    With the "sqlite" state backend, sessions are kept in the shared state
+    so they work across worker processes; otherwise they stay in memory.
+    
+    Returns:
+        SessionStore: A new session store
+    """
+    if os.environ.get("SAP_HARNESS_STATE_BACKEND") == "sqlite":
+        from services.state_manager import get_state_manager
+        return StateSessionStore(get_state_manager())
+    return SessionStore()
+
 # Global session store
-_session_store = SessionStore()
+_session_store = create_session_store()
 
 class SessionMiddleware(BaseHTTPMiddleware):
     """
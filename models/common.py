@@ -1,8 +1,12 @@
 # models/common.py
-from datetime import datetime
-from typing import Dict, Any, Optional, List
+from datetime import datetime, date
+from enum import Enum
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Callable, Type, TypeVar, Union, get_args, get_origin
 from pydantic import BaseModel, Field, field_validator
 
+M = TypeVar('M', bound=BaseModel)
+
 class BaseDataModel(BaseModel):
     """
     Base model for all data models in the application.
@@ -27,6 +31,90 @@ class BaseDataModel(BaseModel):
                 setattr(self, key, value)
         self.updated_at = datetime.now()
 
+def construct_trusted(model_class: Type[M], data: Dict[str, Any]) -> M:
+    """
+    Build a model from data this application stored itself, without validation.
+    
+    Stored data passed validation when it was written, so re-validating it
+    on every read only costs time. The values are converted back from
+    their JSON form (enum values, ISO dates and datetimes, nested model
+    dictionaries) by converters derived once per model class from its
+    field annotations, and the instance is assembled the way
+    model_construct() does it, minus its per-call overhead. Missing
+    fields get their defaults. Data from outside the application must go
+    through the model's constructor instead.
+    
+    Args:
+        model_class: Model class to build
+        data: Stored dictionary form of the model
+        
+    Returns:
+        The model instance
+    """
+    fields, names, converters = _construction_plan(model_class)
+    if data.keys() == names:
+        # Stored by model_dump(): every field present, in field order
+        values = dict(data)
+        for name, converter in converters:
+            value = values[name]
+            if value is not None:
+                values[name] = converter(value)
+    else:
+        values = {}
+        for name, converter, field in fields:
+            if name in data:
+                value = data[name]
+                values[name] = value if converter is None or value is None else converter(value)
+            elif not field.is_required():
+                values[name] = field.get_default(call_default_factory=True)
+    
+    if model_class.__pydantic_post_init__:
+        return model_class.model_construct(**values)
+    instance = model_class.__new__(model_class)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__pydantic_fields_set__", set(data).intersection(names))
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
+
+@lru_cache(maxsize=None)
+def _construction_plan(model_class: Type[BaseModel]) -> tuple:
+    """
+    Get the (name, converter or None, field info) of each field of a model
+    class, the set of field names and the (name, converter) of the fields
+    that need converting.
+    """
+    fields = tuple(
+        (name, _converter(field.annotation), field) for name, field in model_class.model_fields.items()
+    )
+    converters = tuple((name, converter) for name, converter, _ in fields if converter is not None)
+    return fields, frozenset(model_class.model_fields), converters
+
+def _converter(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """Get the function converting a stored value to a field's type, None if it needs none"""
+    origin = get_origin(annotation)
+    if origin is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return _converter(args[0]) if len(args) == 1 else None
+    if origin is list:
+        args = get_args(annotation)
+        item_converter = _converter(args[0]) if args else None
+        if item_converter is None:
+            return None
+        return lambda values: [item_converter(value) for value in values]
+    if not isinstance(annotation, type):
+        return None
+    if issubclass(annotation, BaseModel):
+        return lambda value: construct_trusted(annotation, value) if isinstance(value, dict) else value
+    if issubclass(annotation, Enum):
+        members = {member.value: member for member in annotation}
+        return lambda value: members.get(value, value)
+    if issubclass(annotation, datetime):
+        return lambda value: datetime.fromisoformat(value) if isinstance(value, str) else value
+    if issubclass(annotation, date):
+        return lambda value: date.fromisoformat(value) if isinstance(value, str) else value
+    return None
+
 class EntityCollection(BaseModel):
     """
     A collection of entities of the same type.
@@ -0,0 +1,106 @@
+# models/entity_cache.py
+"""
+Bounded cache of hydrated entities.
+
+Entities read back from the state as dictionaries (after loading the
+persistence file, or always with the SQLite backend) are turned into
+models by a full pydantic validation. An EntityCache keeps the most
+recently used models of one EntityStore, each tagged with the state
+version of its key's last change, so a repeat read of an unchanged entity
+returns the same instance without reading or validating anything.
+
+Entries are checked against the key's current version on every lookup,
+so writes through any store, another data layer or another process make
+stale entries miss; the store also drops an entity's entry when it
+writes it.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Generic, Optional, Tuple, TypeVar
+
+# Default number of entities an EntityStore keeps hydrated
+ENTITY_CACHE_SIZE = 1024
+
+T = TypeVar('T')
+
+class EntityCache(Generic[T]):
+    """
+    LRU cache of (entity ID, version) -> entity for one store.
+
+    Thread-safe; a size of 0 disables caching.
+    """
+    def __init__(self, size: int = ENTITY_CACHE_SIZE):
+        """
+        Initialize an empty cache.
+
+        Args:
+            size: Maximum number of cached entities
+        """
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[int, T]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, entity_id: str, version: int) -> Optional[T]:
+        """
+        Get the cached entity if it was cached at the given version.
+
+        Args:
+            entity_id: Entity ID
+            version: Current state version of the entity's key
+
+        Returns:
+            The cached entity, None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(entity_id)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entity_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, entity_id: str, version: int, entity: T) -> None:
+        """
+        Cache an entity read at a version, evicting the least recently used
+        entity if the cache is full.
+
+        Args:
+            entity_id: Entity ID
+            version: State version of the entity's key when it was read
+            entity: Hydrated entity
+        """
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._entries[entity_id] = (version, entity)
+            self._entries.move_to_end(entity_id)
+            if len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def discard(self, entity_id: str) -> None:
+        """Drop an entity's entry, if cached"""
+        with self._lock:
+            self._entries.pop(entity_id, None)
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Get the cache statistics.
+
+        Returns:
+            Dictionary with size, entries, hits and misses
+        """
+        return {"size": self.size, "entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+__all__ = ["ENTITY_CACHE_SIZE", "EntityCache"]
@@ -0,0 +1,503 @@
+# models/entity_index.py
+"""
+Secondary indexes over the entities of an EntityStore.
+
+- HashIndex maps the value of one entity field to the IDs of the entities
+  having that value, so a filtered lookup costs time proportional to the
+  number of matches instead of a scan over every stored entity.
+- TextIndex maps the character n-grams of some text fields to entity IDs,
+  answering case-insensitive substring searches without loading entities.
+- SortedIndex keeps the entity IDs ordered by one field, answering range
+  queries, "first/last N" and keyset pages with a binary search instead of
+  a full sort.
+
+Indexes are built from the store on first use and then kept up to date
+from the state manager's change feed, so every write path (data layer,
+services, other processes sharing a SQLite state) maintains them.
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+def field_value(entity: Any, field: str) -> Any:
+    """
+    Read a field from a model instance or from its stored dictionary form.
+
+    Enum members are reduced to their values, so a model and the dictionary
+    it was stored as index under the same key.
+
+    Args:
+        entity: Model instance or dictionary
+        field: Field name
+
+    Returns:
+        The field value, or None if the entity doesn't have it
+    """
+    if isinstance(entity, dict):
+        value = entity.get(field)
+    else:
+        value = getattr(entity, field, None)
+    return index_value(value)
+
+def index_value(value: Any) -> Any:
+    """Reduce enum members to their values, the form values are indexed in"""
+    return value.value if isinstance(value, Enum) else value
+
+def datetime_value(value: Any) -> Optional[datetime]:
+    """
+    Convert a datetime or its ISO format string to a datetime.
+
+    Stored dictionaries hold datetimes in their JSON form, so this lets a
+    SortedIndex order models and stored dictionaries the same way. A date
+    becomes midnight of that day.
+
+    Args:
+        value: Datetime, date, ISO format string or None
+
+    Returns:
+        The datetime, or None if the value isn't one
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, time.min)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+class EntityIndex(ABC):
+    """
+    Base class of the indexes: keeps the built state and the lock, and
+    routes entity changes to _add() and _remove().
+    """
+    def __init__(self, name: str):
+        """
+        Initialize an empty index.
+
+        Args:
+            name: Name the index is registered under in its store
+        """
+        self.name = name
+        self.built = False
+        self._lock = threading.RLock()
+        self._reset()
+
+    def build(self, entities: Iterable[Tuple[str, Any]]) -> None:
+        """
+        Replace the index contents with the given entities.
+
+        Args:
+            entities: (entity ID, entity or stored dictionary) pairs
+        """
+        with self._lock:
+            self._reset()
+            for entity_id, entity in entities:
+                self._add(entity_id, entity)
+            self.built = True
+
+    def update(self, entity_id: str, entity: Any) -> None:
+        """
+        Index the current version of an entity, or drop it if entity is None.
+
+        Args:
+            entity_id: Entity ID
+            entity: Entity or stored dictionary, None if it was deleted
+        """
+        with self._lock:
+            if not self.built:
+                return
+            self._remove(entity_id)
+            if entity is not None:
+                self._add(entity_id, entity)
+
+    def invalidate(self) -> None:
+        """Drop the contents, so the index is rebuilt on next use"""
+        with self._lock:
+            self.built = False
+            self._reset()
+
+    @abstractmethod
+    def _reset(self) -> None:
+        """Empty the index data structures"""
+
+    @abstractmethod
+    def _add(self, entity_id: str, entity: Any) -> None:
+        """Index an entity that isn't indexed yet"""
+
+    @abstractmethod
+    def _remove(self, entity_id: str) -> None:
+        """Drop an entity from the index if it is indexed"""
+
+class HashIndex(EntityIndex):
+    """
+    Exact-match index from one field's values to entity IDs.
+
+    IDs within one value keep the order they were indexed in.
+    """
+    def __init__(self, field: str):
+        """
+        Initialize an empty index.
+
+        Args:
+            field: Name of the indexed entity field
+        """
+        self.field = field
+        super().__init__(field)
+
+    def lookup(self, values: Iterable[Any]) -> List[str]:
+        """
+        Get the IDs of entities whose field has any of the given values.
+
+        Args:
+            values: Values to match
+
+        Returns:
+            Matching entity IDs
+        """
+        with self._lock:
+            ids: List[str] = []
+            for value in dict.fromkeys(index_value(value) for value in values):
+                ids.extend(self._ids_by_value.get(value, ()))
+            return ids
+
+    def count(self, value: Any) -> int:
+        """Count the entities having a value"""
+        with self._lock:
+            return len(self._ids_by_value.get(index_value(value), ()))
+
+    def value_of(self, entity_id: str) -> Optional[Any]:
+        """Get the indexed value of an entity"""
+        with self._lock:
+            return self._value_by_id.get(entity_id)
+
+    def values(self) -> Iterator[Any]:
+        """Iterate over the distinct indexed values"""
+        with self._lock:
+            return iter(list(self._ids_by_value))
+
+    def _reset(self) -> None:
+        # value -> IDs with that value (dict used as an ordered set)
+        self._ids_by_value: Dict[Any, Dict[str, None]] = {}
+        # ID -> indexed value, to find the old entry on update and delete
+        self._value_by_id: Dict[str, Any] = {}
+
+    def _add(self, entity_id: str, entity: Any) -> None:
+        value = field_value(entity, self.field)
+        self._ids_by_value.setdefault(value, {})[entity_id] = None
+        self._value_by_id[entity_id] = value
+
+    def _remove(self, entity_id: str) -> None:
+        if entity_id not in self._value_by_id:
+            return
+        value = self._value_by_id.pop(entity_id)
+        ids = self._ids_by_value.get(value)
+        if ids is not None:
+            ids.pop(entity_id, None)
+            if not ids:
+                del self._ids_by_value[value]
+
+class TextIndex(EntityIndex):
+    """
+    Case-insensitive substring index over one or more text fields.
+
+    Each field value is lowercased and split into overlapping character
+    n-grams (trigrams by default); a search term's n-grams must all occur
+    in an entity for it to be a candidate, and candidates are then checked
+    against the indexed lowercased text, so results are exactly the
+    entities where the term is a substring of one of the fields. Terms
+    shorter than the n-gram size are checked against the indexed text of
+    every entity, which still avoids loading any of them.
+    """
+    def __init__(self, name: str, fields: Tuple[str, ...], gram_size: int = 3):
+        """
+        Initialize an empty index.
+
+        Args:
+            name: Name the index is registered under in its store
+            fields: Names of the text fields to index
+            gram_size: Length of the indexed n-grams
+        """
+        self.fields = tuple(fields)
+        self.gram_size = gram_size
+        super().__init__(name)
+
+    def search(self, term: str) -> List[str]:
+        """
+        Get the IDs of entities where the term occurs in any indexed field.
+
+        Args:
+            term: Search term, matched case-insensitively as a substring
+
+        Returns:
+            Matching entity IDs
+        """
+        term = term.lower()
+        with self._lock:
+            if len(term) < self.gram_size:
+                candidates = self._texts
+            else:
+                postings = []
+                for gram in self._grams(term):
+                    ids = self._postings.get(gram)
+                    if not ids:
+                        return []
+                    postings.append(ids)
+                # Walk the rarest n-gram's IDs and check the others by membership
+                postings.sort(key=len)
+                candidates = [
+                    entity_id for entity_id in postings[0]
+                    if all(entity_id in ids for ids in postings[1:])
+                ]
+            return [
+                entity_id for entity_id in candidates
+                if any(term in text for text in self._texts[entity_id])
+            ]
+
+    def _grams(self, text: str) -> set:
+        """Get the distinct n-grams of a lowercased text"""
+        size = self.gram_size
+        return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+    def _reset(self) -> None:
+        # n-gram -> IDs of entities containing it (dict used as an ordered set)
+        self._postings: Dict[str, Dict[str, None]] = {}
+        # ID -> lowercased field values, to verify candidates and to find
+        # the old n-grams on update and delete
+        self._texts: Dict[str, Tuple[str, ...]] = {}
+
+    def _add(self, entity_id: str, entity: Any) -> None:
+        texts = tuple(
+            str(value).lower() for value in
+            (field_value(entity, field) for field in self.fields) if value
+        )
+        self._texts[entity_id] = texts
+        for gram in set().union(*(self._grams(text) for text in texts)):
+            self._postings.setdefault(gram, {})[entity_id] = None
+
+    def _remove(self, entity_id: str) -> None:
+        texts = self._texts.pop(entity_id, None)
+        if texts is None:
+            return
+        for gram in set().union(*(self._grams(text) for text in texts)):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.pop(entity_id, None)
+                if not ids:
+                    del self._postings[gram]
+
+class SortedIndex(EntityIndex):
+    """
+    Index keeping entity IDs ordered by one field's value.
+
+    Values and IDs are held in two parallel lists sorted by (value, ID), so
+    a range lookup is a binary search for each bound plus a slice: O(log n + k)
+    for k matches. Entities with equal values are ordered by ID, which makes
+    (value, ID) a unique, stable position to continue a keyset page from.
+    Entities without a value (None, or one the key function rejects) aren't
+    indexed and never match a range.
+    """
+    def __init__(self, field: str, key: Optional[Callable[[Any], Any]] = None,
+                 extract: Optional[Callable[[Any], Any]] = None):
+        """
+        Initialize an empty index.
+
+        Args:
+            field: Name of the indexed entity field, also the index name
+            key: Optional conversion applied to field values and to range
+                 bounds before comparing them, e.g. datetime_value; it
+                 must return already converted values unchanged
+            extract: Optional function computing the indexed value from an
+                     entity or its stored dictionary, for values that aren't
+                     stored fields (such as a document's total value)
+        """
+        self.field = field
+        self.key = key
+        self.extract = extract
+        super().__init__(field)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ids)
+
+    def range(self, lo: Any = None, hi: Any = None, reverse: bool = False) -> List[str]:
+        """
+        Get the IDs of entities whose value lies within bounds.
+
+        Args:
+            lo: Inclusive lower bound, None for no lower bound
+            hi: Inclusive upper bound, None for no upper bound
+            reverse: Return the IDs in descending instead of ascending order
+
+        Returns:
+            Matching entity IDs ordered by value
+        """
+        with self._lock:
+            start, end = self._bounds(lo, hi)
+            ids = self._ids[start:end]
+        if reverse:
+            ids.reverse()
+        return ids
+
+    def count_range(self, lo: Any = None, hi: Any = None) -> int:
+        """Count the entities whose value lies within inclusive bounds"""
+        with self._lock:
+            start, end = self._bounds(lo, hi)
+            return max(end - start, 0)
+
+    def first(self, limit: int) -> List[str]:
+        """Get the IDs of the entities with the lowest values, lowest first"""
+        with self._lock:
+            return self._ids[:max(limit, 0)]
+
+    def last(self, limit: int) -> List[str]:
+        """Get the IDs of the entities with the highest values, highest first"""
+        if limit <= 0:
+            return []
+        with self._lock:
+            return self._ids[:-limit - 1:-1]
+
+    def after(self, position: Optional[Tuple[Any, str]], limit: int,
+              reverse: bool = False) -> List[Tuple[Any, str]]:
+        """
+        Get the entries following a position, for keyset pagination.
+
+        Args:
+            position: (value, entity ID) to continue after, exclusive; None
+                      to start from the beginning (or the end if reverse)
+            limit: Maximum number of entries to return
+            reverse: Walk in descending instead of ascending order
+
+        Returns:
+            Up to limit (value, entity ID) pairs in walk order
+        """
+        if limit <= 0:
+            return []
+        with self._lock:
+            if position is not None:
+                value, entity_id = self._convert(position[0]), position[1]
+            if reverse:
+                end = len(self._ids) if position is None else self._locate(value, entity_id, right=False)
+                start = max(end - limit, 0)
+                entries = list(zip(self._values[start:end], self._ids[start:end]))
+                entries.reverse()
+            else:
+                start = 0 if position is None else self._locate(value, entity_id, right=True)
+                end = start + limit
+                entries = list(zip(self._values[start:end], self._ids[start:end]))
+            return entries
+
+    def order(self, entity_ids: Iterable[str], position: Optional[Tuple[Any, str]] = None,
+              reverse: bool = False) -> List[Tuple[Any, str]]:
+        """
+        Sort some of the indexed entities, optionally only those after a
+        position; cheaper than after() when they are a small share of the
+        index.
+
+        Args:
+            entity_ids: IDs to sort; IDs that aren't indexed are left out
+            position: (value, entity ID) to start after, exclusive
+            reverse: Sort in descending instead of ascending order
+
+        Returns:
+            (value, entity ID) pairs in sort order
+        """
+        with self._lock:
+            entries = [
+                (self._value_by_id[entity_id], entity_id) for entity_id in entity_ids
+                if entity_id in self._value_by_id
+            ]
+        if position is not None:
+            start = (self._convert(position[0]), position[1])
+            entries = [entry for entry in entries if (entry < start if reverse else entry > start)]
+        entries.sort(reverse=reverse)
+        return entries
+
+    def value_of(self, entity_id: str) -> Optional[Any]:
+        """Get the indexed value of an entity"""
+        with self._lock:
+            return self._value_by_id.get(entity_id)
+
+    def _value(self, entity: Any) -> Any:
+        """Get the converted value an entity is indexed under"""
+        if self.extract is not None:
+            return self._convert(self.extract(entity))
+        return self._convert(field_value(entity, self.field))
+
+    def _locate(self, value: Any, entity_id: str, right: bool) -> int:
+        """
+        Find where a (value, ID) pair sits in the sorted lists.
+
+        Args:
+            value: Converted field value
+            entity_id: Entity ID
+            right: Return the index after the pair if it is present
+
+        Returns:
+            Insertion index of the pair
+        """
+        start = bisect_left(self._values, value)
+        end = bisect_right(self._values, value, start)
+        if right:
+            return bisect_right(self._ids, entity_id, start, end)
+        return bisect_left(self._ids, entity_id, start, end)
+
+    def _convert(self, value: Any) -> Any:
+        """Apply the key function to a field value or bound"""
+        value = index_value(value)
+        if value is None or self.key is None:
+            return value
+        return self.key(value)
+
+    def _bounds(self, lo: Any, hi: Any) -> Tuple[int, int]:
+        """Get the slice of the sorted lists lying within inclusive bounds"""
+        lo, hi = self._convert(lo), self._convert(hi)
+        start = 0 if lo is None else bisect_left(self._values, lo)
+        end = len(self._values) if hi is None else bisect_right(self._values, hi)
+        return start, end
+
+    def build(self, entities: Iterable[Tuple[str, Any]]) -> None:
+        # Sort once instead of inserting entities one by one
+        with self._lock:
+            self._reset()
+            pairs = []
+            for entity_id, entity in entities:
+                value = self._value(entity)
+                if value is not None:
+                    pairs.append((value, entity_id))
+                    self._value_by_id[entity_id] = value
+            pairs.sort()
+            self._values = [value for value, _ in pairs]
+            self._ids = [entity_id for _, entity_id in pairs]
+            self.built = True
+
+    def _reset(self) -> None:
+        # Field values in ascending order, and the ID at each position
+        self._values: List[Any] = []
+        self._ids: List[str] = []
+        # ID -> indexed value, to find the old position on update and delete
+        self._value_by_id: Dict[str, Any] = {}
+
+    def _add(self, entity_id: str, entity: Any) -> None:
+        value = self._value(entity)
+        if value is None:
+            return
+        position = self._locate(value, entity_id, right=True)
+        self._values.insert(position, value)
+        self._ids.insert(position, entity_id)
+        self._value_by_id[entity_id] = value
+
+    def _remove(self, entity_id: str) -> None:
+        if entity_id not in self._value_by_id:
+            return
+        position = self._locate(self._value_by_id.pop(entity_id), entity_id, right=False)
+        del self._values[position]
+        del self._ids[position]
+
+__all__ = ["EntityIndex", "HashIndex", "SortedIndex", "TextIndex", "datetime_value", "field_value", "index_value"]
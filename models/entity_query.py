@@ -0,0 +1,279 @@
+# models/entity_query.py
+"""
+Composable queries over the entities of an EntityStore.
+
+A query is a tree of predicates: Eq, In, Range, Prefix and Contains on
+entity fields, combined with And and Or (or the & and | operators):
+
+    query = And(Eq("status", "ACTIVE"), Or(Prefix("material_number", "BOLT"),
+                                           Contains("name", "bolt")))
+    materials = store.query(query)
+
+Before loading anything, the store asks the query for an access path: each
+predicate that an index of the store can answer estimates from the index
+how many entities it matches. An And uses its most selective child, an Or the union
+of its children (only if every child can use an index). The candidates
+the access path yields are then loaded and checked against the whole
+query, so predicates no index covered are applied only to them. A query
+no index can serve falls back to a scan of every entity.
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional
+
+from models.entity_index import HashIndex, SortedIndex, datetime_value, field_value, index_value
+
+class Access(NamedTuple):
+    """A way to get a query's candidate IDs from the indexes"""
+    # Estimated number of candidates
+    cost: int
+    # Produces the candidate IDs
+    ids: Callable[[], List[str]]
+    # Human-readable description, e.g. "hash index status"
+    description: str
+
+class Predicate(ABC):
+    """Base class of query predicates"""
+    @abstractmethod
+    def matches(self, entity: Any) -> bool:
+        """Check whether an entity (model or stored dictionary) satisfies the predicate"""
+
+    def access(self, store) -> Optional[Access]:
+        """
+        Get the cheapest index access path for the predicate.
+
+        Args:
+            store: EntityStore the query runs against
+
+        Returns:
+            The access path, None if the store has no index for the predicate
+        """
+        return None
+
+    def __and__(self, other: "Predicate") -> "And":
+        return And(self, other)
+
+    def __or__(self, other: "Predicate") -> "Or":
+        return Or(self, other)
+
+class FieldPredicate(Predicate):
+    """Predicate on the value of one entity field"""
+    def __init__(self, field: str):
+        self.field = field
+
+    def __repr__(self) -> str:
+        args = ", ".join(repr(value) for value in vars(self).values())
+        return f"{type(self).__name__}({args})"
+
+    def _sorted_index(self, store) -> Optional[SortedIndex]:
+        """Get a sorted index on the field, if the store has one"""
+        index = store.index(self.field)
+        return index if isinstance(index, SortedIndex) else None
+
+class In(FieldPredicate):
+    """The field equals any of several values"""
+    def __init__(self, field: str, values: Iterable[Any]):
+        super().__init__(field)
+        self.values = list(values)
+
+    def matches(self, entity: Any) -> bool:
+        value = field_value(entity, self.field)
+        return any(value == index_value(candidate) for candidate in self.values)
+
+    def access(self, store) -> Optional[Access]:
+        index = store.index(self.field)
+        if isinstance(index, HashIndex):
+            values = list(dict.fromkeys(index_value(value) for value in self.values))
+            return Access(
+                sum(index.count(value) for value in values),
+                lambda: index.lookup(values),
+                f"hash index {self.field}"
+            )
+
+        index = self._sorted_index(store)
+        if index is not None:
+            # One point range per value
+            return Access(
+                sum(index.count_range(value, value) for value in self.values),
+                lambda: _union(index.range(value, value) for value in self.values),
+                f"sorted index {self.field}"
+            )
+        return None
+
+class Eq(In):
+    """The field equals a value"""
+    def __init__(self, field: str, value: Any):
+        super().__init__(field, [value])
+
+    def __repr__(self) -> str:
+        return f"Eq({self.field!r}, {self.values[0]!r})"
+
+class Range(FieldPredicate):
+    """The field lies within inclusive bounds; a bound of None is open"""
+    def __init__(self, field: str, lo: Any = None, hi: Any = None):
+        super().__init__(field)
+        self.lo = lo
+        self.hi = hi
+
+    def matches(self, entity: Any) -> bool:
+        value = field_value(entity, self.field)
+        if value is None:
+            return False
+        try:
+            if self.lo is not None and value < _comparable(value, self.lo):
+                return False
+            if self.hi is not None and value > _comparable(value, self.hi):
+                return False
+        except TypeError:
+            return False
+        return True
+
+    def access(self, store) -> Optional[Access]:
+        index = self._sorted_index(store)
+        if index is None:
+            return None
+        return Access(
+            index.count_range(self.lo, self.hi),
+            lambda: index.range(self.lo, self.hi),
+            f"sorted index {self.field}"
+        )
+
+class Prefix(FieldPredicate):
+    """The field is a string starting with a prefix (case-sensitive)"""
+    def __init__(self, field: str, prefix: str):
+        super().__init__(field)
+        self.prefix = prefix
+
+    def matches(self, entity: Any) -> bool:
+        value = field_value(entity, self.field)
+        return isinstance(value, str) and value.startswith(self.prefix)
+
+    def access(self, store) -> Optional[Access]:
+        index = self._sorted_index(store)
+        if index is None or index.key is not None:
+            return None
+        # Every string starting with the prefix sorts between these bounds
+        hi = self.prefix + "\U0010ffff"
+        return Access(
+            index.count_range(self.prefix, hi),
+            lambda: index.range(self.prefix, hi),
+            f"sorted index {self.field}"
+        )
+
+class Contains(FieldPredicate):
+    """The field contains a substring, ignoring case"""
+    def __init__(self, field: str, term: str):
+        super().__init__(field)
+        self.term = term
+
+    def matches(self, entity: Any) -> bool:
+        value = field_value(entity, self.field)
+        return value is not None and self.term.lower() in str(value).lower()
+
+    def access(self, store) -> Optional[Access]:
+        # Any text index covering the field narrows down the candidates;
+        # the search itself is cheap, so its result size is the cost
+        index = store.text_index(self.field)
+        if index is None:
+            return None
+        ids = index.search(self.term)
+        return Access(len(ids), lambda: ids, f"text index {index.name}")
+
+class And(Predicate):
+    """All of several predicates hold"""
+    def __init__(self, *predicates: Predicate):
+        self.predicates = list(predicates)
+
+    def __repr__(self) -> str:
+        return f"And({', '.join(map(repr, self.predicates))})"
+
+    def matches(self, entity: Any) -> bool:
+        return all(predicate.matches(entity) for predicate in self.predicates)
+
+    def access(self, store) -> Optional[Access]:
+        # The most selective child's candidates are a superset of the result
+        accesses = [access for access in (p.access(store) for p in self.predicates) if access]
+        return min(accesses, key=lambda access: access.cost, default=None)
+
+class Or(Predicate):
+    """Any of several predicates holds"""
+    def __init__(self, *predicates: Predicate):
+        self.predicates = list(predicates)
+
+    def __repr__(self) -> str:
+        return f"Or({', '.join(map(repr, self.predicates))})"
+
+    def matches(self, entity: Any) -> bool:
+        return any(predicate.matches(entity) for predicate in self.predicates)
+
+    def access(self, store) -> Optional[Access]:
+        # Only usable if no child needs a scan
+        accesses = []
+        for predicate in self.predicates:
+            access = predicate.access(store)
+            if access is None:
+                return None
+            accesses.append(access)
+        return Access(
+            sum(access.cost for access in accesses),
+            lambda: _union(access.ids() for access in accesses),
+            " | ".join(access.description for access in accesses)
+        )
+
+class QueryPlan(NamedTuple):
+    """How a query will be executed"""
+    # Index access path, None for a scan of every entity
+    access: Optional[Access]
+    # Estimated number of entities to load and check
+    estimated: int
+
+    def describe(self) -> str:
+        """Describe the plan, e.g. "hash index status (~12 candidates)" """
+        if self.access is None:
+            return f"full scan (~{self.estimated} entities)"
+        return f"{self.access.description} (~{self.estimated} candidates)"
+
+def plan_query(query: Predicate, store) -> QueryPlan:
+    """
+    Choose how to execute a query.
+
+    Args:
+        query: Query to plan
+        store: EntityStore the query runs against
+
+    Returns:
+        The query plan
+    """
+    access = query.access(store)
+    total = store.count()
+    if access is None or access.cost >= total:
+        return QueryPlan(None, total)
+    return QueryPlan(access, access.cost)
+
+def where(**criteria) -> Predicate:
+    """
+    Build a query from field criteria, like EntityStore.find() takes them.
+
+    A list, tuple or set value matches any of its elements.
+    """
+    predicates = [
+        In(field, value) if isinstance(value, (list, tuple, set, frozenset)) else Eq(field, value)
+        for field, value in criteria.items()
+    ]
+    return predicates[0] if len(predicates) == 1 else And(*predicates)
+
+def _comparable(value: Any, bound: Any) -> Any:
+    """Convert a range bound to the type of the value it is compared with"""
+    if isinstance(value, datetime) and not isinstance(bound, datetime):
+        return datetime_value(bound)
+    return index_value(bound)
+
+def _union(id_lists: Iterable[List[str]]) -> List[str]:
+    """Concatenate ID lists, dropping duplicates but keeping the first order"""
+    return list(dict.fromkeys(entity_id for ids in id_lists for entity_id in ids))
+
+__all__ = [
+    "Access", "And", "Contains", "Eq", "In", "Or", "Predicate", "Prefix", "QueryPlan", "Range",
+    "plan_query", "where"
+]
@@ -0,0 +1,772 @@
+# models/entity_store.py
+"""
+Per-entity storage for the data layers.
+
+Each entity is stored under its own state key, "<namespace>/<entity id>",
+so creating, updating or deleting one entity writes only that entity
+instead of the whole collection. The state manager's key index answers
+"which entities exist" without loading any of them, and secondary
+indexes (see models.entity_index) answer "which entities have this field
+value" or "which entities fall in this date range" without loading the
+ones that don't. Listings can also be iterated, loading one entity at a
+time, so walking a whole collection doesn't hold all of it in memory.
+query() combines the indexes: it runs a query built from
+models.entity_query predicates through the most selective index that
+serves it. Sorted indexes also serve keyset pagination: a page
+continues from the (value, ID) position encoded in an opaque cursor, so
+fetching it costs the page size no matter how deep it is. Recently read
+entities are kept hydrated in an EntityCache (see models.entity_cache),
+so repeat reads of unchanged entities skip pydantic validation.
+"""
+
+import base64
+import json
+import logging
+import weakref
+from typing import (
+    Any, Callable, Dict, Generic, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple,
+    Type, TypeVar, Union
+)
+
+from pydantic import BaseModel
+
+from models.entity_cache import ENTITY_CACHE_SIZE, EntityCache
+from models.entity_index import (
+    EntityIndex, HashIndex, SortedIndex, TextIndex, field_value, index_value
+)
+from models.entity_query import Predicate, QueryPlan, plan_query
+
+# Configure logging
+logger = logging.getLogger("entity_store")
+
+# Index entries fetched at a time when walking a sorted index without a limit
+WALK_CHUNK = 256
+
+T = TypeVar('T', bound=BaseModel)
+
+class Page(NamedTuple):
+    """One page of a keyset-paginated listing"""
+    items: List[Any]
+    # Cursor for the following page, None on the last page
+    next_cursor: Optional[str]
+
+def encode_cursor(index_name: str, position: Tuple[Any, str]) -> str:
+    """
+    Encode a sorted index position as an opaque page cursor.
+
+    Args:
+        index_name: Name of the sorted index the position belongs to
+        position: (value, entity ID) of the last entity on a page
+
+    Returns:
+        URL-safe cursor string
+    """
+    from services.state_persistence import serialize_value
+    value, entity_id = position
+    payload = json.dumps([index_name, serialize_value(index_value(value)), entity_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, index_name: str) -> Tuple[Any, str]:
+    """
+    Decode a page cursor made by encode_cursor().
+
+    Args:
+        cursor: Cursor string
+        index_name: Name of the sorted index being paginated
+
+    Returns:
+        (value, entity ID) position to continue after
+
+    Raises:
+        ValueError: If the cursor is malformed or belongs to another index
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        name, value, entity_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError(f"Invalid page cursor: {cursor}") from e
+    if name != index_name or not isinstance(entity_id, str):
+        raise ValueError(f"Page cursor doesn't belong to a listing ordered by {index_name}")
+    return value, entity_id
+
+class EntityStore(Generic[T]):
+    """
+    Stores entities of one model type under per-entity state keys.
+    """
+    def __init__(self, state_manager, namespace: str, model_class: Type[T],
+                 cache_size: int = ENTITY_CACHE_SIZE):
+        """
+        Initialize the store.
+
+        Args:
+            state_manager: State manager holding the entities
+            namespace: Key namespace, e.g. "materials"
+            model_class: Model class used to hydrate stored dictionaries
+            cache_size: Number of hydrated entities to keep, 0 to disable
+                        the cache
+        """
+        self.state_manager = state_manager
+        self.namespace = namespace
+        self.model_class = model_class
+        self.prefix = f"{namespace}/"
+        self._indexes: Dict[str, EntityIndex] = {}
+        # False if the state manager has no change feed to keep indexes current
+        self._live_indexes = True
+        self.cache: EntityCache[T] = EntityCache(cache_size)
+
+        self._migrate_collection()
+
+    def key(self, entity_id: str) -> str:
+        """
+        Get the state key of an entity.
+
+        Args:
+            entity_id: Entity ID
+
+        Returns:
+            State key, e.g. "materials/MAT001"
+        """
+        return self.prefix + entity_id
+
+    def ids(self) -> List[str]:
+        """
+        Get the IDs of all stored entities.
+
+        Returns:
+            List of entity IDs
+        """
+        prefix_length = len(self.prefix)
+        return [key[prefix_length:] for key in self.state_manager.get_keys(self.prefix)]
+
+    def get(self, entity_id: str) -> Optional[T]:
+        """
+        Get an entity by ID.
+
+        An entity that is cached at its key's current version is returned
+        without reading the state; the same instance is returned to every
+        reader, so changes to it must be saved to take effect.
+
+        Args:
+            entity_id: Entity ID
+
+        Returns:
+            The entity or None if it doesn't exist
+        """
+        return self._load(entity_id)
+
+    def exists(self, entity_id: str) -> bool:
+        """
+        Check whether an entity exists.
+
+        Args:
+            entity_id: Entity ID
+
+        Returns:
+            True if the entity exists
+        """
+        return self.state_manager.get(self.key(entity_id)) is not None
+
+    def existing(self, entity_ids: Iterable[str]) -> Set[str]:
+        """
+        Check which of several entities exist.
+
+        Answers from the state manager's keys in one pass, without reading
+        or hydrating any entity.
+
+        Args:
+            entity_ids: Entity IDs
+
+        Returns:
+            The subset of entity_ids that exist
+        """
+        prefix_length = len(self.prefix)
+        keys = self.state_manager.existing_keys(self.key(entity_id) for entity_id in entity_ids)
+        return {key[prefix_length:] for key in keys}
+
+    def list_all(self) -> List[T]:
+        """
+        Get all stored entities.
+
+        Returns:
+            List of entities
+        """
+        return list(self.iter_all())
+
+    def iter_all(self) -> Iterator[T]:
+        """
+        Iterate over all stored entities, loading them one at a time.
+
+        Yields:
+            Each entity, in state key order
+        """
+        # A full scan uses cached entities but doesn't evict hot ones
+        for entity_id in self.ids():
+            entity = self._load(entity_id, remember=False)
+            # The entity may have been deleted since the keys were listed
+            if entity is not None:
+                yield entity
+
+    def save(self, entity_id: str, entity: T) -> None:
+        """
+        Store an entity, replacing any existing entity with the same ID.
+
+        Args:
+            entity_id: Entity ID
+            entity: Entity to store
+        """
+        self.state_manager.set(self.key(entity_id), entity)
+        self.cache.discard(entity_id)
+
+    def remove(self, entity_id: str) -> bool:
+        """
+        Remove an entity.
+
+        Args:
+            entity_id: Entity ID
+
+        Returns:
+            True if the entity was removed, False if it didn't exist
+        """
+        removed = self.state_manager.delete(self.key(entity_id))
+        self.cache.discard(entity_id)
+        return removed
+
+    def count(self) -> int:
+        """
+        Count the stored entities.
+
+        Returns:
+            Number of entities
+        """
+        return len(self.state_manager.get_keys(self.prefix))
+
+    def add_index(self, index: Union[str, EntityIndex]) -> EntityIndex:
+        """
+        Maintain a secondary index over the stored entities.
+
+        The index is built on first use and kept up to date from the state
+        manager's change feed; with a state manager that has no change feed,
+        it is rebuilt on every use instead.
+
+        Args:
+            index: Field name for a hash index on that field, e.g.
+                   "status", or an index instance such as a TextIndex
+
+        Returns:
+            The index
+        """
+        if isinstance(index, str):
+            index = HashIndex(index)
+        if index.name in self._indexes:
+            return self._indexes[index.name]
+
+        if not self._indexes:
+            self._subscribe()
+        self._indexes[index.name] = index
+        return index
+
+    def find_ids(self, **criteria) -> Tuple[Optional[List[str]], Dict[str, Any]]:
+        """
+        Narrow down entity IDs using the indexes.
+
+        A criterion value that is a list, tuple or set matches any of its
+        elements.
+
+        Args:
+            **criteria: Field name to required value(s)
+
+        Returns:
+            IDs matching every indexed criterion (None if no criterion is
+            indexed) and the criteria the indexes didn't cover
+        """
+        remaining = {}
+        matches = []
+        for field, value in criteria.items():
+            index = self._indexes.get(field)
+            if not isinstance(index, HashIndex):
+                remaining[field] = value
+                continue
+            self._ensure_built(index)
+            matches.append(index.lookup(_as_values(value)))
+
+        if not matches:
+            return None, remaining
+
+        # Intersect starting from the smallest result
+        matches.sort(key=len)
+        ids = matches[0]
+        for other in matches[1:]:
+            other_ids = set(other)
+            ids = [entity_id for entity_id in ids if entity_id in other_ids]
+        return ids, remaining
+
+    def find(self, **criteria) -> List[T]:
+        """
+        Get the entities whose fields have the given values.
+
+        Indexed fields are looked up in their index, so only entities
+        matching those are loaded; other criteria are checked on the
+        loaded entities. A criterion value that is a list, tuple or set
+        matches any of its elements.
+
+        Args:
+            **criteria: Field name to required value(s)
+
+        Returns:
+            Matching entities
+        """
+        ids, remaining = self.find_ids(**criteria)
+        entities = self.list_all() if ids is None else self.get_many(ids)
+        if not remaining:
+            return entities
+        return [entity for entity in entities if _matches(entity, remaining)]
+
+    def query(self, query: Predicate) -> List[T]:
+        """
+        Get the entities matching a query.
+
+        The planner picks the index access path expected to yield the
+        fewest candidates; only those are loaded and checked against the
+        whole query. Without a usable index every entity is checked.
+
+        Args:
+            query: Query built from models.entity_query predicates
+
+        Returns:
+            Matching entities
+        """
+        plan = self.explain(query)
+        if plan.access is None:
+            entities = self.list_all()
+        else:
+            entities = self.get_many(plan.access.ids())
+        return [entity for entity in entities if query.matches(entity)]
+
+    def explain(self, query: Predicate) -> QueryPlan:
+        """
+        Get the plan query() would execute a query with.
+
+        Args:
+            query: Query built from models.entity_query predicates
+
+        Returns:
+            The query plan
+        """
+        return plan_query(query, self)
+
+    def index(self, name: str) -> Optional[EntityIndex]:
+        """
+        Get an index by name, built and up to date.
+
+        Args:
+            name: Name the index was added under, e.g. the field name
+
+        Returns:
+            The index, None if the store has no index of that name
+        """
+        index = self._indexes.get(name)
+        if index is not None:
+            self._ensure_built(index)
+        return index
+
+    def text_index(self, field: str) -> Optional[TextIndex]:
+        """
+        Get a text index covering a field, built and up to date.
+
+        Args:
+            field: Field name
+
+        Returns:
+            The first text index covering the field, None if there is none
+        """
+        for index in self._indexes.values():
+            if isinstance(index, TextIndex) and field in index.fields:
+                self._ensure_built(index)
+                return index
+        return None
+
+    def search(self, index_name: str, term: str, **criteria) -> List[T]:
+        """
+        Get the entities matching a text search and optional field criteria.
+
+        Args:
+            index_name: Name of a TextIndex added with add_index()
+            term: Search term, matched case-insensitively as a substring
+            **criteria: Field name to required value(s), as for find()
+
+        Returns:
+            Matching entities
+        """
+        return self._load_matching(self.search_ids(index_name, term), criteria)
+
+    def search_ids(self, index_name: str, term: str) -> List[str]:
+        """
+        Get the IDs of the entities matching a text search, without loading them.
+
+        Args:
+            index_name: Name of a TextIndex added with add_index()
+            term: Search term, matched case-insensitively as a substring
+
+        Returns:
+            Matching entity IDs
+        """
+        index = self._indexes[index_name]
+        self._ensure_built(index)
+        return index.search(term)
+
+    def find_range(self, index_name: str, lo: Any = None, hi: Any = None,
+                   reverse: bool = False, **criteria) -> List[T]:
+        """
+        Get the entities whose sorted field lies within bounds, in order.
+
+        Args:
+            index_name: Name of a SortedIndex added with add_index()
+            lo: Inclusive lower bound, None for no lower bound
+            hi: Inclusive upper bound, None for no upper bound
+            reverse: Return the entities in descending order
+            **criteria: Field name to required value(s), as for find()
+
+        Returns:
+            Matching entities ordered by the sorted field
+        """
+        return self._load_matching(self.range_ids(index_name, lo, hi, reverse=reverse), criteria)
+
+    def range_ids(self, index_name: str, lo: Any = None, hi: Any = None, reverse: bool = False) -> List[str]:
+        """
+        Get the IDs of the entities whose sorted field lies within bounds,
+        without loading them.
+
+        Args:
+            index_name: Name of a SortedIndex added with add_index()
+            lo: Inclusive lower bound, None for no lower bound
+            hi: Inclusive upper bound, None for no upper bound
+            reverse: Return the IDs in descending order
+
+        Returns:
+            Matching entity IDs ordered by the sorted field
+        """
+        return self._sorted_index(index_name).range(lo, hi, reverse=reverse)
+
+    def count_range(self, index_name: str, lo: Any = None, hi: Any = None) -> int:
+        """
+        Count the entities whose sorted field lies within bounds.
+
+        Args:
+            index_name: Name of a SortedIndex added with add_index()
+            lo: Inclusive lower bound, None for no lower bound
+            hi: Inclusive upper bound, None for no upper bound
+
+        Returns:
+            Number of matching entities
+        """
+        return self._sorted_index(index_name).count_range(lo, hi)
+
+    def last(self, index_name: str, limit: int, **criteria) -> List[T]:
+        """
+        Get the entities with the highest values of a sorted field, e.g. the
+        newest ones, without sorting or loading the others.
+
+        Args:
+            index_name: Name of a SortedIndex added with add_index()
+            limit: Maximum number of entities to return
+            **criteria: Field name to required value(s), as for find()
+
+        Returns:
+            Up to limit entities, highest value first
+        """
+        index = self._sorted_index(index_name)
+        if not criteria:
+            return self.get_many(index.last(limit))
+
+        # Walk from the top of the index until enough entities match
+        indexed_ids, remaining = self.find_ids(**criteria)
+        allowed = None if indexed_ids is None else set(indexed_ids)
+        entities = []
+        for entity_id in index.range(reverse=True):
+            if len(entities) >= limit:
+                break
+            if allowed is not None and entity_id not in allowed:
+                continue
+            entity = self.get(entity_id)
+            if entity is not None and (not remaining or _matches(entity, remaining)):
+                entities.append(entity)
+        return entities
+
+    def get_many(self, entity_ids: List[str]) -> List[T]:
+        """
+        Get several entities by ID, skipping IDs that don't exist.
+
+        Args:
+            entity_ids: Entity IDs
+
+        Returns:
+            The existing entities, in the order of entity_ids
+        """
+        entities = []
+        for entity_id in entity_ids:
+            entity = self._load(entity_id)
+            if entity is not None:
+                entities.append(entity)
+        return entities
+
+    def page(self, index_name: str, limit: Optional[int], cursor: Optional[str] = None,
+             reverse: bool = False, candidates: Optional[Iterable[str]] = None,
+             match: Optional[Callable[[T], bool]] = None, **criteria) -> Page:
+        """
+        Get one page of entities ordered by a sorted index.
+
+        Entities are walked from the cursor position in index order and
+        loaded only until the page is full, so a page costs O(limit) however
+        deep it is, and the top k entities by any sorted field cost O(k)
+        rather than a sort of the whole collection. When the criteria
+        narrow the listing down to a small share of the index, just the
+        matching IDs are ordered instead.
+
+        Args:
+            index_name: Name of a SortedIndex added with add_index()
+            limit: Maximum number of entities on the page, None for all
+                   remaining entities in index order
+            cursor: next_cursor of the previous page, None for the first page
+            reverse: Order the entities in descending order
+            candidates: Optional IDs the entities must be among, e.g. from
+                        a text search or a range lookup
+            match: Optional check the loaded entities must pass
+            **criteria: Field name to required value(s), as for find()
+
+        Returns:
+            The page of entities and the cursor of the next page
+
+        Raises:
+            ValueError: If the cursor is malformed or from another listing
+        """
+        chunk = WALK_CHUNK if limit is None else limit + 1
+        entries = self._entries(index_name, cursor, reverse, candidates, match, chunk, criteria, True)
+
+        items: List[T] = []
+        last = None
+        for position, entity in entries:
+            if len(items) == limit:
+                # A further match exists, so the page isn't the last one
+                return Page(items, encode_cursor(index_name, last))
+            items.append(entity)
+            last = position
+        return Page(items, None)
+
+    def iterate(self, index_name: str, cursor: Optional[str] = None, reverse: bool = False,
+                candidates: Optional[Iterable[str]] = None, match: Optional[Callable[[T], bool]] = None,
+                **criteria) -> Iterator[T]:
+        """
+        Iterate over the entities in the order of a sorted index, loading
+        them one at a time.
+
+        Works like page() without a limit, but never holds more than one
+        entity, so a listing of any size can be streamed. The index, the
+        cursor and the criteria are checked before the first entity is
+        requested.
+
+        Args:
+            index_name: Name of a SortedIndex added with add_index()
+            cursor: Optional next_cursor of a page to continue after
+            reverse: Iterate in descending order
+            candidates: Optional IDs the entities must be among
+            match: Optional check the loaded entities must pass
+            **criteria: Field name to required value(s), as for find()
+
+        Returns:
+            Iterator over the matching entities
+
+        Raises:
+            ValueError: If the cursor is malformed or from another listing
+        """
+        entries = self._entries(index_name, cursor, reverse, candidates, match, WALK_CHUNK, criteria, False)
+        return (entity for _, entity in entries)
+
+    def _entries(self, index_name: str, cursor: Optional[str], reverse: bool,
+                 candidates: Optional[Iterable[str]], match: Optional[Callable[[T], bool]],
+                 chunk: int, criteria: Dict[str, Any],
+                 remember: bool) -> Iterator[Tuple[Tuple[Any, str], T]]:
+        """
+        Resolve the index, cursor and criteria of a listing, then return an
+        iterator over its ((value, ID), entity) entries in index order,
+        caching the loaded entities if remember is set.
+        """
+        index = self._sorted_index(index_name)
+        position = None if cursor is None else decode_cursor(cursor, index_name)
+
+        indexed_ids, remaining = self.find_ids(**criteria)
+        allowed = None if indexed_ids is None else set(indexed_ids)
+        if candidates is not None:
+            allowed = set(candidates) if allowed is None else allowed.intersection(candidates)
+
+        def entries():
+            for value, entity_id in self._walk(index, position, reverse, allowed, chunk):
+                entity = self._load(entity_id, remember)
+                if entity is None or (remaining and not _matches(entity, remaining)) \
+                        or (match is not None and not match(entity)):
+                    continue
+                yield (value, entity_id), entity
+
+        return entries()
+
+    def _walk(self, index: SortedIndex, position: Optional[Tuple[Any, str]], reverse: bool,
+              allowed: Optional[set], chunk: int):
+        """Yield the (value, ID) entries after a position, restricted to allowed IDs"""
+        if allowed is not None and len(allowed) * 4 < len(index):
+            # Few candidates: order just those by their indexed values
+            yield from index.order(allowed, position, reverse=reverse)
+            return
+
+        while True:
+            entries = index.after(position, chunk, reverse=reverse)
+            for entry in entries:
+                if allowed is None or entry[1] in allowed:
+                    yield entry
+            if len(entries) < chunk:
+                return
+            position = entries[-1]
+
+    def _sorted_index(self, index_name: str) -> SortedIndex:
+        """Get a sorted index by name, built and up to date"""
+        index = self._indexes[index_name]
+        if not isinstance(index, SortedIndex):
+            raise TypeError(f"Index {index_name} of {self.namespace} isn't a sorted index")
+        self._ensure_built(index)
+        return index
+
+    def _load_matching(self, ids: List[str], criteria: Dict[str, Any]) -> List[T]:
+        """Load the entities among ids that match the criteria, keeping their order"""
+        indexed_ids, remaining = self.find_ids(**criteria)
+        if indexed_ids is not None:
+            allowed = set(indexed_ids)
+            ids = [entity_id for entity_id in ids if entity_id in allowed]
+
+        entities = self.get_many(ids)
+        if not remaining:
+            return entities
+        return [entity for entity in entities if _matches(entity, remaining)]
+
+    def _ensure_built(self, index: EntityIndex) -> None:
+        """Pick up changes from other processes and build the index if needed"""
+        if self._live_indexes:
+            self.state_manager.sync()
+        else:
+            # Changes aren't reported, so nothing built earlier can be trusted
+            index.invalidate()
+        if index.built:
+            return
+        index.build(
+            (entity_id, data) for entity_id, data in
+            ((entity_id, self.state_manager.get(self.key(entity_id))) for entity_id in self.ids())
+            if data is not None
+        )
+
+    def _subscribe(self) -> None:
+        """Keep the indexes up to date from the state manager's change feed"""
+        subscribe = getattr(self.state_manager, "subscribe", None)
+        if subscribe is None:
+            self._live_indexes = False
+            return
+
+        # Hold the store weakly, so a subscription doesn't keep it alive
+        on_change = weakref.WeakMethod(self._on_change)
+
+        def listener(event):
+            handler = on_change()
+            if handler is not None:
+                handler(event)
+
+        unsubscribe = subscribe(listener, prefix=self.prefix)
+        weakref.finalize(self, unsubscribe)
+
+    def _on_change(self, event) -> None:
+        """Apply a state change to the indexes"""
+        if event.op == "clear":
+            for index in self._indexes.values():
+                index.invalidate()
+            return
+
+        entity_id = event.key[len(self.prefix):]
+        data = self.state_manager.get(event.key) if event.op == "set" else None
+        for index in self._indexes.values():
+            index.update(entity_id, data)
+
+    def _load(self, entity_id: str, remember: bool = True) -> Optional[T]:
+        """
+        Get an entity from the cache or the state.
+
+        Args:
+            entity_id: Entity ID
+            remember: Cache the entity if it had to be hydrated
+
+        Returns:
+            The entity or None if it doesn't exist
+        """
+        key = self.key(entity_id)
+        if self.state_manager.in_transaction():
+            # The transaction's own writes aren't versioned yet
+            data = self.state_manager.get(key)
+            return None if data is None else self._hydrate(data)
+
+        # Read the version first: data read after it is at least as new
+        version = self.state_manager.key_version(key)
+        entity = self.cache.get(entity_id, version)
+        if entity is not None:
+            return entity
+
+        data = self.state_manager.get(key)
+        if data is None:
+            return None
+        entity = self._hydrate(data)
+        # Models stored as such are returned as they are, without hydration
+        if remember and entity is not data:
+            self.cache.put(entity_id, version, entity)
+        return entity
+
+    def _hydrate(self, data: Any) -> T:
+        """
+        Convert stored data to a model instance.
+
+        The data was validated when it was written, so models that offer a
+        create_from_stored() trusted path are built without re-validation.
+        """
+        if not isinstance(data, dict):
+            return data
+        if hasattr(self.model_class, "create_from_stored"):
+            return self.model_class.create_from_stored(data)
+        if hasattr(self.model_class, "create_from_dict"):
+            return self.model_class.create_from_dict(data)
+        return self.model_class(**data)
+
+    def _migrate_collection(self) -> None:
+        """
+        Move entities from a legacy EntityCollection stored under the bare
+        namespace key to per-entity keys.
+        """
+        collection = self.state_manager.get(self.namespace)
+        if collection is None:
+            return
+
+        entities = collection.get("entities", {}) if isinstance(collection, dict) \
+            else getattr(collection, "entities", {})
+        for entity_id, entity in entities.items():
+            self.save(entity_id, entity)
+        self.state_manager.delete(self.namespace)
+
+        logger.info(f"Migrated {len(entities)} {self.namespace} to per-entity keys")
+
+def _as_values(value: Any) -> List[Any]:
+    """Turn a criterion value into the list of values it matches"""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return list(value)
+    return [value]
+
+def _matches(entity: Any, criteria: Dict[str, Any]) -> bool:
+    """Check an entity against criteria not covered by an index"""
+    for field, value in criteria.items():
+        if not hasattr(entity, field):
+            return False
+        if field_value(entity, field) not in [index_value(v) for v in _as_values(value)]:
+            return False
+    return True
+
+__all__ = ["EntityStore", "Page", "decode_cursor", "encode_cursor"]
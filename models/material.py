@@ -1,9 +1,9 @@
 # models/material.py
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Iterable, Set
 from enum import Enum
 from pydantic import BaseModel, Field, field_validator
-from models.common import BaseDataModel
+from models.common import BaseDataModel, construct_trusted
 
 class MaterialType(str, Enum):
     """
@@ -83,6 +83,21 @@ class MaterialUpdate(BaseModel):
     volume: Optional[float] = Field(None, ge=0)
     dimensions: Optional[Dict[str, float]] = None
 
+# Maximum number of materials in one bulk request
+MATERIAL_BULK_LIMIT = 1000
+
+class MaterialBulkCreate(BaseModel):
+    """
+    Data model for creating or updating materials in bulk.
+    
+    Items are kept as dictionaries here and validated one by one as
+    MaterialCreate, so an invalid item is reported on its own instead of
+    rejecting the whole request.
+    """
+    materials: List[Dict[str, Any]] = Field(..., min_length=1, max_length=MATERIAL_BULK_LIMIT)
+    upsert: bool = False  # Update existing materials instead of reporting a conflict
+    atomic: bool = False  # Write nothing if any item fails
+
 class Material(BaseDataModel):
     """
     Material model representing material master data.
@@ -106,6 +121,18 @@ class Material(BaseDataModel):
             data['id'] = data.get('material_number')
         return cls(**data)
     
+    @classmethod
+    def create_from_stored(cls, data: Dict[str, Any]) -> 'Material':
+        """
+        Create a Material instance from its stored dictionary without
+        validation. Only for data read back from the state store; see
+        models.common.construct_trusted.
+        """
+        material = construct_trusted(cls, data)
+        if 'id' not in data:
+            material.id = material.material_number
+        return material
+    
     @classmethod
     def create_from_create_model(cls, create_data: MaterialCreate, material_number: Optional[str] = None) -> 'Material':
         """Create a Material instance from a MaterialCreate model"""
@@ -147,60 +174,57 @@ class MaterialDataLayer:
     Data access layer for Material entities.
     Handles CRUD operations and persistence via the state manager.
     """
+    # Fields listings can be sorted by, each backed by a sorted index
+    SORT_FIELDS = ("material_number", "created_at", "updated_at")
+    
     def __init__(self, state_manager):
         self.state_manager = state_manager
         self.state_key = "materials"
         
-        # Initialize materials collection if it doesn't exist
-        if not self.state_manager.get(self.state_key):
-            from models.common import EntityCollection
-            self.state_manager.set(self.state_key, EntityCollection(name="Materials"))
-    
-    def _get_collection(self):
-        """Get the materials collection from state"""
-        from models.common import EntityCollection
-        collection = self.state_manager.get_model(self.state_key, EntityCollection)
-        if not collection:
-            collection = EntityCollection(name="Materials")
-            self.state_manager.set_model(self.state_key, collection)
-        return collection
+        # Each material is stored under its own "materials/<number>" key
+        from models.entity_store import EntityStore
+        from models.entity_index import SortedIndex, TextIndex, datetime_value
+        self.store = EntityStore(state_manager, self.state_key, Material)
+        self.store.add_index("status")
+        self.store.add_index("type")
+        self.store.add_index(TextIndex("text", ("name", "description", "material_number")))
+        # Sorted indexes for ordered and paginated listings; material number
+        # order is the default
+        self.store.add_index(SortedIndex("material_number"))
+        for field in ("created_at", "updated_at"):
+            self.store.add_index(SortedIndex(field, key=datetime_value))
     
     def get_by_id(self, material_id: str) -> Optional[Material]:
         """Get a material by ID"""
-        collection = self._get_collection()
-        material_data = collection.get(material_id)
-        if material_data:
-            return Material.create_from_dict(material_data) if isinstance(material_data, dict) else material_data
-        return None
+        return self.store.get(material_id)
     
     def get_by_material_number(self, material_number: str) -> Optional[Material]:
         """Get a material by material number"""
         return self.get_by_id(material_number)
     
+    def get_many(self, material_numbers: Iterable[str]) -> List[Material]:
+        """Get several materials by material number, skipping missing ones"""
+        return self.store.get_many(list(material_numbers))
+    
     def list_all(self) -> List[Material]:
         """List all materials"""
-        collection = self._get_collection()
-        materials = collection.get_all()
-        return [
-            Material.create_from_dict(material) if isinstance(material, dict) else material
-            for material in materials
-        ]
+        return self.store.list_all()
+    
+    def iter_all(self) -> Iterator[Material]:
+        """Iterate over all materials, loading one at a time"""
+        return self.store.iter_all()
     
     def create(self, material_data: MaterialCreate) -> Material:
         """Create a new material"""
-        collection = self._get_collection()
-        
         # Create material object
         material = Material.create_from_create_model(material_data)
         
         # Check if material number already exists
-        if collection.get(material.material_number):
+        if self.store.exists(material.material_number):
             from utils.error_utils import ConflictError
             raise ConflictError(f"Material with number {material.material_number} already exists")
         
-        # Add to collection
-        collection.add(material.material_number, material)
-        self.state_manager.set_model(self.state_key, collection)
+        self.store.save(material.material_number, material)
         
         return material
     
@@ -210,42 +234,98 @@ class MaterialDataLayer:
         if not material:
             return None
         
-        # Update material
+        # Update a copy, so a failed save leaves the cached material as stored
+        material = material.model_copy(deep=True)
         material.update_from_update_model(update_data)
         material.updated_at = datetime.now()  # Explicitly update the timestamp here as well
         
-        # Update in collection
-        collection = self._get_collection()
-        collection.add(material.material_number, material)
-        self.state_manager.set_model(self.state_key, collection)
+        self.store.save(material.material_number, material)
         
         return material
     
+    def save(self, material: Material) -> None:
+        """Persist changes made directly to a material object"""
+        self.store.save(material.material_number, material)
+    
+    def save_many(self, materials: Iterable[Material]) -> None:
+        """Persist several materials as one atomic state write"""
+        with self.state_manager.transaction():
+            for material in materials:
+                self.store.save(material.material_number, material)
+    
+    def existing_numbers(self, material_numbers: Iterable[str]) -> Set[str]:
+        """Get which of several material numbers are already taken"""
+        return self.store.existing(material_numbers)
+    
     def delete(self, material_number: str) -> bool:
         """Delete a material"""
-        collection = self._get_collection()
-        if collection.remove(material_number):
-            self.state_manager.set_model(self.state_key, collection)
-            return True
-        return False
+        return self.store.remove(material_number)
     
     def count(self) -> int:
         """Count the number of materials"""
-        collection = self._get_collection()
-        return collection.count()
+        return self.store.count()
     
     def filter(self, **filters) -> List[Material]:
-        """Filter materials based on criteria"""
-        all_materials = self.list_all()
-        results = []
+        """
+        Filter materials based on criteria.
+        
+        Status and type are looked up in hash indexes, so only matching
+        materials are loaded. A list of values matches any of them.
+        """
+        return self.store.find(**filters)
+    
+    def search(self, search_term: str, **filters) -> List[Material]:
+        """
+        Find materials whose name, description or material number contains
+        a search term (case-insensitive), optionally filtered like filter().
         
-        for material in all_materials:
-            matches = True
-            for field, value in filters.items():
-                if not hasattr(material, field) or getattr(material, field) != value:
-                    matches = False
-                    break
-            if matches:
-                results.append(material)
+        The term is looked up in an n-gram index, so only matching
+        materials are loaded.
+        """
+        return self.store.search("text", search_term, **filters)
+    
+    def query(self, query) -> List[Material]:
+        """
+        Get the materials matching a query built from models.entity_query
+        predicates, e.g. Or(Prefix("material_number", "BOLT"), Contains("name", "bolt")).
+        
+        The most selective of the status, type, text and sorted indexes
+        narrows down the materials to load.
+        """
+        return self.store.query(query)
+    
+    def page(self, limit: Optional[int], cursor: Optional[str] = None,
+             search_term: Optional[str] = None, sort: str = "material_number",
+             descending: bool = False, **filters):
+        """
+        Get one page of materials ordered by one of SORT_FIELDS, optionally
+        searched and filtered like search() and filter().
         
-        return results
+        The page continues from the cursor's position in a sorted index, so
+        it costs O(limit) however deep it is, and the first page of a sort
+        is a top-k query that doesn't sort the whole collection. A limit of
+        None returns all materials in order. Returns a Page of materials and
+        the next page's cursor (None on the last page); raises ValueError
+        for an unknown sort field or an invalid cursor.
+        """
+        candidates = self._listing_candidates(search_term, sort)
+        return self.store.page(sort, limit, cursor, reverse=descending, candidates=candidates, **filters)
+    
+    def iterate(self, cursor: Optional[str] = None, search_term: Optional[str] = None,
+                sort: str = "material_number", descending: bool = False, **filters) -> Iterator[Material]:
+        """
+        Iterate over the materials in the order of page(), searched and
+        filtered the same way, loading one material at a time.
+        
+        Only the IDs of the listing are held in memory, so streaming the
+        whole catalogue doesn't build a list of it. Raises ValueError for
+        an unknown sort field or an invalid cursor before iteration starts.
+        """
+        candidates = self._listing_candidates(search_term, sort)
+        return self.store.iterate(sort, cursor, reverse=descending, candidates=candidates, **filters)
+    
+    def _listing_candidates(self, search_term: Optional[str], sort: str) -> Optional[List[str]]:
+        """Check the sort field of a listing and get the IDs its search term matches"""
+        if sort not in self.SORT_FIELDS:
+            raise ValueError(f"Materials can't be sorted by {sort}")
+        return self.store.search_ids("text", search_term) if search_term else None
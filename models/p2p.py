@@ -1,9 +1,9 @@
 # models/p2p.py
 from datetime import datetime, date
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Union, Iterator, Iterable, Set
 from enum import Enum
 from pydantic import BaseModel, Field, field_validator
-from models.common import BaseDataModel
+from models.common import BaseDataModel, construct_trusted
 from models.p2p_helper import (
     generate_document_number,
     validate_status_transition,
@@ -122,6 +122,46 @@ class OrderCreate(BaseDocumentCreate):
     vendor: str = Field(..., min_length=1)
     payment_terms: Optional[str] = None
 
+class DocumentImportState(BaseModel):
+    """
+    Status and timestamps an imported document keeps, e.g. from an export.
+    Absent values fall back to what creation uses: DRAFT and now.
+    """
+    status: Optional[DocumentStatus] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    
+    @field_validator('created_at', 'updated_at')
+    @classmethod
+    def validate_timestamp(cls, v):
+        """Store timestamps as naive local time, like datetime.now()"""
+        if v is not None and v.tzinfo is not None:
+            v = v.astimezone().replace(tzinfo=None)
+        return v
+    
+    @field_validator('updated_at')
+    @classmethod
+    def validate_updated_after_created(cls, v, values):
+        """Validate the document wasn't updated before it was created"""
+        created_at = values.data.get('created_at')
+        if v is not None and created_at is not None and v < created_at:
+            raise ValueError("updated_at cannot be earlier than created_at")
+        return v
+
+# Fields of DocumentImportState, left out when creating a document
+DOCUMENT_IMPORT_STATE_FIELDS = frozenset(DocumentImportState.model_fields)
+
+class RequisitionImport(RequisitionCreate, DocumentImportState):
+    """
+    Model for importing a purchase requisition.
+    """
+
+class OrderImport(OrderCreate, DocumentImportState):
+    """
+    Model for importing a purchase order.
+    """
+    requisition_reference: Optional[str] = None
+
 class BaseDocumentUpdate(BaseModel):
     """
     Base model for updating procurement documents.
@@ -146,6 +186,20 @@ class OrderUpdate(BaseDocumentUpdate):
     vendor: Optional[str] = None
     payment_terms: Optional[str] = None
 
+# Largest number of documents a batch transition may name
+DOCUMENT_BATCH_LIMIT = 1000
+
+class DocumentBatchTransition(BaseModel):
+    """
+    Model for applying a workflow action to several documents at once.
+    """
+    document_numbers: List[str] = Field(..., min_length=1, max_length=DOCUMENT_BATCH_LIMIT)
+    reason: Optional[str] = None  # Rejection or cancellation reason
+    # Quantities to receive per order, as for a single receipt; orders
+    # left out are received in full
+    received_items: Optional[Dict[str, Dict[int, float]]] = None
+    atomic: bool = False  # Change nothing if any document fails
+
 class ProcurementDocument(BaseDataModel):
     """
     Base model for procurement documents.
@@ -166,6 +220,15 @@ class ProcurementDocument(BaseDataModel):
     def total_value(self) -> float:
         """Calculate the total value of the document"""
         return sum(item.value for item in self.items)
+    
+    def apply_import_state(self, import_data: DocumentImportState) -> None:
+        """Take the status and timestamps of an imported document, where given"""
+        if import_data.status is not None:
+            self.status = import_data.status
+        if import_data.created_at is not None:
+            self.created_at = import_data.created_at
+        # Set last: creating the instance stamps updated_at with now
+        self.updated_at = import_data.updated_at or self.updated_at
 
 class Requisition(ProcurementDocument):
     """
@@ -185,10 +248,30 @@ class Requisition(ProcurementDocument):
             
         return cls(**data)
     
+    @classmethod
+    def create_from_stored(cls, data: Dict[str, Any]) -> 'Requisition':
+        """
+        Create a Requisition instance, items included, from its stored
+        dictionary without validation. Only for data read back from the
+        state store; see models.common.construct_trusted.
+        """
+        requisition = construct_trusted(cls, data)
+        if 'id' not in data:
+            requisition.id = requisition.document_number
+        return requisition
+    
+    @classmethod
+    def create_from_import_model(cls, import_data: RequisitionImport) -> 'Requisition':
+        """Create a Requisition instance from a RequisitionImport model, keeping its status and timestamps"""
+        requisition = cls.create_from_create_model(import_data)
+        requisition.apply_import_state(import_data)
+        return requisition
+    
     @classmethod
     def create_from_create_model(cls, create_data: RequisitionCreate, document_number: Optional[str] = None) -> 'Requisition':
         """Create a Requisition instance from a RequisitionCreate model"""
-        data = create_data.model_dump()
+        # An import model's status and timestamps are applied by create_from_import_model()
+        data = create_data.model_dump(exclude=DOCUMENT_IMPORT_STATE_FIELDS)
         if document_number:
             data['document_number'] = document_number
         elif not data.get('document_number'):
@@ -243,10 +326,30 @@ class Order(ProcurementDocument):
             
         return cls(**data)
     
+    @classmethod
+    def create_from_stored(cls, data: Dict[str, Any]) -> 'Order':
+        """
+        Create an Order instance, items included, from its stored
+        dictionary without validation. Only for data read back from the
+        state store; see models.common.construct_trusted.
+        """
+        order = construct_trusted(cls, data)
+        if 'id' not in data:
+            order.id = order.document_number
+        return order
+    
+    @classmethod
+    def create_from_import_model(cls, import_data: OrderImport) -> 'Order':
+        """Create an Order instance from an OrderImport model, keeping its status and timestamps"""
+        order = cls.create_from_create_model(import_data)
+        order.apply_import_state(import_data)
+        return order
+    
     @classmethod
     def create_from_create_model(cls, create_data: OrderCreate, document_number: Optional[str] = None) -> 'Order':
         """Create an Order instance from an OrderCreate model"""
-        data = create_data.model_dump()
+        # An import model's status and timestamps are applied by create_from_import_model()
+        data = create_data.model_dump(exclude=DOCUMENT_IMPORT_STATE_FIELDS)
         if document_number:
             data['document_number'] = document_number
         elif not data.get('document_number'):
@@ -326,42 +429,52 @@ class Order(ProcurementDocument):
         self.update(update_dict)
         self.updated_at = datetime.now()
 
+def document_total_value(document: Any) -> float:
+    """
+    Get the total value of a document or of its stored dictionary form.
+    
+    total_value is a property rather than a field, so stored dictionaries
+    don't contain it.
+    """
+    if isinstance(document, dict):
+        return sum(
+            item.get("quantity", 0) * item.get("price", 0) if isinstance(item, dict) else item.value
+            for item in document.get("items") or ()
+        )
+    return document.total_value
+
 class P2PDataLayer:
     """
     Data access layer for P2P entities.
     Handles CRUD operations and persistence via the state manager.
     """
+    # Fields document listings can be sorted by, each backed by a sorted index
+    SORT_FIELDS = ("document_number", "created_at", "updated_at", "total_value")
+    
     def __init__(self, state_manager):
         self.state_manager = state_manager
         self.requisitions_key = "requisitions"
         self.orders_key = "orders"
         
-        # Initialize collections if they don't exist
-        if not self.state_manager.get(self.requisitions_key):
-            from models.common import EntityCollection
-            self.state_manager.set(self.requisitions_key, EntityCollection(name="Requisitions"))
-            
-        if not self.state_manager.get(self.orders_key):
-            from models.common import EntityCollection
-            self.state_manager.set(self.orders_key, EntityCollection(name="Orders"))
-    
-    def _get_requisitions_collection(self):
-        """Get the requisitions collection from state"""
-        from models.common import EntityCollection
-        collection = self.state_manager.get_model(self.requisitions_key, EntityCollection)
-        if not collection:
-            collection = EntityCollection(name="Requisitions")
-            self.state_manager.set_model(self.requisitions_key, collection)
-        return collection
-    
-    def _get_orders_collection(self):
-        """Get the orders collection from state"""
-        from models.common import EntityCollection
-        collection = self.state_manager.get_model(self.orders_key, EntityCollection)
-        if not collection:
-            collection = EntityCollection(name="Orders")
-            self.state_manager.set_model(self.orders_key, collection)
-        return collection
+        # Each document is stored under its own "<namespace>/<document number>" key
+        from models.entity_store import EntityStore
+        self.requisitions = EntityStore(state_manager, self.requisitions_key, Requisition)
+        self.orders = EntityStore(state_manager, self.orders_key, Order)
+        
+        # Hash indexes for the list filters, so filtering loads only matches
+        for field in ("status", "requester", "department"):
+            self.requisitions.add_index(field)
+        for field in ("status", "vendor", "requisition_reference"):
+            self.orders.add_index(field)
+        
+        # Sorted indexes for date range filters, "newest N" lists and ordered
+        # and paginated listings; document number order is the default
+        from models.entity_index import SortedIndex, datetime_value
+        for store in (self.requisitions, self.orders):
+            store.add_index(SortedIndex("created_at", key=datetime_value))
+            store.add_index(SortedIndex("updated_at", key=datetime_value))
+            store.add_index(SortedIndex("document_number"))
+            store.add_index(SortedIndex("total_value", extract=document_total_value))
     
     def _is_valid_status_transition(self, current_status: DocumentStatus, new_status: DocumentStatus) -> bool:
         """Check if a status transition is valid"""
@@ -397,36 +510,27 @@ class P2PDataLayer:
     # Requisition methods
     def get_requisition(self, document_number: str) -> Optional[Requisition]:
         """Get a requisition by document number"""
-        collection = self._get_requisitions_collection()
-        req_data = collection.get(document_number)
-        if req_data:
-            return Requisition.create_from_dict(req_data) if isinstance(req_data, dict) else req_data
-        return None
+        return self.requisitions.get(document_number)
     
     def list_requisitions(self) -> List[Requisition]:
         """List all requisitions"""
-        collection = self._get_requisitions_collection()
-        requisitions = collection.get_all()
-        return [
-            Requisition.create_from_dict(req) if isinstance(req, dict) else req
-            for req in requisitions
-        ]
+        return self.requisitions.list_all()
+    
+    def iter_requisitions(self) -> Iterator[Requisition]:
+        """Iterate over all requisitions, loading one at a time"""
+        return self.requisitions.iter_all()
     
     def create_requisition(self, requisition_data: RequisitionCreate) -> Requisition:
         """Create a new requisition"""
-        collection = self._get_requisitions_collection()
-        
         # Create requisition object
         requisition = Requisition.create_from_create_model(requisition_data)
         
         # Check if document number already exists
-        if collection.get(requisition.document_number):
+        if self.requisitions.exists(requisition.document_number):
             from utils.error_utils import ConflictError
             raise ConflictError(f"Requisition with number {requisition.document_number} already exists")
         
-        # Add to collection
-        collection.add(requisition.document_number, requisition)
-        self.state_manager.set_model(self.requisitions_key, collection)
+        self.requisitions.save(requisition.document_number, requisition)
         
         return requisition
     
@@ -436,62 +540,41 @@ class P2PDataLayer:
         if not requisition:
             return None
         
-        # Check if status update is allowed
-        if update_data.status and not self._is_valid_status_transition(requisition.status, update_data.status):
-            from utils.error_utils import BadRequestError
-            raise BadRequestError(f"Invalid status transition from {requisition.status} to {update_data.status}")
-        
-        # Update requisition
-        requisition.update_from_update_model(update_data)
+        # Update a copy, so a failed save leaves the cached requisition as stored
+        requisition = self.apply_requisition_update(requisition, update_data)
         
-        # Update in collection
-        collection = self._get_requisitions_collection()
-        collection.add(requisition.document_number, requisition)
-        self.state_manager.set_model(self.requisitions_key, collection)
+        self.requisitions.save(requisition.document_number, requisition)
         
         return requisition
     
     def delete_requisition(self, document_number: str) -> bool:
         """Delete a requisition"""
-        collection = self._get_requisitions_collection()
-        if collection.remove(document_number):
-            self.state_manager.set_model(self.requisitions_key, collection)
-            return True
-        return False
+        return self.requisitions.remove(document_number)
     
     # Order methods
     def get_order(self, document_number: str) -> Optional[Order]:
         """Get an order by document number"""
-        collection = self._get_orders_collection()
-        order_data = collection.get(document_number)
-        if order_data:
-            return Order.create_from_dict(order_data) if isinstance(order_data, dict) else order_data
-        return None
+        return self.orders.get(document_number)
     
     def list_orders(self) -> List[Order]:
         """List all orders"""
-        collection = self._get_orders_collection()
-        orders = collection.get_all()
-        return [
-            Order.create_from_dict(order) if isinstance(order, dict) else order
-            for order in orders
-        ]
+        return self.orders.list_all()
+    
+    def iter_orders(self) -> Iterator[Order]:
+        """Iterate over all orders, loading one at a time"""
+        return self.orders.iter_all()
     
     def create_order(self, order_data: OrderCreate) -> Order:
         """Create a new order"""
-        collection = self._get_orders_collection()
-        
         # Create order object
         order = Order.create_from_create_model(order_data)
         
         # Check if document number already exists
-        if collection.get(order.document_number):
+        if self.orders.exists(order.document_number):
             from utils.error_utils import ConflictError
             raise ConflictError(f"Order with number {order.document_number} already exists")
         
-        # Add to collection
-        collection.add(order.document_number, order)
-        self.state_manager.set_model(self.orders_key, collection)
+        self.orders.save(order.document_number, order)
         
         return order
     
@@ -508,19 +591,16 @@ class P2PDataLayer:
             from utils.error_utils import BadRequestError
             raise BadRequestError(f"Requisition must be approved to create an order, current status: {requisition.status}")
         
-        # Create order from requisition
+        # Create order from requisition; this marks the requisition's items as
+        # assigned, so work on a copy in case the write fails
+        requisition = requisition.model_copy(deep=True)
         order = Order.create_from_requisition(requisition, vendor, payment_terms)
         
-        # Update requisition status
+        # Update requisition status and save the order in one atomic write
         requisition.status = DocumentStatus.ORDERED
-        requisition_collection = self._get_requisitions_collection()
-        requisition_collection.add(requisition.document_number, requisition)
-        self.state_manager.set_model(self.requisitions_key, requisition_collection)
-        
-        # Save the order
-        order_collection = self._get_orders_collection()
-        order_collection.add(order.document_number, order)
-        self.state_manager.set_model(self.orders_key, order_collection)
+        with self.state_manager.transaction():
+            self.requisitions.save(requisition.document_number, requisition)
+            self.orders.save(order.document_number, order)
         
         return order
     
@@ -530,68 +610,196 @@ class P2PDataLayer:
         if not order:
             return None
         
-        # Check if status update is allowed
-        if update_data.status and not self._is_valid_status_transition(order.status, update_data.status):
-            from utils.error_utils import BadRequestError
-            raise BadRequestError(f"Invalid status transition from {order.status} to {update_data.status}")
-        
-        # Update order
-        order.update_from_update_model(update_data)
+        # Update a copy, so a failed save leaves the cached order as stored
+        order = self.apply_order_update(order, update_data)
         
-        # Update in collection
-        collection = self._get_orders_collection()
-        collection.add(order.document_number, order)
-        self.state_manager.set_model(self.orders_key, collection)
+        self.orders.save(order.document_number, order)
         
         return order
     
     def delete_order(self, document_number: str) -> bool:
         """Delete an order"""
-        collection = self._get_orders_collection()
-        if collection.remove(document_number):
-            self.state_manager.set_model(self.orders_key, collection)
-            return True
-        return False
+        return self.orders.remove(document_number)
+    
+    # Batch methods
+    def existing_requisition_numbers(self, document_numbers: Iterable[str]) -> Set[str]:
+        """Get which of several requisition numbers are already taken"""
+        return self.requisitions.existing(document_numbers)
+    
+    def existing_order_numbers(self, document_numbers: Iterable[str]) -> Set[str]:
+        """Get which of several order numbers are already taken"""
+        return self.orders.existing(document_numbers)
+    
+    def save_requisitions(self, requisitions: Iterable[Requisition]) -> None:
+        """Persist several requisitions as one atomic state write"""
+        with self.state_manager.transaction():
+            for requisition in requisitions:
+                self.requisitions.save(requisition.document_number, requisition)
+    
+    def save_orders(self, orders: Iterable[Order]) -> None:
+        """Persist several orders as one atomic state write"""
+        with self.state_manager.transaction():
+            for order in orders:
+                self.orders.save(order.document_number, order)
+    
+    def apply_requisition_update(self, requisition: Requisition, update_data: RequisitionUpdate) -> Requisition:
+        """Get a copy of a requisition with an update applied, without saving it"""
+        # Check if status update is allowed
+        if update_data.status and not self._is_valid_status_transition(requisition.status, update_data.status):
+            from utils.error_utils import BadRequestError
+            raise BadRequestError(f"Invalid status transition from {requisition.status} to {update_data.status}")
+        
+        # The loaded requisition may be shared through the entity cache
+        updated = requisition.model_copy(deep=True)
+        updated.update_from_update_model(update_data)
+        return updated
+    
+    def apply_order_update(self, order: Order, update_data: OrderUpdate) -> Order:
+        """Get a copy of an order with an update applied, without saving it"""
+        # Check if status update is allowed
+        if update_data.status and not self._is_valid_status_transition(order.status, update_data.status):
+            from utils.error_utils import BadRequestError
+            raise BadRequestError(f"Invalid status transition from {order.status} to {update_data.status}")
+        
+        # The loaded order may be shared through the entity cache
+        updated = order.model_copy(deep=True)
+        updated.update_from_update_model(update_data)
+        return updated
     
     # Helper methods
-    def count_requisitions(self) -> int:
-        """Count the number of requisitions"""
-        collection = self._get_requisitions_collection()
-        return collection.count()
-    
-    def count_orders(self) -> int:
-        """Count the number of orders"""
-        collection = self._get_orders_collection()
-        return collection.count()
-    
-    def filter_requisitions(self, **filters) -> List[Requisition]:
-        """Filter requisitions based on criteria"""
-        all_requisitions = self.list_requisitions()
-        results = []
-        
-        for requisition in all_requisitions:
-            matches = True
-            for field, value in filters.items():
-                if not hasattr(requisition, field) or getattr(requisition, field) != value:
-                    matches = False
-                    break
-            if matches:
-                results.append(requisition)
-        
-        return results
-    
-    def filter_orders(self, **filters) -> List[Order]:
-        """Filter orders based on criteria"""
-        all_orders = self.list_orders()
-        results = []
-        
-        for order in all_orders:
-            matches = True
-            for field, value in filters.items():
-                if not hasattr(order, field) or getattr(order, field) != value:
-                    matches = False
-                    break
-            if matches:
-                results.append(order)
-        
-        return results
+    def filter_requisitions(self, date_from: Optional[datetime] = None,
+                            date_to: Optional[datetime] = None, **filters) -> List[Requisition]:
+        """
+        Filter requisitions based on criteria.
+        
+        Status, requester and department are looked up in hash indexes, so
+        only matching requisitions are loaded. A list of values matches any
+        of them. If a creation date bound is given, the requisitions within
+        the range are found in the sorted creation time index and returned
+        oldest first.
+        """
+        if date_from is None and date_to is None:
+            return self.requisitions.find(**filters)
+        return self.requisitions.find_range("created_at", date_from, date_to, **filters)
+    
+    def filter_orders(self, date_from: Optional[datetime] = None,
+                      date_to: Optional[datetime] = None, **filters) -> List[Order]:
+        """
+        Filter orders based on criteria.
+        
+        Status, vendor and requisition reference are looked up in hash
+        indexes, so only matching orders are loaded. A list of values
+        matches any of them. If a creation date bound is given, the orders
+        within the range are found in the sorted creation time index and
+        returned oldest first.
+        """
+        if date_from is None and date_to is None:
+            return self.orders.find(**filters)
+        return self.orders.find_range("created_at", date_from, date_to, **filters)
+    
+    def query_requisitions(self, query) -> List[Requisition]:
+        """
+        Get the requisitions matching a query built from models.entity_query
+        predicates, e.g. And(Eq("status", "APPROVED"), Range("created_at", lo, hi)).
+        
+        The indexes of filter_requisitions() and page_requisitions() serve
+        the query; the most selective one narrows down the requisitions
+        to load.
+        """
+        return self.requisitions.query(query)
+    
+    def query_orders(self, query) -> List[Order]:
+        """
+        Get the orders matching a query built from models.entity_query
+        predicates. See query_requisitions().
+        """
+        return self.orders.query(query)
+    
+    def page_requisitions(self, limit: Optional[int], cursor: Optional[str] = None,
+                          date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                          match=None, sort: str = "document_number", descending: bool = False,
+                          **filters):
+        """
+        Get one page of requisitions ordered by one of SORT_FIELDS, filtered
+        like filter_requisitions().
+        
+        The page continues from the cursor's position in a sorted index, so
+        it costs O(limit) however deep it is, and the first page of a sort
+        is a top-k query that doesn't sort every requisition. A limit of
+        None returns all requisitions in order. match is an optional check
+        the loaded requisitions must pass. Returns a Page of requisitions and
+        the next page's cursor (None on the last page); raises ValueError
+        for an unknown sort field or an invalid cursor.
+        """
+        return self._page(self.requisitions, limit, cursor, date_from, date_to, match, sort, descending, filters)
+    
+    def page_orders(self, limit: Optional[int], cursor: Optional[str] = None,
+                    date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                    match=None, sort: str = "document_number", descending: bool = False,
+                    **filters):
+        """
+        Get one page of orders ordered by one of SORT_FIELDS, filtered like
+        filter_orders(). See page_requisitions().
+        """
+        return self._page(self.orders, limit, cursor, date_from, date_to, match, sort, descending, filters)
+    
+    def iterate_requisitions(self, cursor: Optional[str] = None,
+                             date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                             match=None, sort: str = "document_number", descending: bool = False,
+                             **filters) -> Iterator[Requisition]:
+        """
+        Iterate over the requisitions in the order of page_requisitions(),
+        filtered the same way, loading one requisition at a time.
+        
+        Only the IDs of the listing are held in memory, so streaming all
+        requisitions doesn't build a list of them. Raises ValueError for an
+        unknown sort field or an invalid cursor before iteration starts.
+        """
+        candidates = self._listing_candidates(self.requisitions, date_from, date_to, sort)
+        return self.requisitions.iterate(
+            sort, cursor, reverse=descending, candidates=candidates, match=match, **filters
+        )
+    
+    def iterate_orders(self, cursor: Optional[str] = None,
+                       date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                       match=None, sort: str = "document_number", descending: bool = False,
+                       **filters) -> Iterator[Order]:
+        """
+        Iterate over the orders in the order of page_orders(), filtered the
+        same way. See iterate_requisitions().
+        """
+        candidates = self._listing_candidates(self.orders, date_from, date_to, sort)
+        return self.orders.iterate(
+            sort, cursor, reverse=descending, candidates=candidates, match=match, **filters
+        )
+    
+    def _page(self, store, limit, cursor, date_from, date_to, match, sort, descending, filters):
+        """Page through a document store, narrowing down by creation date first"""
+        candidates = self._listing_candidates(store, date_from, date_to, sort)
+        return store.page(sort, limit, cursor, reverse=descending, candidates=candidates, match=match, **filters)
+    
+    def _listing_candidates(self, store, date_from, date_to, sort) -> Optional[List[str]]:
+        """Check the sort field of a listing and get the IDs created within its date range"""
+        if sort not in self.SORT_FIELDS:
+            raise ValueError(f"Documents can't be sorted by {sort}")
+        if date_from is None and date_to is None:
+            return None
+        return store.range_ids("created_at", date_from, date_to)
+    
+    def count_requisitions(self, date_from: Optional[datetime] = None,
+                           date_to: Optional[datetime] = None) -> int:
+        """Count the requisitions created within an optional date range"""
+        return self.requisitions.count_range("created_at", date_from, date_to)
+    
+    def count_orders(self, date_from: Optional[datetime] = None,
+                     date_to: Optional[datetime] = None) -> int:
+        """Count the orders created within an optional date range"""
+        return self.orders.count_range("created_at", date_from, date_to)
+    
+    def newest_requisitions(self, limit: int) -> List[Requisition]:
+        """Get the most recently created requisitions, newest first"""
+        return self.requisitions.last("created_at", limit)
+    
+    def newest_orders(self, limit: int) -> List[Order]:
+        """Get the most recently created orders, newest first"""
+        return self.orders.last("created_at", limit)
@@ -8,7 +8,7 @@ import importlib
 import logging
 from typing import List, Callable
 from fastapi import FastAPI, Request, Response
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from routes.meta_routes import ALL_ROUTES, RouteDefinition
 from routes.http_method import HttpMethod
 
@@ -188,7 +188,7 @@ def register_route_methods(app: FastAPI, route_def: RouteDefinition, endpoint_ha
         app.get(
             route_def.path, 
             name=route_def.name, 
-            response_class=HTMLResponse if route_def.template else None
+            response_class=HTMLResponse if route_def.template else JSONResponse
         )(endpoint_handler)
         methods.append("GET")
     
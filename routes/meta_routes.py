@@ -118,6 +118,13 @@ ALL_ROUTES: List[RouteDefinition] = [
         controller="controllers.material_controller.api_create_material",
         template=None
     ),
+    RouteDefinition(
+        name="api_material_bulk_create",
+        path="/api/v1/materials/bulk",
+        methods=[HttpMethod.POST],
+        controller="controllers.material_controller.api_bulk_create_materials",
+        template=None
+    ),
     RouteDefinition(
         name="api_material_update",
         path="/api/v1/materials/{material_id}",
@@ -250,6 +257,13 @@ ALL_ROUTES: List[RouteDefinition] = [
         controller="controllers.p2p_controller.api_create_requisition",
         template=None
     ),
+    RouteDefinition(
+        name="api_requisition_batch",
+        path="/api/v1/p2p/requisitions/batch/{action}",
+        methods=[HttpMethod.POST],
+        controller="controllers.p2p_controller.api_batch_requisitions",
+        template=None
+    ),
     RouteDefinition(
         name="api_requisition_update",
         path="/api/v1/p2p/requisitions/{document_number}",
@@ -301,6 +315,13 @@ ALL_ROUTES: List[RouteDefinition] = [
         controller="controllers.p2p_controller.api_create_order",
         template=None
     ),
+    RouteDefinition(
+        name="api_order_batch",
+        path="/api/v1/p2p/orders/batch/{action}",
+        methods=[HttpMethod.POST],
+        controller="controllers.p2p_controller.api_batch_orders",
+        template=None
+    ),
     RouteDefinition(
         name="api_order_from_requisition",
         path="/api/v1/p2p/requisitions/{requisition_number}/create-order",
@@ -351,6 +372,24 @@ ALL_ROUTES: List[RouteDefinition] = [
         template=None
     ),
     
+    # P2P import API routes
+    RouteDefinition(
+        name="api_p2p_import",
+        path="/api/v1/p2p/import/{kind}",
+        methods=[HttpMethod.POST],
+        controller="controllers.p2p_controller.api_import_documents",
+        template=None
+    ),
+    
+    # Export API routes
+    RouteDefinition(
+        name="api_export",
+        path="/api/v1/export/{entity}",
+        methods=[HttpMethod.GET],
+        controller="controllers.export_api_controller.api_export",
+        template=None
+    ),
+    
     # Monitor API routes
     RouteDefinition(
         name="api_monitor_health",
@@ -0,0 +1,77 @@
+# scripts/import_p2p_documents.py
+"""
+Import requisitions or orders from an NDJSON or CSV file.
+
+The file is read in blocks and imported in chunks as it is read, with the
+same validation as POST /api/v1/p2p/import/{kind}; progress is reported
+on stderr after each chunk and the final report is printed as JSON. The
+state store is the one the application uses, configured by the
+SAP_HARNESS_* environment variables.
+
+Usage:
+    python scripts/import_p2p_documents.py orders orders.ndjson
+    python scripts/import_p2p_documents.py requisitions requisitions.csv --chunk-size 1000
+    cat orders.csv | python scripts/import_p2p_documents.py orders - --format csv
+
+Exits with status 1 if any document failed to import.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services import get_p2p_service
+from services.p2p_service_import import IMPORT_CHUNK_SIZE, IMPORT_FORMATS, IMPORT_KINDS
+from services.state_manager import state_manager
+from utils.import_utils import iter_lines
+
+# Bytes read from the file at a time
+READ_BLOCK_SIZE = 64 * 1024
+
+def read_blocks(stream):
+    """Yield the contents of a binary stream in blocks"""
+    while True:
+        block = stream.read(READ_BLOCK_SIZE)
+        if not block:
+            return
+        yield block
+
+def report_progress(report):
+    """Print an import report's progress to stderr"""
+    print(f"chunk {report.chunks}: {report.documents} read, {report.imported} imported, "
+          f"{report.failed} failed", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=IMPORT_KINDS, help="document kind")
+    parser.add_argument("path", help="file to import, - for stdin")
+    parser.add_argument("--format", choices=IMPORT_FORMATS,
+                        help="file format (default: from the file extension, ndjson otherwise)")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE,
+                        help="documents validated and written per transaction")
+    args = parser.parse_args()
+
+    import_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    importer = get_p2p_service().create_importer(
+        args.kind, import_format, chunk_size=args.chunk_size, progress=report_progress
+    )
+
+    stream = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    try:
+        for line in iter_lines(read_blocks(stream)):
+            importer.feed(line)
+        report = importer.finish()
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+        # Write out mutations a deferred flush policy may still hold
+        state_manager.close()
+
+    print(json.dumps(report.to_dict(), indent=2))
+    return 1 if report.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
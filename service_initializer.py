@@ -183,6 +183,16 @@ async def perform_shutdown_tasks():
             context={"event": "shutdown"}
         )
         
+        # Write out pending state mutations and a fresh snapshot, so the
+        # next start doesn't have to replay the write-ahead log
+        try:
+            from services.state_manager import get_state_manager
+            state_manager = get_state_manager()
+            state_manager.flush()
+            state_manager.compact()
+        except Exception as e:
+            logger.error(f"Error flushing state: {str(e)}", exc_info=True)
+
         # Remove environment variable
         if "SAP_TEST_HARNESS_RUNNING" in os.environ:
             del os.environ["SAP_TEST_HARNESS_RUNNING"]
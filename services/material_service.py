@@ -8,15 +8,17 @@ error management, and data persistence.
 """
 
 import logging
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Union, Iterator, Iterable
 from datetime import datetime, timedelta
 
+from pydantic import ValidationError as PydanticValidationError
+
 from models.material import (
     Material, MaterialCreate, MaterialUpdate, MaterialDataLayer,
     MaterialType, UnitOfMeasure, MaterialStatus
 )
 from services.state_manager import state_manager
-from utils.error_utils import NotFoundError, ValidationError, ConflictError, BadRequestError
+from utils.error_utils import NotFoundError, ValidationError, ConflictError, BadRequestError, fail_result
 
 # Configure logging
 logger = logging.getLogger("material_service")
@@ -141,10 +143,34 @@ class MaterialService:
             )
         return material
     
+    def get_materials_status(self, material_numbers: Iterable[str]) -> Dict[str, Optional[MaterialStatus]]:
+        """
+        Get the status of several materials with one multi-get.
+        
+        Each number is looked up once however often it is given, and
+        missing materials are reported as None instead of raising and
+        logging a not-found error, so the materials referenced by many
+        document items can be checked together.
+        
+        Args:
+            material_numbers: Material numbers, possibly repeated
+            
+        Returns:
+            Dictionary of each material number to its status, None if the
+            material doesn't exist
+        """
+        numbers = list(dict.fromkeys(material_numbers))
+        statuses: Dict[str, Optional[MaterialStatus]] = dict.fromkeys(numbers)
+        for material in self.data_layer.get_many(numbers):
+            statuses[material.material_number] = material.status
+        return statuses
+    
     def list_materials(self, 
                        status: Optional[Union[MaterialStatus, List[MaterialStatus]]] = None, 
                        type: Optional[Union[MaterialType, List[MaterialType]]] = None,
-                       search_term: Optional[str] = None) -> List[Material]:
+                       search_term: Optional[str] = None,
+                       sort: Optional[str] = None,
+                       descending: bool = False) -> List[Material]:
         """
         List materials with optional filtering.
         
@@ -152,46 +178,125 @@ class MaterialService:
             status: Optional material status(es) to filter by
             type: Optional material type(s) to filter by
             search_term: Optional search term to filter by (looks in name and description)
+            sort: Optional field to sort by, one of MaterialDataLayer.SORT_FIELDS
+            descending: Sort in descending instead of ascending order
             
         Returns:
             List of materials matching the criteria
+            
+        Raises:
+            ValidationError: If the sort field is unknown
         """
         logger.debug(f"Listing materials with filters: status={status}, type={type}, search={search_term}")
         
-        # Get all materials first
-        all_materials = self.data_layer.list_all()
-        filtered_materials = all_materials
-        
-        # Filter by status if provided
+        # Status, type and search term come from the data layer's indexes,
+        # so only matching materials are loaded
+        filters = {}
         if status:
-            if isinstance(status, list):
-                filtered_materials = [m for m in filtered_materials if m.status in status]
-            else:
-                filtered_materials = [m for m in filtered_materials if m.status == status]
-        
-        # Filter by type if provided
+            filters["status"] = status
         if type:
-            if isinstance(type, list):
-                filtered_materials = [m for m in filtered_materials if m.type in type]
-            else:
-                filtered_materials = [m for m in filtered_materials if m.type == type]
+            filters["type"] = type
+        
+        if sort or descending:
+            # Walk the sort field's index instead of sorting the results
+            try:
+                return self.data_layer.page(
+                    None, search_term=search_term, sort=sort or "material_number",
+                    descending=descending, **filters
+                ).items
+            except ValueError as e:
+                raise ValidationError(str(e), details={"sort": sort})
         
-        # Filter by search term if provided
+        # The search term matches substrings of name, description and
+        # material number, case-insensitively
         if search_term:
-            search_term = search_term.lower()
-            result = []
-            for material in filtered_materials:
-                if (
-                    search_term in material.name.lower() or 
-                    (material.description and search_term in material.description.lower()) or
-                    search_term in material.material_number.lower()
-                ):
-                    result.append(material)
-            filtered_materials = result
+            filtered_materials = self.data_layer.search(search_term, **filters)
+        else:
+            filtered_materials = self.data_layer.filter(**filters)
         
         logger.debug(f"Found {len(filtered_materials)} materials")
         return filtered_materials
     
+    def list_materials_page(self,
+                            limit: int,
+                            cursor: Optional[str] = None,
+                            status: Optional[Union[MaterialStatus, List[MaterialStatus]]] = None,
+                            type: Optional[Union[MaterialType, List[MaterialType]]] = None,
+                            search_term: Optional[str] = None,
+                            sort: Optional[str] = None,
+                            descending: bool = False):
+        """
+        List one page of materials, ordered by material number unless
+        another sort field is given.
+        
+        Args:
+            limit: Maximum number of materials on the page
+            cursor: next_cursor of the previous page, None for the first page
+            status: Optional material status(es) to filter by
+            type: Optional material type(s) to filter by
+            search_term: Optional search term to filter by
+            sort: Optional field to sort by, one of MaterialDataLayer.SORT_FIELDS
+            descending: Sort in descending instead of ascending order
+            
+        Returns:
+            Page of materials with the cursor of the next page
+            
+        Raises:
+            ValidationError: If the sort field or the cursor is invalid
+        """
+        filters = {}
+        if status:
+            filters["status"] = status
+        if type:
+            filters["type"] = type
+        
+        try:
+            return self.data_layer.page(
+                limit, cursor, search_term=search_term,
+                sort=sort or "material_number", descending=descending, **filters
+            )
+        except ValueError as e:
+            raise ValidationError(str(e), details={"cursor": cursor, "sort": sort})
+    
+    def iter_materials(self,
+                       status: Optional[Union[MaterialStatus, List[MaterialStatus]]] = None,
+                       type: Optional[Union[MaterialType, List[MaterialType]]] = None,
+                       search_term: Optional[str] = None,
+                       sort: Optional[str] = None,
+                       descending: bool = False,
+                       cursor: Optional[str] = None) -> Iterator[Material]:
+        """
+        Iterate over the materials list_materials_page() would list,
+        loading one at a time, for streaming responses and exports.
+        
+        Args:
+            status: Optional material status(es) to filter by
+            type: Optional material type(s) to filter by
+            search_term: Optional search term to filter by
+            sort: Optional field to sort by, one of MaterialDataLayer.SORT_FIELDS
+            descending: Sort in descending instead of ascending order
+            cursor: Optional next_cursor of a page to continue after
+            
+        Returns:
+            Iterator over the matching materials
+            
+        Raises:
+            ValidationError: If the sort field or the cursor is invalid
+        """
+        filters = {}
+        if status:
+            filters["status"] = status
+        if type:
+            filters["type"] = type
+        
+        try:
+            return self.data_layer.iterate(
+                cursor, search_term=search_term,
+                sort=sort or "material_number", descending=descending, **filters
+            )
+        except ValueError as e:
+            raise ValidationError(str(e), details={"cursor": cursor, "sort": sort})
+    
     def create_material(self, material_data: MaterialCreate) -> Material:
         """
         Create a new material with business logic validations.
@@ -302,6 +407,158 @@ class MaterialService:
                 message=f"Failed to create material: {str(e)}"
             )
     
+    def create_materials(self,
+                         materials: List[Union[MaterialCreate, Dict[str, Any]]],
+                         upsert: bool = False,
+                         atomic: bool = False) -> List[Dict[str, Any]]:
+        """
+        Create a batch of materials, or with upsert create or update them.
+        
+        The whole batch is validated before anything is written: each item
+        is validated on its own, material numbers repeated within the batch
+        are rejected, and the numbers already taken are found with one check
+        of the material keys instead of a read per item. The valid items are
+        then written in a single state transaction, and one summary entry is
+        logged instead of one per material.
+        
+        Args:
+            materials: Material creation data, as models or dictionaries
+            upsert: Update existing materials with the fields the item sets
+                    instead of reporting a conflict
+            atomic: Write nothing if any item fails
+            
+        Returns:
+            One result per item, in input order, with the item's index,
+            material_number and status: "created", "updated", "failed", or
+            "skipped" for the valid items of a failed atomic batch. Failed
+            items also carry an error with error_code, message and details.
+            
+        Raises:
+            BadRequestError: If the batch could not be written
+        """
+        logger.info(f"Creating {len(materials)} materials in bulk (upsert={upsert}, atomic={atomic})")
+        
+        # Import here to avoid circular import
+        from services.material_service_helpers import (
+            generate_material_number, validate_material_status_transition
+        )
+        
+        results = []
+        valid = []  # (result, creation data) of the items that passed validation
+        seen = set()
+        for index, item in enumerate(materials):
+            result = {"index": index, "material_number": None, "status": None}
+            results.append(result)
+            
+            if isinstance(item, MaterialCreate):
+                # Numbers are generated below; don't change the caller's model
+                material_data = item.model_copy()
+            else:
+                result["material_number"] = item.get("material_number")
+                try:
+                    material_data = MaterialCreate(**item)
+                except PydanticValidationError as e:
+                    fail_result(result, "validation_error", "Invalid material data", {
+                        "validation_errors": {
+                            ".".join(str(loc) for loc in error["loc"]): error["msg"]
+                            for error in e.errors()
+                        }
+                    })
+                    continue
+            
+            if not material_data.material_number:
+                material_data.material_number = generate_material_number(material_data.type)
+            result["material_number"] = material_data.material_number
+            
+            if material_data.material_number in seen:
+                fail_result(result, "conflict",
+                            f"Material number {material_data.material_number} appears more than once in the batch",
+                            {"conflict_reason": "duplicate_in_batch"})
+                continue
+            seen.add(material_data.material_number)
+            valid.append((result, material_data))
+        
+        # One pass over the material keys for the whole batch
+        existing = self.data_layer.existing_numbers(seen)
+        
+        writes = []  # (result, material to save)
+        for result, material_data in valid:
+            number = material_data.material_number
+            if number not in existing:
+                result["status"] = "created"
+                writes.append((result, Material.create_from_create_model(material_data)))
+                continue
+            
+            if not upsert:
+                fail_result(result, "conflict", f"Material with number {number} already exists",
+                            {"conflict_reason": "material_number_exists"})
+                continue
+            
+            material = self.data_layer.get_by_material_number(number)
+            if material is None:
+                # Deleted since the key check
+                result["status"] = "created"
+                writes.append((result, Material.create_from_create_model(material_data)))
+                continue
+            
+            # Only the fields the item sets are updated
+            update_data = MaterialUpdate(**material_data.model_dump(
+                include=material_data.model_fields_set - {"material_number"}
+            ))
+            if (update_data.status is not None and update_data.status != material.status
+                    and not validate_material_status_transition(material.status, update_data.status)):
+                fail_result(result, "validation_error",
+                            f"Invalid status transition from {material.status} to {update_data.status}", {
+                                "current_status": material.status.value,
+                                "requested_status": update_data.status.value,
+                                "reason": "invalid_status_transition"
+                            })
+                continue
+            
+            # The loaded material may be shared with other readers through
+            # the entity cache, so the update is applied to a copy
+            material = material.model_copy(deep=True)
+            material.update_from_update_model(update_data)
+            result["status"] = "updated"
+            writes.append((result, material))
+        
+        failed = sum(1 for result in results if result["status"] == "failed")
+        if atomic and failed:
+            for result, _ in writes:
+                result["status"] = "skipped"
+            writes = []
+        
+        if writes:
+            try:
+                self.data_layer.save_many(material for _, material in writes)
+            except Exception as e:
+                logger.error(f"Unexpected error writing material batch: {str(e)}", exc_info=True)
+                self._log_error(
+                    error_type="unexpected_error",
+                    message=f"Unexpected error creating materials: {str(e)}",
+                    context={
+                        "error_type": type(e).__name__,
+                        "entity_type": "Material",
+                        "operation": "bulk_create",
+                        "batch_size": len(materials)
+                    }
+                )
+                raise BadRequestError(message=f"Failed to create materials: {str(e)}")
+        
+        summary = {
+            status: sum(1 for result in results if result["status"] == status)
+            for status in ("created", "updated", "failed", "skipped")
+        }
+        self._log_error(
+            error_type="info",
+            message=(f"Bulk material request: {summary['created']} created, "
+                     f"{summary['updated']} updated, {summary['failed']} failed"),
+            context={"operation": "bulk_create", "entity_type": "Material",
+                     "batch_size": len(materials), "upsert": upsert, "atomic": atomic, **summary}
+        )
+        
+        return results
+    
     def update_material(self, material_id: str, update_data: Union[MaterialUpdate, MaterialStatus]) -> Material:
         """
         Update a material with business logic validations.
@@ -380,10 +637,8 @@ class MaterialService:
             if updated_material.updated_at <= updated_material.created_at:
                 updated_material.updated_at = updated_material.created_at + timedelta(milliseconds=1)
                 
-                # Update the material in the collection to persist the timestamp change
-                collection = self.data_layer._get_collection()
-                collection.add(updated_material.material_number, updated_material)
-                self.state_manager.set_model(self.data_layer.state_key, collection)
+                # Persist the timestamp change
+                self.data_layer.save(updated_material)
             
             # Log successful update
             updated_fields = [k for k, v in update_data.model_dump(exclude_unset=True).items() if v is not None]
@@ -44,21 +44,25 @@ class MonitorCore:
     def _initialize_state(self) -> None:
         """
         Initialize state for metrics, error logs, and component status if not already present.
+        
+        The initial values are written with update(), which re-checks the
+        key under its lock, so entries added by another thread between the
+        check and the write aren't reset.
         """
         # Initialize metrics list if not present
         if not self.state_manager.get(self.metrics_key):
             logger.info("Initializing metrics state")
-            self.state_manager.set(self.metrics_key, [])
+            self.state_manager.update(self.metrics_key, lambda metrics: metrics or [])
         
         # Initialize error logs list if not present
         if not self.state_manager.get(self.error_logs_key):
             logger.info("Initializing error logs state")
-            self.state_manager.set(self.error_logs_key, [])
+            self.state_manager.update(self.error_logs_key, lambda logs: logs or [])
             
         # Initialize component status dict if not present
         if not self.state_manager.get(self.component_status_key):
             logger.info("Initializing component status state")
-            self.state_manager.set(self.component_status_key, {})
+            self.state_manager.update(self.component_status_key, lambda status: status or {})
     
     def update_component_status(self, component_name: str, status: str, details: Optional[Dict[str, Any]] = None) -> None:
         """
@@ -70,9 +74,6 @@ class MonitorCore:
             details: Additional details about the component status
         """
         logger.info(f"Updating component status: {component_name} -> {status}")
-        # Get current component status
-        component_status = self.state_manager.get(self.component_status_key, {})
-        
         # Create component status entry
         component = {
             "name": component_name,
@@ -81,11 +82,14 @@ class MonitorCore:
             "details": details or {}
         }
         
-        # Store in component status dict
-        component_status[component_name] = component
+        # Store in component status dict, atomically so concurrent status
+        # updates of other components aren't lost
+        def add_component(component_status):
+            component_status = dict(component_status or {})
+            component_status[component_name] = component
+            return component_status
         
-        # Update state
-        self.state_manager.set(self.component_status_key, component_status)
+        self.state_manager.update(self.component_status_key, add_component, {})
         logger.debug(f"Component status updated: {component_name}")
     
     def get_component_status(self, component_name: Optional[str] = None) -> Any:
@@ -134,32 +134,29 @@ class MonitorErrors:
         Args:
             error_log: ErrorLog to store
         """
-        # Get current error logs directly from state manager
-        current_logs = self.state_manager.get(self.error_logs_key, [])
-        if current_logs is None:
-            logger.warning("Error logs state was None, initializing empty list")
-            current_logs = []
-        
-        # Create a copy of the list to avoid modifying the original reference
-        updated_logs = current_logs.copy() if isinstance(current_logs, list) else []
-        
         # Convert error log to dict for storage
         error_log_dict = error_log.to_dict()
         
-        # Add new log to the beginning for easier access to recent logs
-        updated_logs.insert(0, error_log_dict)
-        
-        # Limit size of log history
-        if len(updated_logs) > self.max_error_logs:
-            updated_logs = updated_logs[:self.max_error_logs]
-        
-        # Save updated logs in state
-        self.state_manager.set(self.error_logs_key, updated_logs)
-        
-        # Verify storage succeeded
-        stored_logs = self.state_manager.get(self.error_logs_key, [])
-        log_count = len(stored_logs) if stored_logs else 0
-        logger.debug(f"Stored error log, now have {log_count} records")
+        def add_log(current_logs):
+            if current_logs is None:
+                logger.warning("Error logs state was None, initializing empty list")
+                current_logs = []
+            
+            # Create a copy of the list to avoid modifying the original reference
+            updated_logs = current_logs.copy() if isinstance(current_logs, list) else []
+            
+            # Add new log to the beginning for easier access to recent logs
+            updated_logs.insert(0, error_log_dict)
+            
+            # Limit size of log history
+            if len(updated_logs) > self.max_error_logs:
+                updated_logs = updated_logs[:self.max_error_logs]
+            return updated_logs
+        
+        # Read, extend and save the logs as one atomic update, so concurrent
+        # requests logging errors don't overwrite each other's entries
+        stored_logs = self.state_manager.update(self.error_logs_key, add_log, [])
+        logger.debug(f"Stored error log, now have {len(stored_logs)} records")
     
     def get_error_logs(self, 
                        error_type: Optional[str] = None, 
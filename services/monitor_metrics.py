@@ -137,23 +137,21 @@ class MonitorMetrics:
         Args:
             metrics: SystemMetrics to store
         """
-        # Get current metrics
-        current_metrics = self.state_manager.get(self.metrics_key, [])
-        if current_metrics is None:
-            current_metrics = []
-        
-        # Add new metrics
-        current_metrics.append(metrics.to_dict())
-        
-        # Prune old metrics
         cutoff_time = datetime.now() - timedelta(hours=self.metrics_max_age_hours)
-        current_metrics = [
-            m for m in current_metrics 
-            if datetime.fromisoformat(m["timestamp"]) > cutoff_time
-        ]
         
-        # Save updated metrics
-        self.state_manager.set(self.metrics_key, current_metrics)
+        def add_metrics(current_metrics):
+            if current_metrics is None:
+                current_metrics = []
+            
+            # Add new metrics and prune old ones
+            current_metrics = current_metrics + [metrics.to_dict()]
+            return [
+                m for m in current_metrics 
+                if datetime.fromisoformat(m["timestamp"]) > cutoff_time
+            ]
+        
+        # Save updated metrics as one atomic read-modify-write
+        current_metrics = self.state_manager.update(self.metrics_key, add_metrics, [])
         logger.debug(f"Stored metrics, now have {len(current_metrics)} records")
     
     def get_metrics(self, hours: Optional[int] = None) -> List[SystemMetrics]:
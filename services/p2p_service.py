@@ -1,5 +1,5 @@
 # services/p2p_service.py
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Union, Iterator, Iterable, Callable
 from datetime import datetime, date
 
 from models.p2p import (
@@ -12,14 +12,14 @@ from models.material import MaterialStatus
 from services.state_manager import state_manager
 from services.material_service import get_material_service
 from services.p2p_service_helpers import (
-    validate_material_active, prepare_received_items, 
+    validate_item_materials, prepare_received_items, 
     determine_order_status_from_items, append_note
 )
 from services.p2p_service_order import (
     validate_order_for_submission, validate_order_for_approval,
     validate_order_for_receipt, validate_order_for_completion,
     validate_order_for_cancellation, validate_order_for_deletion,
-    prepare_order_update_with_received_items, filter_orders
+    validate_order_for_update, prepare_order_update_with_received_items, filter_orders
 )
 from services.p2p_service_requisition import (
     validate_requisition_for_submission, validate_requisition_for_approval,
@@ -27,7 +27,12 @@ from services.p2p_service_requisition import (
     validate_requisition_for_update, validate_requisition_for_order_creation,
     prepare_rejection_update, filter_requisitions
 )
-from utils.error_utils import NotFoundError, ValidationError, ConflictError, BadRequestError
+from services.p2p_service_import import DocumentImporter, ImportReport, IMPORT_CHUNK_SIZE
+from utils.error_utils import NotFoundError, ValidationError, ConflictError, BadRequestError, fail_result
+
+# Workflow actions a batch transition can apply
+REQUISITION_BATCH_ACTIONS = ("submit", "approve", "reject")
+ORDER_BATCH_ACTIONS = ("submit", "approve", "receive", "complete", "cancel")
 
 class P2PService:
     """
@@ -80,7 +85,9 @@ class P2PService:
                           department: Optional[str] = None,
                           search_term: Optional[str] = None,
                           date_from: Optional[datetime] = None,
-                          date_to: Optional[datetime] = None) -> List[Requisition]:
+                          date_to: Optional[datetime] = None,
+                          sort: Optional[str] = None,
+                          descending: bool = False) -> List[Requisition]:
         """
         List requisitions with optional filtering.
         
@@ -91,21 +98,167 @@ class P2PService:
             search_term: Optional search term to filter by
             date_from: Optional start date for creation date range
             date_to: Optional end date for creation date range
+            sort: Optional field to sort by, one of P2PDataLayer.SORT_FIELDS
+            descending: Sort in descending instead of ascending order
             
         Returns:
             List of requisitions matching the criteria
+            
+        Raises:
+            ValidationError: If the sort field is unknown
         """
-        # Get all requisitions and use the filter helper
-        all_requisitions = self.data_layer.list_requisitions()
-        return filter_requisitions(
-            all_requisitions,
-            status=status,
-            requester=requester,
-            department=department,
-            search_term=search_term,
+        if sort or descending:
+            # Walk the sort field's index instead of sorting the results
+            return self.list_requisitions_page(
+                None, status=status, requester=requester, department=department,
+                search_term=search_term, date_from=date_from, date_to=date_to,
+                sort=sort, descending=descending
+            ).items
+        
+        # Narrow down by the indexed fields before loading any requisition,
+        # then apply the remaining filters to the candidates
+        indexed_filters = {
+            field: value for field, value in (
+                ("status", status), ("requester", requester), ("department", department)
+            ) if value
+        }
+        candidates = self.data_layer.filter_requisitions(
             date_from=date_from,
-            date_to=date_to
+            date_to=date_to,
+            **indexed_filters
         )
+        return filter_requisitions(candidates, search_term=search_term)
+    
+    def list_requisitions_page(self,
+                               limit: Optional[int],
+                               cursor: Optional[str] = None,
+                               status: Optional[Union[DocumentStatus, List[DocumentStatus]]] = None,
+                               requester: Optional[str] = None,
+                               department: Optional[str] = None,
+                               search_term: Optional[str] = None,
+                               date_from: Optional[datetime] = None,
+                               date_to: Optional[datetime] = None,
+                               sort: Optional[str] = None,
+                               descending: bool = False):
+        """
+        List one page of requisitions, ordered by document number unless another
+        sort field is given.
+        
+        Args:
+            limit: Maximum number of requisitions on the page, None for all
+            cursor: next_cursor of the previous page, None for the first page
+            status: Optional status(es) to filter by
+            requester: Optional requester to filter by
+            department: Optional department to filter by
+            search_term: Optional search term to filter by
+            date_from: Optional start date for creation date range
+            date_to: Optional end date for creation date range
+            sort: Optional field to sort by, one of P2PDataLayer.SORT_FIELDS
+            descending: Sort in descending instead of ascending order
+            
+        Returns:
+            Page of requisitions with the cursor of the next page
+            
+        Raises:
+            ValidationError: If the sort field or the cursor is invalid
+        """
+        indexed_filters, match = self._requisition_listing(status, requester, department, search_term)
+        try:
+            return self.data_layer.page_requisitions(
+                limit,
+                cursor,
+                date_from=date_from,
+                date_to=date_to,
+                match=match,
+                sort=sort or "document_number",
+                descending=descending,
+                **indexed_filters
+            )
+        except ValueError as e:
+            raise ValidationError(str(e), details={"cursor": cursor, "sort": sort})
+    
+    def iter_requisitions(self,
+                          status: Optional[Union[DocumentStatus, List[DocumentStatus]]] = None,
+                          requester: Optional[str] = None,
+                          department: Optional[str] = None,
+                          search_term: Optional[str] = None,
+                          date_from: Optional[datetime] = None,
+                          date_to: Optional[datetime] = None,
+                          sort: Optional[str] = None,
+                          descending: bool = False,
+                          cursor: Optional[str] = None) -> Iterator[Requisition]:
+        """
+        Iterate over the requisitions list_requisitions_page() would list,
+        loading one at a time, for streaming responses and exports.
+        
+        Args:
+            status: Optional status(es) to filter by
+            requester: Optional requester to filter by
+            department: Optional department to filter by
+            search_term: Optional search term to filter by
+            date_from: Optional start date for creation date range
+            date_to: Optional end date for creation date range
+            sort: Optional field to sort by, one of P2PDataLayer.SORT_FIELDS
+            descending: Sort in descending instead of ascending order
+            cursor: Optional next_cursor of a page to continue after
+            
+        Returns:
+            Iterator over the matching requisitions
+            
+        Raises:
+            ValidationError: If the sort field or the cursor is invalid
+        """
+        indexed_filters, match = self._requisition_listing(status, requester, department, search_term)
+        try:
+            return self.data_layer.iterate_requisitions(
+                cursor,
+                date_from=date_from,
+                date_to=date_to,
+                match=match,
+                sort=sort or "document_number",
+                descending=descending,
+                **indexed_filters
+            )
+        except ValueError as e:
+            raise ValidationError(str(e), details={"cursor": cursor, "sort": sort})
+    
+    def _requisition_listing(self, status, requester, department, search_term):
+        """Split requisition list filters into indexed criteria and a check for the rest"""
+        indexed_filters = {
+            field: value for field, value in (
+                ("status", status), ("requester", requester), ("department", department)
+            ) if value
+        }
+        match = None
+        if search_term:
+            match = lambda document: bool(filter_requisitions([document], search_term=search_term))
+        return indexed_filters, match
+    
+    def count_requisitions(self, date_from: Optional[datetime] = None,
+                           date_to: Optional[datetime] = None) -> int:
+        """
+        Count requisitions, optionally only those created within a date range.
+        
+        Args:
+            date_from: Optional start date for creation date range
+            date_to: Optional end date for creation date range
+            
+        Returns:
+            Number of requisitions
+        """
+        return self.data_layer.count_requisitions(date_from=date_from, date_to=date_to)
+    
+    def get_recent_requisitions(self, limit: int = 10) -> List[Requisition]:
+        """
+        Get the most recently created requisitions.
+        
+        Args:
+            limit: Maximum number of requisitions to return
+            
+        Returns:
+            List of requisitions, newest first
+        """
+        return self.data_layer.newest_requisitions(limit)
     
     def create_requisition(self, requisition_data: RequisitionCreate) -> Requisition:
         """
@@ -122,20 +275,7 @@ class P2PService:
             ConflictError: If a requisition with the same number already exists
         """
         # Validate material references in items if provided
-        for item in requisition_data.items:
-            if item.material_number:
-                try:
-                    validate_material_active(self.material_service, item.material_number)
-                except ValidationError as e:
-                    # Enhance error with item context
-                    raise ValidationError(
-                        message=f"Invalid material in item {item.item_number}: {e.message}",
-                        details={
-                            "item_number": item.item_number,
-                            "material_number": item.material_number,
-                            "original_error": e.details if hasattr(e, 'details') else {}
-                        }
-                    )
+        self._validate_item_materials(requisition_data.items)
         
         # Create the requisition
         try:
@@ -151,13 +291,17 @@ class P2PService:
                 }
             )
     
-    def update_requisition(self, document_number: str, update_data: RequisitionUpdate) -> Requisition:
+    def update_requisition(self, document_number: str, update_data: RequisitionUpdate,
+                           validate_materials: bool = True) -> Requisition:
         """
         Update a requisition with business logic validations.
         
         Args:
             document_number: The requisition document number
             update_data: The requisition update data
+            validate_materials: Validate the materials of the items given;
+                                workflow actions turn this off, as they keep
+                                the materials as ordered
             
         Returns:
             The updated requisition
@@ -179,6 +323,10 @@ class P2PService:
                 details=e.details if hasattr(e, 'details') else {}
             )
         
+        # Validate material references of replaced items
+        if validate_materials and update_data.items is not None:
+            self._validate_item_materials(update_data.items)
+        
         # Update the requisition
         updated_requisition = self.data_layer.update_requisition(document_number, update_data)
         if not updated_requisition:
@@ -252,18 +400,9 @@ class P2PService:
         # Check if requisition exists
         requisition = self.get_requisition(document_number)
         
-        # Validate the requisition can be submitted
-        try:
-            validate_requisition_for_submission(requisition)
-        except ValidationError as e:
-            raise ValidationError(
-                message=f"Cannot submit requisition {document_number}: {e.message}",
-                details=e.details if hasattr(e, 'details') else {}
-            )
-        
-        # Update status to SUBMITTED
-        update_data = RequisitionUpdate(status=DocumentStatus.SUBMITTED)
-        return self.update_requisition(document_number, update_data)
+        # Validate the submission and prepare the update
+        update_data = self._submit_requisition_update(requisition)
+        return self.update_requisition(document_number, update_data, validate_materials=False)
     
     def approve_requisition(self, document_number: str) -> Requisition:
         """
@@ -282,18 +421,9 @@ class P2PService:
         # Check if requisition exists
         requisition = self.get_requisition(document_number)
         
-        # Validate the requisition can be approved
-        try:
-            validate_requisition_for_approval(requisition)
-        except ValidationError as e:
-            raise ValidationError(
-                message=f"Cannot approve requisition {document_number}: {e.message}",
-                details=e.details if hasattr(e, 'details') else {}
-            )
-        
-        # Update status to APPROVED
-        update_data = RequisitionUpdate(status=DocumentStatus.APPROVED)
-        return self.update_requisition(document_number, update_data)
+        # Validate the approval and prepare the update
+        update_data = self._approve_requisition_update(requisition)
+        return self.update_requisition(document_number, update_data, validate_materials=False)
     
     def reject_requisition(self, document_number: str, reason: str) -> Requisition:
         """
@@ -313,18 +443,9 @@ class P2PService:
         # Check if requisition exists
         requisition = self.get_requisition(document_number)
         
-        # Validate the requisition can be rejected
-        try:
-            validate_requisition_for_rejection(requisition, reason)
-        except ValidationError as e:
-            raise ValidationError(
-                message=f"Cannot reject requisition {document_number}: {e.message}",
-                details=e.details if hasattr(e, 'details') else {}
-            )
-        
-        # Prepare and apply the update
-        update_data = prepare_rejection_update(requisition, reason)
-        return self.update_requisition(document_number, update_data)
+        # Validate the rejection and prepare the update
+        update_data = self._reject_requisition_update(requisition, reason)
+        return self.update_requisition(document_number, update_data, validate_materials=False)
     
     # ===== Order Core Methods (CRUD) =====
     
@@ -358,7 +479,9 @@ class P2PService:
                     requisition_reference: Optional[str] = None,
                     search_term: Optional[str] = None,
                     date_from: Optional[datetime] = None,
-                    date_to: Optional[datetime] = None) -> List[Order]:
+                    date_to: Optional[datetime] = None,
+                    sort: Optional[str] = None,
+                    descending: bool = False) -> List[Order]:
         """
         List orders with optional filtering.
         
@@ -369,21 +492,167 @@ class P2PService:
             search_term: Optional search term to filter by
             date_from: Optional start date for creation date range
             date_to: Optional end date for creation date range
+            sort: Optional field to sort by, one of P2PDataLayer.SORT_FIELDS
+            descending: Sort in descending instead of ascending order
             
         Returns:
             List of orders matching the criteria
+            
+        Raises:
+            ValidationError: If the sort field is unknown
         """
-        # Get all orders and use the filter helper
-        all_orders = self.data_layer.list_orders()
-        return filter_orders(
-            all_orders,
-            status=status,
-            vendor=vendor,
-            requisition_reference=requisition_reference,
-            search_term=search_term,
+        if sort or descending:
+            # Walk the sort field's index instead of sorting the results
+            return self.list_orders_page(
+                None, status=status, vendor=vendor, requisition_reference=requisition_reference,
+                search_term=search_term, date_from=date_from, date_to=date_to,
+                sort=sort, descending=descending
+            ).items
+        
+        # Narrow down by the indexed fields before loading any order, then
+        # apply the remaining filters to the candidates
+        indexed_filters = {
+            field: value for field, value in (
+                ("status", status), ("vendor", vendor), ("requisition_reference", requisition_reference)
+            ) if value
+        }
+        candidates = self.data_layer.filter_orders(
             date_from=date_from,
-            date_to=date_to
+            date_to=date_to,
+            **indexed_filters
         )
+        return filter_orders(candidates, search_term=search_term)
+    
+    def list_orders_page(self,
+                         limit: Optional[int],
+                         cursor: Optional[str] = None,
+                         status: Optional[Union[DocumentStatus, List[DocumentStatus]]] = None,
+                         vendor: Optional[str] = None,
+                         requisition_reference: Optional[str] = None,
+                         search_term: Optional[str] = None,
+                         date_from: Optional[datetime] = None,
+                         date_to: Optional[datetime] = None,
+                         sort: Optional[str] = None,
+                         descending: bool = False):
+        """
+        List one page of orders, ordered by document number unless another
+        sort field is given.
+        
+        Args:
+            limit: Maximum number of orders on the page, None for all
+            cursor: next_cursor of the previous page, None for the first page
+            status: Optional status(es) to filter by
+            vendor: Optional vendor to filter by
+            requisition_reference: Optional requisition reference to filter by
+            search_term: Optional search term to filter by
+            date_from: Optional start date for creation date range
+            date_to: Optional end date for creation date range
+            sort: Optional field to sort by, one of P2PDataLayer.SORT_FIELDS
+            descending: Sort in descending instead of ascending order
+            
+        Returns:
+            Page of orders with the cursor of the next page
+            
+        Raises:
+            ValidationError: If the sort field or the cursor is invalid
+        """
+        indexed_filters, match = self._order_listing(status, vendor, requisition_reference, search_term)
+        try:
+            return self.data_layer.page_orders(
+                limit,
+                cursor,
+                date_from=date_from,
+                date_to=date_to,
+                match=match,
+                sort=sort or "document_number",
+                descending=descending,
+                **indexed_filters
+            )
+        except ValueError as e:
+            raise ValidationError(str(e), details={"cursor": cursor, "sort": sort})
+    
+    def iter_orders(self,
+                    status: Optional[Union[DocumentStatus, List[DocumentStatus]]] = None,
+                    vendor: Optional[str] = None,
+                    requisition_reference: Optional[str] = None,
+                    search_term: Optional[str] = None,
+                    date_from: Optional[datetime] = None,
+                    date_to: Optional[datetime] = None,
+                    sort: Optional[str] = None,
+                    descending: bool = False,
+                    cursor: Optional[str] = None) -> Iterator[Order]:
+        """
+        Iterate over the orders list_orders_page() would list, loading one
+        at a time, for streaming responses and exports.
+        
+        Args:
+            status: Optional status(es) to filter by
+            vendor: Optional vendor to filter by
+            requisition_reference: Optional requisition reference to filter by
+            search_term: Optional search term to filter by
+            date_from: Optional start date for creation date range
+            date_to: Optional end date for creation date range
+            sort: Optional field to sort by, one of P2PDataLayer.SORT_FIELDS
+            descending: Sort in descending instead of ascending order
+            cursor: Optional next_cursor of a page to continue after
+            
+        Returns:
+            Iterator over the matching orders
+            
+        Raises:
+            ValidationError: If the sort field or the cursor is invalid
+        """
+        indexed_filters, match = self._order_listing(status, vendor, requisition_reference, search_term)
+        try:
+            return self.data_layer.iterate_orders(
+                cursor,
+                date_from=date_from,
+                date_to=date_to,
+                match=match,
+                sort=sort or "document_number",
+                descending=descending,
+                **indexed_filters
+            )
+        except ValueError as e:
+            raise ValidationError(str(e), details={"cursor": cursor, "sort": sort})
+    
+    def _order_listing(self, status, vendor, requisition_reference, search_term):
+        """Split order list filters into indexed criteria and a check for the rest"""
+        indexed_filters = {
+            field: value for field, value in (
+                ("status", status), ("vendor", vendor), ("requisition_reference", requisition_reference)
+            ) if value
+        }
+        match = None
+        if search_term:
+            match = lambda document: bool(filter_orders([document], search_term=search_term))
+        return indexed_filters, match
+    
+    def count_orders(self, date_from: Optional[datetime] = None,
+                     date_to: Optional[datetime] = None) -> int:
+        """
+        Count orders, optionally only those created within a date range.
+        
+        Args:
+            date_from: Optional start date for creation date range
+            date_to: Optional end date for creation date range
+            
+        Returns:
+            Number of orders
+        """
+        return self.data_layer.count_orders(date_from=date_from, date_to=date_to)
+    
+    def get_recent_orders(self, limit: int = 10) -> List[Order]:
+        """
+        Get the most recently created orders.
+        
+        Args:
+            limit: Maximum number of orders to return
+            
+        Returns:
+            List of orders, newest first
+        """
+        return self.data_layer.newest_orders(limit)
     
     def create_order(self, order_data: OrderCreate) -> Order:
         """
@@ -400,20 +669,7 @@ class P2PService:
             ConflictError: If an order with the same number already exists
         """
         # Validate materials in items
-        for item in order_data.items:
-            if item.material_number:
-                try:
-                    validate_material_active(self.material_service, item.material_number)
-                except ValidationError as e:
-                    # Enhance error with item context
-                    raise ValidationError(
-                        message=f"Invalid material in item {item.item_number}: {e.message}",
-                        details={
-                            "item_number": item.item_number,
-                            "material_number": item.material_number,
-                            "original_error": e.details if hasattr(e, 'details') else {}
-                        }
-                    )
+        self._validate_item_materials(order_data.items)
         
         # Create the order
         try:
@@ -429,13 +685,17 @@ class P2PService:
                 }
             )
     
-    def update_order(self, document_number: str, update_data: OrderUpdate) -> Order:
+    def update_order(self, document_number: str, update_data: OrderUpdate,
+                     validate_materials: bool = True) -> Order:
         """
         Update an order with business logic validations.
         
         Args:
             document_number: The order document number
             update_data: The order update data
+            validate_materials: Validate the materials of the items given;
+                                workflow actions turn this off, as they keep
+                                the materials as ordered
             
         Returns:
             The updated order
@@ -447,19 +707,12 @@ class P2PService:
         # Get the order
         order = self.get_order(document_number)
         
-        # Check if we're updating items after submission
-        if (order.status != DocumentStatus.DRAFT and 
-            update_data.items is not None and 
-            update_data.status is None):  # Allow status updates
-            raise ValidationError(
-                message="Cannot update items after order is submitted",
-                details={
-                    "document_number": document_number,
-                    "current_status": order.status.value,
-                    "attempted_update": "items",
-                    "reason": "items_locked_after_submission"
-                }
-            )
+        # Validate the update
+        validate_order_for_update(order, update_data)
+        
+        # Validate material references of replaced items
+        if validate_materials and update_data.items is not None:
+            self._validate_item_materials(update_data.items)
         
         # Update the order
         updated_order = self.data_layer.update_order(document_number, update_data)
@@ -586,18 +839,9 @@ class P2PService:
         # Check if order exists
         order = self.get_order(document_number)
         
-        # Validate the order for submission
-        try:
-            validate_order_for_submission(order)
-        except ValidationError as e:
-            raise ValidationError(
-                message=f"Cannot submit order {document_number}: {e.message}",
-                details=e.details if hasattr(e, 'details') else {}
-            )
-        
-        # Update status to SUBMITTED
-        update_data = OrderUpdate(status=DocumentStatus.SUBMITTED)
-        return self.update_order(document_number, update_data)
+        # Validate the submission and prepare the update
+        update_data = self._submit_order_update(order)
+        return self.update_order(document_number, update_data, validate_materials=False)
     
     def approve_order(self, document_number: str) -> Order:
         """
@@ -616,18 +860,9 @@ class P2PService:
         # Check if order exists
         order = self.get_order(document_number)
         
-        # Validate the order for approval
-        try:
-            validate_order_for_approval(order)
-        except ValidationError as e:
-            raise ValidationError(
-                message=f"Cannot approve order {document_number}: {e.message}",
-                details=e.details if hasattr(e, 'details') else {}
-            )
-        
-        # Update status to APPROVED
-        update_data = OrderUpdate(status=DocumentStatus.APPROVED)
-        return self.update_order(document_number, update_data)
+        # Validate the approval and prepare the update
+        update_data = self._approve_order_update(order)
+        return self.update_order(document_number, update_data, validate_materials=False)
     
     def receive_order(self, document_number: str, 
                       received_items: Dict[int, float] = None) -> Order:
@@ -649,12 +884,143 @@ class P2PService:
         # Check if order exists
         order = self.get_order(document_number)
         
+        # Validate the receipt and prepare the update
+        update_data = self._receive_order_update(order, received_items)
+        return self.update_order(document_number, update_data, validate_materials=False)
+    
+    def complete_order(self, document_number: str) -> Order:
+        """
+        Mark an order as completed.
+        
+        Args:
+            document_number: The order document number
+            
+        Returns:
+            The updated order
+            
+        Raises:
+            NotFoundError: If the order is not found
+            ValidationError: If the order cannot be completed
+        """
+        # Check if order exists
+        order = self.get_order(document_number)
+        
+        # Validate the completion and prepare the update
+        update_data = self._complete_order_update(order)
+        return self.update_order(document_number, update_data, validate_materials=False)
+    
+    def cancel_order(self, document_number: str, reason: str) -> Order:
+        """
+        Cancel an order.
+        
+        Args:
+            document_number: The order document number
+            reason: The reason for cancellation
+            
+        Returns:
+            The updated order
+            
+        Raises:
+            NotFoundError: If the order is not found
+            ValidationError: If the order cannot be canceled
+        """
+        # Check if order exists
+        order = self.get_order(document_number)
+        
+        # Validate the cancellation and prepare the update
+        update_data = self._cancel_order_update(order, reason)
+        return self.update_order(document_number, update_data, validate_materials=False)
+
+    # ===== Item Validation =====
+    
+    def _validate_item_materials(self, items: List[Union[RequisitionItem, OrderItem]]) -> None:
+        """Validate the materials of document items, looking them all up at once"""
+        material_statuses = self.material_service.get_materials_status(
+            item.material_number for item in items if item.material_number
+        )
+        validate_item_materials(items, material_statuses)
+
+    # ===== Workflow Updates =====
+    
+    def _submit_requisition_update(self, requisition: Requisition) -> RequisitionUpdate:
+        """Validate that a requisition can be submitted and get the update submitting it"""
+        # Validate the requisition can be submitted
+        try:
+            validate_requisition_for_submission(requisition)
+        except ValidationError as e:
+            raise ValidationError(
+                message=f"Cannot submit requisition {requisition.document_number}: {e.message}",
+                details=e.details if hasattr(e, 'details') else {}
+            )
+        
+        # Update status to SUBMITTED
+        return RequisitionUpdate(status=DocumentStatus.SUBMITTED)
+    
+    def _approve_requisition_update(self, requisition: Requisition) -> RequisitionUpdate:
+        """Validate that a requisition can be approved and get the update approving it"""
+        # Validate the requisition can be approved
+        try:
+            validate_requisition_for_approval(requisition)
+        except ValidationError as e:
+            raise ValidationError(
+                message=f"Cannot approve requisition {requisition.document_number}: {e.message}",
+                details=e.details if hasattr(e, 'details') else {}
+            )
+        
+        # Update status to APPROVED
+        return RequisitionUpdate(status=DocumentStatus.APPROVED)
+    
+    def _reject_requisition_update(self, requisition: Requisition, reason: str) -> RequisitionUpdate:
+        """Validate that a requisition can be rejected and get the update rejecting it"""
+        # Validate the requisition can be rejected
+        try:
+            validate_requisition_for_rejection(requisition, reason)
+        except ValidationError as e:
+            raise ValidationError(
+                message=f"Cannot reject requisition {requisition.document_number}: {e.message}",
+                details=e.details if hasattr(e, 'details') else {}
+            )
+        
+        # Prepare the update
+        return prepare_rejection_update(requisition, reason)
+    
+    def _submit_order_update(self, order: Order) -> OrderUpdate:
+        """Validate that an order can be submitted and get the update submitting it"""
+        # Validate the order for submission
+        try:
+            validate_order_for_submission(order)
+        except ValidationError as e:
+            raise ValidationError(
+                message=f"Cannot submit order {order.document_number}: {e.message}",
+                details=e.details if hasattr(e, 'details') else {}
+            )
+        
+        # Update status to SUBMITTED
+        return OrderUpdate(status=DocumentStatus.SUBMITTED)
+    
+    def _approve_order_update(self, order: Order) -> OrderUpdate:
+        """Validate that an order can be approved and get the update approving it"""
+        # Validate the order for approval
+        try:
+            validate_order_for_approval(order)
+        except ValidationError as e:
+            raise ValidationError(
+                message=f"Cannot approve order {order.document_number}: {e.message}",
+                details=e.details if hasattr(e, 'details') else {}
+            )
+        
+        # Update status to APPROVED
+        return OrderUpdate(status=DocumentStatus.APPROVED)
+    
+    def _receive_order_update(self, order: Order,
+                              received_items: Dict[int, float] = None) -> OrderUpdate:
+        """Validate a receipt of an order and get the update recording it"""
         # Validate the order for receipt
         try:
             validate_order_for_receipt(order)
         except ValidationError as e:
             raise ValidationError(
-                message=f"Cannot receive order {document_number}: {e.message}",
+                message=f"Cannot receive order {order.document_number}: {e.message}",
                 details=e.details if hasattr(e, 'details') else {}
             )
         
@@ -666,9 +1032,9 @@ class P2PService:
             
             if unknown_items:
                 raise ValidationError(
-                    message=f"Order {document_number} contains unknown item numbers",
+                    message=f"Order {order.document_number} contains unknown item numbers",
                     details={
-                        "document_number": document_number,
+                        "document_number": order.document_number,
                         "unknown_items": unknown_items,
                         "valid_items": order_item_numbers,
                         "reason": "unknown_item_numbers"
@@ -681,7 +1047,7 @@ class P2PService:
                 raise ValidationError(
                     message="Received quantities cannot be negative",
                     details={
-                        "document_number": document_number,
+                        "document_number": order.document_number,
                         "negative_quantities": negative_quantities,
                         "reason": "negative_quantities"
                     }
@@ -694,7 +1060,7 @@ class P2PService:
                         raise ValidationError(
                             message=f"Received quantity exceeds remaining quantity for item {item.item_number}",
                             details={
-                                "document_number": document_number,
+                                "document_number": order.document_number,
                                 "item_number": item.item_number,
                                 "ordered_quantity": item.quantity,
                                 "already_received": item.received_quantity,
@@ -704,64 +1070,31 @@ class P2PService:
                             }
                         )
         
-        # Prepare and apply the update
-        update_data = prepare_order_update_with_received_items(order, received_items)
-        return self.update_order(document_number, update_data)
+        # Prepare the update
+        return prepare_order_update_with_received_items(order, received_items)
     
-    def complete_order(self, document_number: str) -> Order:
-        """
-        Mark an order as completed.
-        
-        Args:
-            document_number: The order document number
-            
-        Returns:
-            The updated order
-            
-        Raises:
-            NotFoundError: If the order is not found
-            ValidationError: If the order cannot be completed
-        """
-        # Check if order exists
-        order = self.get_order(document_number)
-        
+    def _complete_order_update(self, order: Order) -> OrderUpdate:
+        """Validate that an order can be completed and get the update completing it"""
         # Validate the order for completion
         try:
             validate_order_for_completion(order)
         except ValidationError as e:
             raise ValidationError(
-                message=f"Cannot complete order {document_number}: {e.message}",
+                message=f"Cannot complete order {order.document_number}: {e.message}",
                 details=e.details if hasattr(e, 'details') else {}
             )
         
         # Update status to COMPLETED
-        update_data = OrderUpdate(status=DocumentStatus.COMPLETED)
-        return self.update_order(document_number, update_data)
+        return OrderUpdate(status=DocumentStatus.COMPLETED)
     
-    def cancel_order(self, document_number: str, reason: str) -> Order:
-        """
-        Cancel an order.
-        
-        Args:
-            document_number: The order document number
-            reason: The reason for cancellation
-            
-        Returns:
-            The updated order
-            
-        Raises:
-            NotFoundError: If the order is not found
-            ValidationError: If the order cannot be canceled
-        """
-        # Check if order exists
-        order = self.get_order(document_number)
-        
+    def _cancel_order_update(self, order: Order, reason: str) -> OrderUpdate:
+        """Validate that an order can be canceled and get the update canceling it"""
         # Validate the order for cancellation
         try:
             validate_order_for_cancellation(order)
         except ValidationError as e:
             raise ValidationError(
-                message=f"Cannot cancel order {document_number}: {e.message}",
+                message=f"Cannot cancel order {order.document_number}: {e.message}",
                 details=e.details if hasattr(e, 'details') else {}
             )
         
@@ -770,7 +1103,7 @@ class P2PService:
             raise ValidationError(
                 message="Cancellation reason must be provided",
                 details={
-                    "document_number": document_number,
+                    "document_number": order.document_number,
                     "error": "missing_cancellation_reason",
                     "operation": "cancel"
                 }
@@ -779,11 +1112,240 @@ class P2PService:
         # Update status to CANCELED and add cancellation reason to notes
         new_notes = append_note(order.notes, f"CANCELED: {reason}")
         
-        update_data = OrderUpdate(
+        return OrderUpdate(
             status=DocumentStatus.CANCELED,
             notes=new_notes
         )
-        return self.update_order(document_number, update_data)
+
+    # ===== Bulk Operations =====
+    
+    def create_importer(self, kind: str, import_format: str,
+                        chunk_size: int = IMPORT_CHUNK_SIZE,
+                        progress: Optional[Callable[[ImportReport], None]] = None) -> DocumentImporter:
+        """
+        Start a streaming import of requisitions or orders.
+        
+        Feed the importer the body line by line with feed() and call
+        finish() at the end; documents are validated and written in chunks
+        as the lines arrive.
+        
+        Args:
+            kind: "requisitions" or "orders"
+            import_format: "ndjson" (one document per line) or "csv" (one
+                           row per item, see services.p2p_service_csv)
+            chunk_size: Documents validated and written per transaction
+            progress: Optional callback receiving the report after each chunk
+            
+        Returns:
+            The importer
+            
+        Raises:
+            ValidationError: If the kind, format or chunk size is invalid
+        """
+        return DocumentImporter(self, kind, import_format, chunk_size=chunk_size, progress=progress)
+    
+    def import_documents(self, lines: Iterable[str], kind: str, import_format: str,
+                         chunk_size: int = IMPORT_CHUNK_SIZE,
+                         progress: Optional[Callable[[ImportReport], None]] = None) -> ImportReport:
+        """
+        Import requisitions or orders from the lines of an NDJSON or CSV body.
+        
+        Args:
+            lines: Lines of the body, e.g. an open text file
+            kind: "requisitions" or "orders"
+            import_format: "ndjson" or "csv"
+            chunk_size: Documents validated and written per transaction
+            progress: Optional callback receiving the report after each chunk
+            
+        Returns:
+            The import report
+            
+        Raises:
+            ValidationError: If the kind, format or chunk size is invalid
+            BadRequestError: If writing a chunk fails; the chunks written
+                             before it stay imported
+        """
+        importer = self.create_importer(kind, import_format, chunk_size=chunk_size, progress=progress)
+        for line in lines:
+            importer.feed(line.rstrip("\n"))
+        return importer.finish()
+    
+    def transition_requisitions(self, action: str, document_numbers: List[str],
+                                reason: Optional[str] = None,
+                                atomic: bool = False) -> List[Dict[str, Any]]:
+        """
+        Apply a workflow action to several requisitions at once.
+        
+        Each requisition is validated as submit_requisition(),
+        approve_requisition() or reject_requisition() would validate it, and
+        the requisitions that pass are written in one state transaction.
+        
+        Args:
+            action: "submit", "approve" or "reject"
+            document_numbers: The requisition document numbers
+            reason: The reason for rejection
+            atomic: Change nothing if any requisition fails
+            
+        Returns:
+            One result per document number, see _transition_documents()
+            
+        Raises:
+            ValidationError: If the action is unknown
+            BadRequestError: If the batch could not be written
+        """
+        if action not in REQUISITION_BATCH_ACTIONS:
+            raise ValidationError(
+                message=f"Unknown requisition action: {action}",
+                details={"action": action, "allowed": list(REQUISITION_BATCH_ACTIONS)}
+            )
+        
+        def prepare(requisition: Requisition) -> Requisition:
+            if action == "submit":
+                update_data = self._submit_requisition_update(requisition)
+            elif action == "approve":
+                update_data = self._approve_requisition_update(requisition)
+            else:
+                update_data = self._reject_requisition_update(requisition, reason)
+            # Same checks as update_requisition()
+            validate_requisition_for_update(requisition, update_data)
+            return self.data_layer.apply_requisition_update(requisition, update_data)
+        
+        return self._transition_documents(document_numbers, self.get_requisition, prepare,
+                                          self.data_layer.save_requisitions, atomic)
+    
+    def transition_orders(self, action: str, document_numbers: List[str],
+                          reason: Optional[str] = None,
+                          received_items: Optional[Dict[str, Dict[int, float]]] = None,
+                          atomic: bool = False) -> List[Dict[str, Any]]:
+        """
+        Apply a workflow action to several orders at once.
+        
+        Each order is validated as submit_order(), approve_order(),
+        receive_order(), complete_order() or cancel_order() would validate
+        it, including the checks of update_order(), and the orders that
+        pass are written in one state transaction.
+        
+        Args:
+            action: "submit", "approve", "receive", "complete" or "cancel"
+            document_numbers: The order document numbers
+            reason: The reason for cancellation
+            received_items: For "receive", item numbers to received quantities
+                            per order; orders left out are received in full
+            atomic: Change nothing if any order fails
+            
+        Returns:
+            One result per document number, see _transition_documents()
+            
+        Raises:
+            ValidationError: If the action is unknown, or received_items is
+                             given for another action or for orders outside
+                             the batch
+            BadRequestError: If the batch could not be written
+        """
+        if action not in ORDER_BATCH_ACTIONS:
+            raise ValidationError(
+                message=f"Unknown order action: {action}",
+                details={"action": action, "allowed": list(ORDER_BATCH_ACTIONS)}
+            )
+        received_items = received_items or {}
+        if received_items and action != "receive":
+            raise ValidationError(
+                message="Received quantities can only be given for the receive action",
+                details={"action": action, "reason": "received_items_not_allowed"}
+            )
+        unknown_orders = sorted(set(received_items) - set(document_numbers))
+        if unknown_orders:
+            raise ValidationError(
+                message="Received quantities given for orders outside the batch",
+                details={"unknown_orders": unknown_orders, "reason": "unknown_document_numbers"}
+            )
+        
+        def prepare(order: Order) -> Order:
+            if action == "submit":
+                update_data = self._submit_order_update(order)
+            elif action == "approve":
+                update_data = self._approve_order_update(order)
+            elif action == "receive":
+                update_data = self._receive_order_update(order, received_items.get(order.document_number))
+            elif action == "complete":
+                update_data = self._complete_order_update(order)
+            else:
+                update_data = self._cancel_order_update(order, reason)
+            validate_order_for_update(order, update_data)
+            return self.data_layer.apply_order_update(order, update_data)
+        
+        return self._transition_documents(document_numbers, self.get_order, prepare,
+                                          self.data_layer.save_orders, atomic)
+    
+    def _transition_documents(self, document_numbers: List[str],
+                              load: Callable[[str], Any],
+                              prepare: Callable[[Any], Any],
+                              save: Callable[[Iterable[Any]], None],
+                              atomic: bool) -> List[Dict[str, Any]]:
+        """
+        Validate a workflow action for several documents and write the
+        changed documents in one state transaction.
+        
+        Every document is checked before anything is written, and changes
+        are made to copies, so documents that fail are left as they were.
+        
+        Args:
+            document_numbers: The document numbers
+            load: Gets a document, raising NotFoundError if it doesn't exist
+            prepare: Validates the action for a document and returns the
+                     changed copy to write
+            save: Writes several documents in one transaction
+            atomic: Write nothing if any document fails
+            
+        Returns:
+            One result per document number, in input order, with the index,
+            document_number and status: "updated", "failed", or "skipped" for
+            the valid documents of a failed atomic batch. Updated and skipped
+            documents carry their new document_status; failed ones an error
+            with error_code, message and details.
+            
+        Raises:
+            BadRequestError: If the batch could not be written
+        """
+        results = []
+        writes = []  # (result, changed document)
+        seen = set()
+        for index, document_number in enumerate(document_numbers):
+            result = {"index": index, "document_number": document_number, "status": None}
+            results.append(result)
+            
+            if document_number in seen:
+                fail_result(result, "conflict",
+                            f"Document {document_number} appears more than once in the batch",
+                            {"conflict_reason": "duplicate_in_batch"})
+                continue
+            seen.add(document_number)
+            
+            try:
+                document = prepare(load(document_number))
+            except (NotFoundError, ValidationError, BadRequestError) as e:
+                fail_result(result, e.to_dict()["error_code"], e.message, e.details)
+                continue
+            
+            result["status"] = "updated"
+            result["document_status"] = document.status.value
+            writes.append((result, document))
+        
+        if atomic and len(writes) < len(results):
+            for result, _ in writes:
+                result["status"] = "skipped"
+            writes = []
+        
+        if writes:
+            try:
+                save(document for _, document in writes)
+            except Exception as e:
+                raise BadRequestError(
+                    message=f"Failed to write document batch: {str(e)}",
+                    details={"batch_size": len(document_numbers)}
+                )
+        
+        return results
 
 # Create a singleton instance
 p2p_service = P2PService()
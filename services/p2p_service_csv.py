@@ -0,0 +1,119 @@
+# services/p2p_service_csv.py
+"""
+CSV layout of P2P documents.
+
+Documents are flattened to one row per item: every row repeats the
+document's fields next to the fields of one item, and the rows of a
+document are consecutive. Item fields whose names the document already
+uses (description, status, requisition_reference) are prefixed with
+"item_". The document's status and timestamps follow its creation
+fields, so an export imports again as it was.
+"""
+
+from typing import Any, Dict, Iterator, List, Tuple
+
+# Document fields of a row, shared by all rows of a document
+REQUISITION_CSV_FIELDS: Tuple[str, ...] = (
+    "document_number", "description", "requester", "department", "type", "notes", "urgent"
+)
+ORDER_CSV_FIELDS: Tuple[str, ...] = REQUISITION_CSV_FIELDS + ("vendor", "payment_terms")
+
+# Document fields beyond the creation fields; exports write them and imports keep them
+REQUISITION_EXPORT_FIELDS: Tuple[str, ...] = ("status", "created_at", "updated_at")
+ORDER_EXPORT_FIELDS: Tuple[str, ...] = ("status", "requisition_reference", "created_at", "updated_at")
+
+# Item columns of a row and the item fields they hold
+REQUISITION_ITEM_CSV_COLUMNS: Dict[str, str] = {
+    "item_number": "item_number",
+    "material_number": "material_number",
+    "item_description": "description",
+    "quantity": "quantity",
+    "unit": "unit",
+    "price": "price",
+    "currency": "currency",
+    "delivery_date": "delivery_date",
+    "item_status": "status"
+}
+ORDER_ITEM_CSV_COLUMNS: Dict[str, str] = {
+    **REQUISITION_ITEM_CSV_COLUMNS,
+    "received_quantity": "received_quantity",
+    "item_requisition_reference": "requisition_reference",
+    "requisition_item": "requisition_item"
+}
+
+def csv_layout(kind: str) -> Tuple[Tuple[str, ...], Dict[str, str]]:
+    """
+    Get the CSV layout of a document kind.
+
+    Args:
+        kind: "requisitions" or "orders"
+
+    Returns:
+        (document fields, item columns to item fields)
+
+    Raises:
+        ValueError: If the kind is unknown
+    """
+    if kind == "requisitions":
+        return REQUISITION_CSV_FIELDS, REQUISITION_ITEM_CSV_COLUMNS
+    if kind == "orders":
+        return ORDER_CSV_FIELDS, ORDER_ITEM_CSV_COLUMNS
+    raise ValueError(f"Unknown document kind: {kind}")
+
+def export_columns(kind: str) -> List[str]:
+    """
+    Get the columns of a CSV export, in order.
+
+    Args:
+        kind: "requisitions" or "orders"
+
+    Returns:
+        Column names
+    """
+    document_fields, item_columns = csv_layout(kind)
+    export_fields = ORDER_EXPORT_FIELDS if kind == "orders" else REQUISITION_EXPORT_FIELDS
+    return list(document_fields) + list(export_fields) + list(item_columns)
+
+def document_rows(kind: str, document: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Flatten a document to one row per item.
+
+    A document without items gets one row with empty item columns.
+
+    Args:
+        kind: "requisitions" or "orders"
+        document: The document as a JSON-ready dictionary
+
+    Yields:
+        Rows as dictionaries of column to value
+    """
+    document_fields, item_columns = csv_layout(kind)
+    export_fields = ORDER_EXPORT_FIELDS if kind == "orders" else REQUISITION_EXPORT_FIELDS
+    shared = {field: document.get(field) for field in document_fields + export_fields}
+    for item in document.get("items") or [{}]:
+        row = dict(shared)
+        row.update({column: item.get(field) for column, field in item_columns.items()})
+        yield row
+
+def document_from_rows(kind: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Rebuild a document's import data from its rows.
+
+    The document fields are taken from the first row, status and
+    timestamps included; columns outside the layout are ignored.
+
+    Args:
+        kind: "requisitions" or "orders"
+        rows: The document's rows as dictionaries of column to cell
+
+    Returns:
+        Document dictionary with an items list, ready for model validation
+    """
+    document_fields, item_columns = csv_layout(kind)
+    export_fields = ORDER_EXPORT_FIELDS if kind == "orders" else REQUISITION_EXPORT_FIELDS
+    document = {field: rows[0][field] for field in document_fields + export_fields if field in rows[0]}
+    document["items"] = [
+        {field: row[column] for column, field in item_columns.items() if column in row}
+        for row in rows
+    ]
+    return document
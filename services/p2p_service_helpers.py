@@ -12,7 +12,7 @@ from models.p2p import (
     DocumentStatus, DocumentItemStatus, RequisitionUpdate, OrderUpdate
 )
 from models.material import MaterialStatus
-from utils.error_utils import ValidationError, NotFoundError
+from utils.error_utils import ValidationError
 
 def validate_requisition_status_transition(
     current_status: DocumentStatus, 
@@ -68,46 +68,41 @@ def validate_order_status_transition(
     
     return new_status in valid_transitions.get(current_status, [])
 
-def validate_material_active(
-    material_service,
-    material_number: str
+def validate_item_materials(
+    items: List[Union[RequisitionItem, OrderItem]],
+    material_statuses: Dict[str, Optional[MaterialStatus]]
 ) -> None:
     """
-    Validate that a material exists and is not deprecated.
+    Validate that the materials of document items exist and are not
+    deprecated; inactive materials are allowed.
     
     Args:
-        material_service: The material service to use for validation
-        material_number: The material number to validate
+        items: The document items
+        material_statuses: Status of each referenced material, None if it
+                           doesn't exist (see MaterialService.get_materials_status())
         
     Raises:
-        ValidationError: If the material doesn't exist or is deprecated
+        ValidationError: For the first item whose material is invalid
     """
-    try:
-        # Check if material exists and is not deprecated
-        material = material_service.get_material(material_number)
-        # Only reject DEPRECATED materials, allow INACTIVE
-        if material.status == MaterialStatus.DEPRECATED:
-            raise ValidationError(
-                f"Material {material_number} cannot be used (status: {material.status})"
-            )
-    except NotFoundError as e:
-        # Convert NotFoundError to ValidationError
-        raise ValidationError(
-            message=f"Invalid material {material_number}: not found",
-            details={
-                "material_number": material_number,
-                "reason": "not_found",
-                "original_error": e.details if hasattr(e, 'details') else {}
-            }
-        )
-    except Exception as e:
-        # For any other exceptions, provide a clear error message
+    for item in items:
+        if not item.material_number:
+            continue
+        status = material_statuses.get(item.material_number)
+        if status is None:
+            reason = "not_found"
+            message = f"Invalid material {item.material_number}: not found"
+        elif status == MaterialStatus.DEPRECATED:
+            # Only reject DEPRECATED materials, allow INACTIVE
+            reason = "deprecated"
+            message = f"Material {item.material_number} cannot be used (status: {status})"
+        else:
+            continue
         raise ValidationError(
-            message=f"Error validating material {material_number}: {str(e)}",
+            message=f"Invalid material in item {item.item_number}: {message}",
             details={
-                "material_number": material_number,
-                "error_type": type(e).__name__,
-                "error_message": str(e)
+                "item_number": item.item_number,
+                "material_number": item.material_number,
+                "reason": reason
             }
         )
 
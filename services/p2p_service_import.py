@@ -0,0 +1,309 @@
+# services/p2p_service_import.py
+"""
+Streaming import of requisitions and orders.
+
+A DocumentImporter is fed an import body line by line, as NDJSON (one
+document per line) or as CSV (one row per item, see p2p_service_csv), and
+imports the documents in chunks. Each chunk is validated as a whole: the
+materials referenced by all of its lines are fetched with one multi-get,
+its document numbers are checked with one existence check, and its valid
+documents are written in one transaction. Only the current chunk is held
+in memory; the report keeps counts and the first IMPORT_ERROR_LIMIT
+failures. An import is not atomic as a whole: if writing a chunk fails,
+the import stops with a BadRequestError and the chunks written before it
+stay imported.
+
+Documents are validated like P2PService.create_requisition() and
+create_order() validate them, but keep the status, created_at and
+updated_at they are imported with (see models.p2p.DocumentImportState),
+so history loads as it was. Without them a document starts out as a
+draft created now, as created documents do.
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError as PydanticValidationError
+
+from models.p2p import Order, OrderImport, Requisition, RequisitionImport
+from services.p2p_service_csv import document_from_rows
+from services.p2p_service_helpers import validate_item_materials
+from utils.error_utils import BadRequestError, ValidationError
+from utils.import_utils import ImportParseError, create_reader
+
+# Configure logging
+logger = logging.getLogger("p2p_service_import")
+
+# Document kinds and body formats an import accepts
+IMPORT_KINDS = ("requisitions", "orders")
+IMPORT_FORMATS = ("ndjson", "csv")
+
+# Documents validated and written together
+IMPORT_CHUNK_SIZE = 500
+
+# Failures listed in a report; further failures are only counted
+IMPORT_ERROR_LIMIT = 100
+
+class ImportReport:
+    """Progress and outcome of an import"""
+    def __init__(self, kind: str, import_format: str):
+        self.kind = kind
+        self.format = import_format
+        self.documents = 0
+        self.imported = 0
+        self.failed = 0
+        self.chunks = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.errors_omitted = 0
+
+    def add_failure(self, line: int, document_number: Optional[str], message: str,
+                    details: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Record a document that wasn't imported.
+
+        Args:
+            line: Line of the body the document starts on
+            document_number: Document number, if known
+            message: Reason
+            details: Optional error details
+        """
+        self.failed += 1
+        if len(self.errors) >= IMPORT_ERROR_LIMIT:
+            self.errors_omitted += 1
+            return
+        self.errors.append({
+            "line": line,
+            "document_number": document_number,
+            "message": message,
+            "details": details or {}
+        })
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the report as a JSON-ready dictionary"""
+        return {
+            "kind": self.kind,
+            "format": self.format,
+            "documents": self.documents,
+            "imported": self.imported,
+            "failed": self.failed,
+            "chunks": self.chunks,
+            "errors": self.errors,
+            "errors_omitted": self.errors_omitted
+        }
+
+class DocumentImporter:
+    """
+    Imports requisitions or orders from an NDJSON or CSV body fed line by line.
+
+    CSV rows with the same document number that follow each other form one
+    document; a row without a document number is a document of its own. If
+    one of a document's rows can't be parsed, the whole document fails.
+    """
+    def __init__(self, p2p_service, kind: str, import_format: str,
+                 chunk_size: int = IMPORT_CHUNK_SIZE,
+                 progress: Optional[Callable[[ImportReport], None]] = None):
+        """
+        Initialize an import.
+
+        Args:
+            p2p_service: P2P service whose data layer and material service
+                         the documents are validated against and written to
+            kind: "requisitions" or "orders"
+            import_format: "ndjson" or "csv"
+            chunk_size: Documents validated and written per transaction
+            progress: Optional callback receiving the report after each chunk
+
+        Raises:
+            ValidationError: If the kind, format or chunk size is invalid
+        """
+        if kind not in IMPORT_KINDS:
+            raise ValidationError(f"Unknown document kind: {kind}",
+                                  details={"kind": kind, "allowed": list(IMPORT_KINDS)})
+        if import_format not in IMPORT_FORMATS:
+            raise ValidationError(f"Unknown import format: {import_format}",
+                                  details={"format": import_format, "allowed": list(IMPORT_FORMATS)})
+        if chunk_size < 1:
+            raise ValidationError("Chunk size must be at least 1", details={"chunk_size": chunk_size})
+
+        self.p2p_service = p2p_service
+        self.kind = kind
+        self.import_format = import_format
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.report = ImportReport(kind, import_format)
+
+        data_layer = p2p_service.data_layer
+        if kind == "requisitions":
+            self._import_model, self._document_model = RequisitionImport, Requisition
+            self._existing, self._save = data_layer.existing_requisition_numbers, data_layer.save_requisitions
+        else:
+            self._import_model, self._document_model = OrderImport, Order
+            self._existing, self._save = data_layer.existing_order_numbers, data_layer.save_orders
+
+        self._reader = create_reader(import_format)
+        self._chunk: List[Tuple[int, Dict[str, Any]]] = []
+        # CSV rows of the document being read, and the line it started on
+        self._rows: List[Dict[str, Any]] = []
+        self._rows_line = 0
+        # Document number of the CSV document whose rows are being skipped
+        self._failed_number: Optional[str] = None
+
+    def feed(self, line: str) -> None:
+        """
+        Process one line of the body, importing a chunk once it is full.
+
+        Args:
+            line: Line without its line terminator
+
+        Raises:
+            BadRequestError: If writing the chunk fails; the chunks written
+                             before it stay imported
+        """
+        try:
+            for line_number, record in self._reader.feed(line):
+                self._record(line_number, record)
+        except ImportParseError as e:
+            self._parse_failure(e)
+
+    def finish(self) -> ImportReport:
+        """
+        Import the documents still pending after the last line.
+
+        Returns:
+            The import report
+
+        Raises:
+            BadRequestError: If writing the last chunk fails; the chunks
+                             written before it stay imported
+        """
+        try:
+            for line_number, record in self._reader.close():
+                self._record(line_number, record)
+        except ImportParseError as e:
+            self._parse_failure(e)
+        self._end_document()
+        self._flush()
+        logger.info(f"Imported {self.report.imported} of {self.report.documents} {self.kind} "
+                    f"({self.report.failed} failed)")
+        return self.report
+
+    def _record(self, line_number: int, record: Dict[str, Any]) -> None:
+        """Take a parsed record: a document, or for CSV an item row"""
+        if self.import_format != "csv":
+            self._add(line_number, record)
+            return
+        number = record.get("document_number")
+        if number is not None and number == self._failed_number:
+            # A row of a document that already failed to parse
+            return
+        self._failed_number = None
+        if self._rows and number is not None and number == self._rows[0].get("document_number"):
+            self._rows.append(record)
+            return
+        self._end_document()
+        self._rows = [record]
+        self._rows_line = line_number
+
+    def _parse_failure(self, error: ImportParseError) -> None:
+        """
+        Report a line that couldn't be parsed.
+
+        For CSV the whole document of the row fails: rows read for it so
+        far are discarded and its following rows are skipped, so it isn't
+        imported with items missing.
+        """
+        line_number = error.line_number
+        number = error.record.get("document_number")
+        if number is not None and number == self._failed_number:
+            return
+        if self.import_format == "csv" and number is not None:
+            if self._rows and number == self._rows[0].get("document_number"):
+                line_number, self._rows = self._rows_line, []
+            else:
+                self._end_document()
+            self._failed_number = number
+        self.report.documents += 1
+        self.report.add_failure(line_number, number, error.message, {"reason": "parse_error"})
+
+    def _end_document(self) -> None:
+        """Turn the CSV rows read for a document into the document"""
+        if self._rows:
+            self._add(self._rows_line, document_from_rows(self.kind, self._rows))
+            self._rows = []
+
+    def _add(self, line_number: int, record: Dict[str, Any]) -> None:
+        """Queue a document, importing the chunk once it is full"""
+        self.report.documents += 1
+        self._chunk.append((line_number, record))
+        if len(self._chunk) >= self.chunk_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Validate the queued documents and write the valid ones in one transaction"""
+        chunk, self._chunk = self._chunk, []
+        if not chunk:
+            return
+        report = self.report
+
+        candidates = []
+        for line_number, record in chunk:
+            try:
+                candidates.append((line_number, self._import_model(**record)))
+            except PydanticValidationError as e:
+                report.add_failure(line_number, record.get("document_number"), "Invalid document data", {
+                    "validation_errors": {
+                        ".".join(str(loc) for loc in error["loc"]): error["msg"] for error in e.errors()
+                    }
+                })
+
+        # Every material of the chunk is looked up once
+        material_statuses = self.p2p_service.material_service.get_materials_status(
+            item.material_number for _, data in candidates for item in data.items if item.material_number
+        )
+
+        documents = []
+        seen = set()
+        for line_number, data in candidates:
+            try:
+                validate_item_materials(data.items, material_statuses)
+            except ValidationError as e:
+                report.add_failure(line_number, data.document_number, e.message, e.details)
+                continue
+
+            document = self._document_model.create_from_import_model(data)
+            if document.document_number in seen:
+                report.add_failure(line_number, document.document_number,
+                                   f"Document number {document.document_number} appears more than once in the chunk",
+                                   {"conflict_reason": "duplicate_in_import"})
+                continue
+            seen.add(document.document_number)
+            documents.append((line_number, document))
+
+        taken = self._existing(seen)
+        new_documents = []
+        for line_number, document in documents:
+            if document.document_number in taken:
+                report.add_failure(line_number, document.document_number,
+                                   f"Document number {document.document_number} already exists",
+                                   {"conflict_reason": "document_number_exists"})
+            else:
+                new_documents.append(document)
+
+        if new_documents:
+            try:
+                self._save(new_documents)
+            except Exception as e:
+                logger.error(f"Import of {self.kind} stopped at chunk {report.chunks + 1}: {str(e)}", exc_info=True)
+                raise BadRequestError(
+                    message=f"Import stopped at chunk {report.chunks + 1}: {str(e)}. "
+                            f"Documents written by earlier chunks remain imported "
+                            f"({report.imported} in {report.chunks} chunks)",
+                    details=report.to_dict()
+                )
+        report.imported += len(new_documents)
+        report.chunks += 1
+
+        logger.info(f"Import of {self.kind}: chunk {report.chunks}, {report.imported} imported, "
+                    f"{report.failed} failed")
+        if self.progress is not None:
+            self.progress(report)
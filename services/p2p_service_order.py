@@ -138,6 +138,31 @@ def validate_order_for_deletion(order: Order) -> None:
             f"Only DRAFT orders can be deleted."
         )
 
+def validate_order_for_update(order: Order, update_data: OrderUpdate) -> None:
+    """
+    Validate that an order can be updated with the provided data.
+    
+    Args:
+        order: The order to validate
+        update_data: The update data
+        
+    Raises:
+        ValidationError: If the update is not allowed
+    """
+    # Don't allow updating items after order is submitted
+    if (order.status != DocumentStatus.DRAFT and 
+        update_data.items is not None and 
+        update_data.status is None):  # Allow status updates
+        raise ValidationError(
+            message="Cannot update items after order is submitted",
+            details={
+                "document_number": order.document_number,
+                "current_status": order.status.value,
+                "attempted_update": "items",
+                "reason": "items_locked_after_submission"
+            }
+        )
+
 def prepare_order_update_with_received_items(
     order: Order, 
     received_items: Dict[int, float] = None
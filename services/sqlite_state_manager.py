@@ -0,0 +1,447 @@
+# services/sqlite_state_manager.py
+"""
+SQLite storage backend for the state manager.
+
+SQLiteStateManager keeps the StateManager interface but stores each state
+key as its own row in a SQLite database instead of holding the whole state
+in memory. Nothing is loaded at startup; values are read from the database
+on demand, so startup time and resident memory no longer grow with the
+amount of stored data.
+
+Several processes can open the same database file, e.g. the workers of
+`uvicorn --workers N`: reads go straight to the shared file, writes are
+serialized by SQLite, and state versions and change events are shared
+through the database as well (see SQLiteStateManager.sync()).
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from services.state_manager import StateChange, StateManager
+from services.state_persistence import BackgroundFlusher, serialize_value
+
+# Configure logging
+logger = logging.getLogger("sqlite_state_manager")
+
+# Keys per query in existing_keys(), below SQLite's default limit of 999
+# bound parameters
+EXISTING_KEYS_BATCH = 500
+
+class SQLiteStateManager(StateManager):
+    """
+    StateManager backed by a SQLite database in WAL journal mode.
+
+    Values are stored as JSON, one row per key. Unlike the in-memory
+    StateManager, get() returns a fresh copy decoded from the database:
+    changes to a returned value are only stored once it is passed to set().
+    A transaction() is committed as a single SQLite transaction.
+
+    The state version and the version of each key's last change live in
+    the database, so they are the same in every process sharing the file.
+    Changes committed by other processes are picked up by sync(), which
+    runs before key listings and version reads, and every poll_interval_s
+    seconds on a background thread if set; subscribers then receive the
+    same StateChange events as for local writes.
+    """
+    def __init__(self, db_path: str, synchronous: str = "NORMAL",
+                 busy_timeout_ms: int = 5000,
+                 poll_interval_s: Optional[float] = None):
+        """
+        Initialize the backend and create the schema if needed.
+
+        Args:
+            db_path: Path of the SQLite database file
+            synchronous: SQLite synchronous setting; "NORMAL" is durable
+                         across process crashes in WAL mode, "FULL" also
+                         across power loss
+            busy_timeout_ms: How long a write waits for another process
+                             holding the database write lock
+            poll_interval_s: Seconds between background checks for changes
+                             made by other processes; None to only check
+                             on key listings and version reads
+        """
+        super().__init__()
+        self._persistence_file = db_path
+        self._db_lock = threading.RLock()
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        with self._immediate_transaction():
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            # Version of each key's last change, deletes included
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS state_versions "
+                "(key TEXT PRIMARY KEY, op TEXT NOT NULL, version INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS state_versions_version ON state_versions (version)"
+            )
+            # "version" and "cleared_version" counters
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS state_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO state_meta (name, value) "
+                "VALUES ('version', 0), ('cleared_version', 0)"
+            )
+
+        # Changes up to this version have been published to local listeners
+        self._version = self._meta("version")
+        self._cleared_version = self._meta("cleared_version")
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+        if poll_interval_s:
+            self._poller = BackgroundFlusher(self.sync, poll_interval_s, name="state-poller")
+        else:
+            self._poller = None
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Set a value in the state.
+
+        Args:
+            key: State key
+            value: JSON-serializable value or Pydantic model to store
+        """
+        transaction = self._current_transaction()
+        if transaction is not None:
+            transaction.pop(key, None)
+            transaction[key] = ("set", value)
+            return
+
+        with self._key_locks.for_key(key):
+            events, _ = self._write([(key, "set", value)])
+            self._publish(events)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Get a value from the state.
+
+        Args:
+            key: State key
+            default: Default value if key doesn't exist
+
+        Returns:
+            The stored value or default
+        """
+        transaction = self._current_transaction()
+        if transaction is not None and key in transaction:
+            op, value = transaction[key]
+            return value if op == "set" else default
+
+        with self._db_lock:
+            return self._read(key, default)
+
+    def delete(self, key: str) -> bool:
+        """
+        Delete a key from the state.
+
+        Args:
+            key: State key to delete
+
+        Returns:
+            True if the key was deleted, False if it didn't exist
+        """
+        transaction = self._current_transaction()
+        if transaction is not None:
+            if key in transaction:
+                existed = transaction.pop(key)[0] == "set"
+            else:
+                existed = self.get(key) is not None
+            transaction[key] = ("delete", None)
+            return existed
+
+        with self._key_locks.for_key(key):
+            events, changed = self._write([(key, "delete", None)])
+            self._publish(events)
+        return changed > 0
+
+    def update(self, key: str, fn: Callable[[Any], Any], default: Any = None) -> Any:
+        """
+        Atomically replace a value with a function of its current value.
+
+        The read and the write happen in one SQLite write transaction, so
+        updates are atomic across processes sharing the database too.
+
+        Args:
+            key: State key
+            fn: Function taking the current value (or default) and
+                returning the new value
+            default: Value passed to fn if the key doesn't exist
+
+        Returns:
+            The new value
+        """
+        if self._current_transaction() is not None:
+            return super().update(key, fn, default)
+
+        new_values = []
+
+        def compute_changes():
+            new_values.append(fn(self._read(key, default)))
+            return [(key, "set", new_values[-1])]
+
+        with self._key_locks.for_key(key):
+            events, _ = self._write(compute_changes)
+            self._publish(events)
+        return new_values[-1]
+
+    def get_all_keys(self) -> list:
+        """
+        Get all keys in the state.
+
+        Returns:
+            List of all keys
+        """
+        self.sync()
+        with self._db_lock:
+            rows = self._conn.execute("SELECT key FROM state").fetchall()
+        return self._overlay_keys([row[0] for row in rows], "")
+
+    def get_keys(self, prefix: str) -> list:
+        """
+        Get all keys starting with a prefix, using the primary key index.
+
+        Args:
+            prefix: Key prefix, e.g. "materials/"
+
+        Returns:
+            List of matching keys in key order
+        """
+        if not prefix:
+            return self.get_all_keys()
+
+        self.sync()
+        # Every key with the prefix sorts between the prefix itself and the
+        # prefix with its last character incremented
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT key FROM state WHERE key >= ? AND key < ? ORDER BY key",
+                (prefix, upper)
+            ).fetchall()
+        return self._overlay_keys([row[0] for row in rows], prefix)
+
+    def existing_keys(self, keys: Iterable[str]) -> set:
+        """
+        Check which of several keys exist, with one primary key lookup per
+        batch of keys instead of a query per key.
+
+        Args:
+            keys: State keys
+
+        Returns:
+            The subset of keys that exist
+        """
+        keys = set(keys)
+        ordered = sorted(keys)
+        found = set()
+        with self._db_lock:
+            for start in range(0, len(ordered), EXISTING_KEYS_BATCH):
+                batch = ordered[start:start + EXISTING_KEYS_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT key FROM state WHERE key IN ({', '.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                found.update(row[0] for row in rows)
+        return self._overlay_existing(found, keys)
+
+    def clear(self) -> None:
+        """Clear all state"""
+        if self._current_transaction() is not None:
+            raise RuntimeError("clear() can't be called inside a transaction")
+
+        with self._key_locks.locked_all():
+            with self._db_lock:
+                with self._immediate_transaction():
+                    events = self._changes_since(self._version)
+                    version = self._meta("version") + 1
+                    self._conn.execute("DELETE FROM state")
+                    self._conn.execute("DELETE FROM state_versions")
+                    self._conn.execute(
+                        "UPDATE state_meta SET value = ? WHERE name IN ('version', 'cleared_version')",
+                        (version,)
+                    )
+                self._version = self._cleared_version = version
+                events.append(StateChange(None, "clear", version))
+            self._publish(events)
+
+    @property
+    def version(self) -> int:
+        """Version of the shared state, including changes made by other processes"""
+        self.sync()
+        return self._version
+
+    def key_version(self, key: str) -> int:
+        """
+        Get the version of the last change to a key, made by any process.
+
+        Args:
+            key: State key
+
+        Returns:
+            State version at the key's last change
+        """
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT version FROM state_versions WHERE key = ?", (key,)
+            ).fetchone()
+            return row[0] if row is not None else self._meta("cleared_version")
+
+    def sync(self) -> None:
+        """
+        Publish changes committed by other processes since the last sync.
+
+        Cheap when nothing changed: SQLite's data_version tells whether
+        another connection has committed since it was last read.
+        """
+        with self._db_lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+            self._data_version = data_version
+            events = self._changes_since(self._version)
+            if events:
+                self._version = events[-1].version
+        self._publish(events)
+
+    def compact(self) -> None:
+        """Checkpoint the SQLite WAL into the main database file"""
+        with self._db_lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def flush(self) -> None:
+        """Every write is committed immediately, so there is nothing to flush"""
+        return
+
+    def close(self) -> None:
+        """Stop the background poller and close the database connection"""
+        if self._poller is not None:
+            self._poller.stop()
+            self._poller = None
+        with self._db_lock:
+            self._conn.close()
+
+    def _commit(self, changes: list) -> None:
+        """
+        Write the mutations of a finished transaction in one SQLite transaction.
+
+        Args:
+            changes: (key, (op, value)) pairs in the order they were last written
+        """
+        with self._key_locks.locked(key for key, _ in changes):
+            events, _ = self._write([(key, op, value) for key, (op, value) in changes])
+            self._publish(events)
+
+    def _write(self, changes: Union[list, Callable[[], list]]) -> Tuple[List[StateChange], int]:
+        """
+        Apply mutations and advance the shared version in one SQLite transaction.
+
+        Changes committed by other processes since the last sync are
+        collected first, so events are published in version order.
+
+        Args:
+            changes: (key, op, value) tuples in the order they happened, or
+                     a callable returning them, called inside the transaction
+
+        Returns:
+            Events to publish (other processes' changes, then these) and
+            the number of changes that took effect
+        """
+        with self._db_lock:
+            with self._immediate_transaction():
+                events = self._changes_since(self._version)
+                version = start_version = self._meta("version")
+                if callable(changes):
+                    changes = changes()
+                for key, op, value in changes:
+                    if op == "set":
+                        self._upsert(key, value)
+                    elif not self._conn.execute("DELETE FROM state WHERE key = ?", (key,)).rowcount:
+                        # Deleting a key that didn't exist changes nothing
+                        continue
+                    version += 1
+                    self._conn.execute(
+                        "INSERT INTO state_versions (key, op, version) VALUES (?, ?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET op = excluded.op, version = excluded.version",
+                        (key, op, version)
+                    )
+                    events.append(StateChange(key, op, version))
+                self._conn.execute("UPDATE state_meta SET value = ? WHERE name = 'version'", (version,))
+            if events:
+                self._version = events[-1].version
+            return events, version - start_version
+
+    def _changes_since(self, version: int) -> List[StateChange]:
+        """
+        Read changes committed after a version; the caller must hold _db_lock.
+
+        Args:
+            version: Last version already published
+
+        Returns:
+            A "clear" event if the state was cleared since, followed by the
+            last change of each key changed since, in version order
+        """
+        events = []
+        cleared_version = self._meta("cleared_version")
+        if cleared_version > version:
+            events.append(StateChange(None, "clear", cleared_version))
+            self._cleared_version = cleared_version
+        rows = self._conn.execute(
+            "SELECT key, op, version FROM state_versions WHERE version > ? ORDER BY version",
+            (version,)
+        ).fetchall()
+        events.extend(StateChange(key, op, row_version) for key, op, row_version in rows)
+        return events
+
+    @contextmanager
+    def _immediate_transaction(self) -> Iterator[None]:
+        """
+        Run a block in a SQLite write transaction; the caller must hold _db_lock.
+
+        The transaction is rolled back if the block or the commit itself
+        fails, so the connection is never left inside a transaction and
+        the next BEGIN IMMEDIATE can start.
+        """
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            self._conn.execute("COMMIT")
+        except BaseException:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            raise
+
+    def _read(self, key: str, default: Any) -> Any:
+        """Read and decode a value; the caller must hold _db_lock"""
+        row = self._conn.execute(
+            "SELECT value FROM state WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        return json.loads(row[0])
+
+    def _meta(self, name: str) -> int:
+        """Read a counter from the state_meta table; the caller must hold _db_lock"""
+        return self._conn.execute(
+            "SELECT value FROM state_meta WHERE name = ?", (name,)
+        ).fetchone()[0]
+
+    def _upsert(self, key: str, value: Any) -> None:
+        """Insert or replace a row; the caller must hold _db_lock"""
+        self._conn.execute(
+            "INSERT INTO state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(serialize_value(value)))
+        )
+
+__all__ = ["SQLiteStateManager"]
@@ -0,0 +1,184 @@
+# services/state_locks.py
+"""
+Locks used by the state manager.
+
+ReadWriteLock lets any number of threads read at once while writes are
+exclusive. StripedLock hands out one of a fixed set of reentrant locks per
+key, so writers of unrelated keys rarely wait for each other while writers
+of the same key are always serialized.
+"""
+
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List
+
+class ReadWriteLock:
+    """
+    Reader/writer lock that prefers writers.
+
+    New readers wait while a writer holds or is waiting for the lock, so a
+    steady stream of readers can't starve writers. Both sides are reentrant
+    per thread, and a thread holding the write lock may also take the read
+    lock. Upgrading a held read lock to a write lock isn't supported, since
+    two threads doing it at once would deadlock; it raises RuntimeError.
+    """
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._writers_waiting = 0
+        self._local = threading.local()
+
+    def acquire_read(self) -> None:
+        """Acquire the lock for reading, blocking while a writer is active or waiting"""
+        depth = getattr(self._local, "read_depth", 0)
+        if depth:
+            self._local.read_depth = depth + 1
+            return
+        if self._writer == threading.get_ident():
+            # Covered by the write lock, so not counted as a reader
+            self._local.read_depth = 1
+            self._local.counted = False
+            return
+
+        with self._cond:
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        self._local.read_depth = 1
+        self._local.counted = True
+
+    def release_read(self) -> None:
+        """Release a read lock taken with acquire_read()"""
+        depth = getattr(self._local, "read_depth", 0)
+        if not depth:
+            raise RuntimeError("Read lock released without being held")
+        self._local.read_depth = depth - 1
+        if depth > 1 or not self._local.counted:
+            return
+
+        self._local.counted = False
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        """Acquire the lock for writing, blocking until all readers and writers are done"""
+        me = threading.get_ident()
+        if self._writer == me:
+            self._writer_depth += 1
+            return
+        if getattr(self._local, "read_depth", 0):
+            raise RuntimeError("Can't acquire the write lock while holding the read lock")
+
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self) -> None:
+        """Release a write lock taken with acquire_write()"""
+        if self._writer != threading.get_ident():
+            raise RuntimeError("Write lock released by a thread that doesn't hold it")
+        self._writer_depth -= 1
+        if self._writer_depth:
+            return
+
+        with self._cond:
+            self._writer = None
+            self._cond.notify_all()
+
+    @contextmanager
+    def read_locked(self) -> Iterator[None]:
+        """Hold the read lock for the duration of a with block"""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self) -> Iterator[None]:
+        """Hold the write lock for the duration of a with block"""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+class StripedLock:
+    """
+    Fixed set of reentrant locks shared out between keys by hash.
+
+    The same key always maps to the same stripe. With one stripe this is a
+    single global lock.
+    """
+    def __init__(self, stripes: int = 64):
+        """
+        Initialize the stripes.
+
+        Args:
+            stripes: Number of locks to spread keys over
+        """
+        if stripes < 1:
+            raise ValueError("At least one lock stripe is required")
+        self._locks = [threading.RLock() for _ in range(stripes)]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def stripe(self, key: str) -> int:
+        """
+        Get the stripe number of a key.
+
+        A CRC is used rather than hash() so the mapping doesn't change
+        between processes.
+        """
+        return zlib.crc32(key.encode("utf-8")) % len(self._locks)
+
+    def for_key(self, key: str) -> threading.RLock:
+        """Get the lock guarding a key"""
+        return self._locks[self.stripe(key)]
+
+    @contextmanager
+    def locked(self, keys: Iterable[str]) -> Iterator[None]:
+        """
+        Hold the locks of several keys for the duration of a with block.
+
+        Stripes are always taken in ascending order, so two threads locking
+        overlapping key sets can't deadlock each other.
+
+        Args:
+            keys: Keys to lock
+        """
+        locks: List[threading.RLock] = [self._locks[i] for i in sorted({self.stripe(key) for key in keys})]
+        acquired = []
+        try:
+            for lock in locks:
+                lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    @contextmanager
+    def locked_all(self) -> Iterator[None]:
+        """Hold every stripe for the duration of a with block"""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+__all__ = ["ReadWriteLock", "StripedLock"]
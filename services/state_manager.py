@@ -1,27 +1,190 @@
 # services/state_manager.py
-from typing import Dict, Any, Optional, Type, TypeVar, Generic
-import json
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Iterable, Iterator, List, NamedTuple, Optional, Type, TypeVar, Generic
+import logging
 import os
-from datetime import datetime
+import threading
 from pydantic import BaseModel
 
+from services.state_persistence import (
+    WAL_SUFFIX, WriteAheadLog, BackgroundFlusher, LazyBinarySnapshot, SnapshotRecordRef,
+    apply_wal_record, is_binary_snapshot, read_snapshot,
+    write_binary_snapshot, write_json_snapshot
+)
+from services.state_locks import ReadWriteLock, StripedLock
+
+# Configure logging
+logger = logging.getLogger("state_manager")
+
 T = TypeVar('T', bound=BaseModel)
 
+# Supported persistence modes
+PERSISTENCE_MODES = ("snapshot", "wal")
+
+# Supported flush policies
+FLUSH_POLICIES = ("per_write", "interval", "batch")
+
+# Supported snapshot file formats
+SNAPSHOT_FORMATS = ("json", "binary")
+
+class StateChange(NamedTuple):
+    """
+    A committed state mutation, as delivered to subscribers.
+    
+    key is None for "clear", which affects every key.
+    """
+    key: Optional[str]
+    op: str
+    version: int
+
+def key_namespace(key: str) -> Optional[str]:
+    """
+    Get the namespace of a "<namespace>/<id>" state key.
+    
+    Args:
+        key: State key
+        
+    Returns:
+        The part before the first "/", or None for keys without one
+    """
+    namespace, separator, _ = key.partition("/")
+    return namespace if separator else None
+
 class StateManager:
     """
     Service for managing application state.
     Provides in-memory storage with optional persistence.
+    
+    Persistence modes:
+    - "snapshot": rewrite the whole state file on every mutation
+    - "wal": append each mutation to a write-ahead log next to the state
+      file and replay it on startup; the log is folded back into the
+      state file once it grows past wal_compact_threshold records
+    
+    Flush policies:
+    - "per_write": persist every mutation before returning (default)
+    - "interval": persist pending mutations every flush_interval_ms
+    - "batch": persist once flush_batch_size mutations are pending
+    
+    With "interval" and "batch", mutations are queued in memory and written
+    by a background thread, with repeated writes to the same key coalesced
+    into one. Call flush() to write pending mutations immediately, e.g. on
+    shutdown or in tests.
+    
+    Snapshot formats:
+    - "json": human-readable, values are re-parsed into models on access
+    - "binary": length-prefixed pickle records that load straight back
+      into model instances; much faster to restart from
+    Existing snapshots are read in whichever format they were written.
+    With snapshot_interval_s set, a background thread also folds the
+    write-ahead log into a fresh snapshot on that interval.
+    
+    With lazy_load, startup reads only the key index of a binary snapshot;
+    each value is unpickled the first time get() asks for it, so startup
+    time doesn't grow with the size of the stored values. Values that were
+    never read are copied into new binary snapshots without unpickling.
+    
+    Several mutations can be committed atomically with transaction().
+    
+    The manager is safe to share between threads. Writes to the same key are
+    serialized by a per-key lock (one of lock_stripes striped locks), and
+    changes to the state dict and key index happen under the write side of
+    a reader/writer lock, so key listings and snapshots see a consistent
+    state while writes to unrelated keys don't wait for each other. Single
+    key reads are plain dict lookups and take no lock. Use update() for
+    read-modify-write sequences that must not lose concurrent updates.
+    
+    Keys of the form "<namespace>/<id>" are tracked in a per-namespace key
+    index, so get_keys("<namespace>/") doesn't have to scan the whole state.
+    
+    Every committed mutation increments the state version, and each key
+    remembers the version of its last change (see version and
+    key_version()). Listeners registered with subscribe() receive a
+    StateChange(key, op, version) for each mutation, which gives caches
+    built on top of the state an exact invalidation signal. Versions are
+    counted per process and start at 0 when the state is loaded.
     """
-    def __init__(self, persistence_file: Optional[str] = None):
+    def __init__(self, persistence_file: Optional[str] = None,
+                 persistence_mode: str = "snapshot",
+                 wal_compact_threshold: int = 10000,
+                 flush_policy: str = "per_write",
+                 flush_interval_ms: int = 50,
+                 flush_batch_size: int = 100,
+                 snapshot_format: str = "json",
+                 snapshot_interval_s: Optional[float] = None,
+                 lazy_load: bool = False,
+                 lock_stripes: int = 64):
+        if persistence_mode not in PERSISTENCE_MODES:
+            raise ValueError(
+                f"Unknown persistence mode '{persistence_mode}', expected one of {PERSISTENCE_MODES}"
+            )
+        if flush_policy not in FLUSH_POLICIES:
+            raise ValueError(
+                f"Unknown flush policy '{flush_policy}', expected one of {FLUSH_POLICIES}"
+            )
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(
+                f"Unknown snapshot format '{snapshot_format}', expected one of {SNAPSHOT_FORMATS}"
+            )
+        
         self._state: Dict[str, Any] = {}
+        # namespace -> keys in that namespace (dict used as an ordered set)
+        self._key_index: Dict[str, Dict[str, None]] = {}
         self._persistence_file = persistence_file
+        self._persistence_mode = persistence_mode
+        self._snapshot_format = snapshot_format
+        self._lazy_load = lazy_load
+        self._lazy_snapshot: Optional[LazyBinarySnapshot] = None
+        # Write side guards changes to _state and _key_index (including lazy
+        # hydration), read side gives multi-step reads a consistent view
+        self._rw_lock = ReadWriteLock()
+        # Serializes writers of the same key, held until the write is persisted
+        self._key_locks = StripedLock(lock_stripes)
+        
+        # Change feed: global version, version of each key's last change
+        # (including deletes) and the version of the last clear
+        self._version = 0
+        self._key_versions: Dict[str, int] = {}
+        self._cleared_version = 0
+        self._listeners: Dict[int, tuple] = {}
+        self._listeners_lock = threading.Lock()
+        self._next_listener_id = 0
+        # Per-thread buffer of the open transaction, see transaction()
+        self._local = threading.local()
+        self._wal_compact_threshold = wal_compact_threshold
+        self._wal: Optional[WriteAheadLog] = None
+        
+        # Serializes all disk writes (per-write, background and explicit flushes)
+        self._write_lock = threading.RLock()
+        
+        # Mutations waiting for a deferred flush: key -> op, in first-touched order
+        self._flush_policy = flush_policy
+        self._flush_batch_size = flush_batch_size
+        self._pending_lock = threading.Lock()
+        self._pending: Dict[str, str] = {}
+        self._pending_clear = False
+        self._pending_count = 0
+        self._flusher: Optional[BackgroundFlusher] = None
+        self._snapshotter: Optional[BackgroundFlusher] = None
+        
+        if self._persistence_file and self._persistence_mode == "wal":
+            self._wal = WriteAheadLog(self._persistence_file + WAL_SUFFIX)
         
         # Try to load state from file if persistence is enabled
-        if self._persistence_file and os.path.exists(self._persistence_file):
+        if self._persistence_file:
             try:
                 self._load_state_from_file()
             except Exception as e:
-                print(f"Error loading state from file: {e}")
+                logger.error(f"Error loading state from file: {e}")
+        
+        if self._persistence_file and self._flush_policy != "per_write":
+            interval = flush_interval_ms / 1000.0 if self._flush_policy == "interval" else None
+            self._flusher = BackgroundFlusher(self.flush, interval)
+        
+        if self._persistence_file and snapshot_interval_s:
+            self._snapshotter = BackgroundFlusher(
+                self._snapshot_if_dirty, snapshot_interval_s, name="state-snapshotter"
+            )
     
     def set(self, key: str, value: Any) -> None:
         """
@@ -31,8 +194,20 @@ class StateManager:
             key: State key
             value: Value to store
         """
-        self._state[key] = value
-        self._persist_state()
+        transaction = self._current_transaction()
+        if transaction is not None:
+            transaction.pop(key, None)
+            transaction[key] = ("set", value)
+            return
+        
+        with self._key_locks.for_key(key):
+            with self._rw_lock.write_locked():
+                if key not in self._state:
+                    self._index_key(key)
+                self._state[key] = value
+                version = self._next_version(key)
+            self._record_mutation("set", key, value)
+            self._publish([StateChange(key, "set", version)])
     
     def get(self, key: str, default: Any = None) -> Any:
         """
@@ -45,7 +220,15 @@ class StateManager:
         Returns:
             The stored value or default
         """
-        return self._state.get(key, default)
+        transaction = self._current_transaction()
+        if transaction is not None and key in transaction:
+            op, value = transaction[key]
+            return value if op == "set" else default
+        
+        value = self._state.get(key, default)
+        if isinstance(value, SnapshotRecordRef):
+            value = self._hydrate(key, default)
+        return value
     
     def delete(self, key: str) -> bool:
         """
@@ -57,11 +240,49 @@ class StateManager:
         Returns:
             True if the key was deleted, False if it didn't exist
         """
-        if key in self._state:
-            del self._state[key]
-            self._persist_state()
-            return True
-        return False
+        transaction = self._current_transaction()
+        if transaction is not None:
+            if key in transaction:
+                existed = transaction.pop(key)[0] == "set"
+            else:
+                existed = key in self._state
+            transaction[key] = ("delete", None)
+            return existed
+        
+        with self._key_locks.for_key(key):
+            with self._rw_lock.write_locked():
+                if key not in self._state:
+                    return False
+                del self._state[key]
+                self._unindex_key(key)
+                version = self._next_version(key)
+            self._record_mutation("delete", key)
+            self._publish([StateChange(key, "delete", version)])
+        return True
+    
+    def update(self, key: str, fn: Callable[[Any], Any], default: Any = None) -> Any:
+        """
+        Atomically replace a value with a function of its current value.
+        
+        The key's lock is held from reading the current value until the new
+        one is persisted, so concurrent updates of the same key can't
+        overwrite each other. fn should be quick and must not write other
+        keys. Inside a transaction the update applies to the calling
+        thread's buffered value.
+        
+        Args:
+            key: State key
+            fn: Function taking the current value (or default) and
+                returning the new value
+            default: Value passed to fn if the key doesn't exist
+            
+        Returns:
+            The new value
+        """
+        with self._key_locks.for_key(key):
+            value = fn(self.get(key, default))
+            self.set(key, value)
+        return value
     
     def get_model(self, key: str, model_class: Type[T]) -> Optional[T]:
         """
@@ -102,45 +323,638 @@ class StateManager:
         Returns:
             List of all keys
         """
-        return list(self._state.keys())
+        with self._rw_lock.read_locked():
+            keys = list(self._state.keys())
+        return self._overlay_keys(keys, "")
+    
+    def get_keys(self, prefix: str) -> list:
+        """
+        Get all keys starting with a prefix.
+        
+        A "<namespace>/" prefix is answered from the key index; other
+        prefixes fall back to scanning all keys.
+        
+        Args:
+            prefix: Key prefix, e.g. "materials/"
+            
+        Returns:
+            List of matching keys
+        """
+        namespace = key_namespace(prefix)
+        with self._rw_lock.read_locked():
+            if namespace is not None and prefix == namespace + "/":
+                keys = list(self._key_index.get(namespace, ()))
+            else:
+                keys = [key for key in self._state if key.startswith(prefix)]
+        return self._overlay_keys(keys, prefix)
+    
+    def existing_keys(self, keys: Iterable[str]) -> set:
+        """
+        Check which of several keys exist, in one pass.
+        
+        Unlike get(), values aren't read or loaded from a lazy snapshot.
+        
+        Args:
+            keys: State keys
+            
+        Returns:
+            The subset of keys that exist
+        """
+        keys = set(keys)
+        with self._rw_lock.read_locked():
+            found = {key for key in keys if key in self._state}
+        return self._overlay_existing(found, keys)
     
     def clear(self) -> None:
         """Clear all state"""
-        self._state = {}
-        self._persist_state()
+        if self._current_transaction() is not None:
+            raise RuntimeError("clear() can't be called inside a transaction")
+        
+        with self._key_locks.locked_all():
+            with self._rw_lock.write_locked():
+                self._state = {}
+                self._key_index = {}
+                if self._lazy_snapshot is not None:
+                    self._lazy_snapshot.close()
+                    self._lazy_snapshot = None
+                version = self._next_version(None)
+            self._record_mutation("clear")
+            self._publish([StateChange(None, "clear", version)])
     
-    def _persist_state(self) -> None:
-        """Persist state to file if persistence is enabled"""
-        if not self._persistence_file:
+    def sync(self) -> None:
+        """
+        Publish changes made by other processes sharing the state.
+        
+        In-memory state isn't shared, so there is nothing to do; the SQLite
+        backend overrides this.
+        """
+        return
+    
+    @property
+    def version(self) -> int:
+        """Version of the state, incremented by every committed mutation"""
+        return self._version
+    
+    def key_version(self, key: str) -> int:
+        """
+        Get the version of the last change to a key.
+        
+        The version never decreases: deleting a key or clearing the state
+        counts as a change, and keys that were never written since the last
+        clear report the version of that clear.
+        
+        Args:
+            key: State key
+            
+        Returns:
+            State version at the key's last change
+        """
+        return self._key_versions.get(key, self._cleared_version)
+    
+    def subscribe(self, listener: Callable[[StateChange], None],
+                  prefix: Optional[str] = None) -> Callable[[], None]:
+        """
+        Register a listener for committed state changes.
+        
+        The listener is called synchronously on the writing thread, after
+        the change is applied and persisted and while the key's write lock
+        is still held, so changes of one key arrive in version order. It
+        should be quick and must not write to the state. Exceptions raised
+        by a listener are logged and otherwise ignored. A committed
+        transaction delivers one event per changed key.
+        
+        Args:
+            listener: Callable taking a StateChange
+            prefix: Only deliver changes of keys starting with this prefix;
+                    "clear" events are always delivered
+            
+        Returns:
+            Callable that unsubscribes the listener
+        """
+        with self._listeners_lock:
+            listener_id = self._next_listener_id
+            self._next_listener_id += 1
+            self._listeners[listener_id] = (listener, prefix)
+        
+        def unsubscribe() -> None:
+            with self._listeners_lock:
+                self._listeners.pop(listener_id, None)
+        
+        return unsubscribe
+    
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Group several mutations into one atomic, persisted batch.
+        
+        Inside the block, set() and delete() are buffered per thread: the
+        calling thread reads its own writes, other threads don't see them
+        until the block exits. On a normal exit all buffered mutations are
+        applied and persisted as one batch (one snapshot write, one log
+        record or one SQLite transaction); if the block raises, they are
+        discarded. Nested transactions join the outermost one.
+        
+        Note that objects returned by get() may be the stored instances
+        themselves, so changing them in place is not undone by a rollback.
+        
+        Example:
+            with state_manager.transaction():
+                state_manager.set("requisitions/PR001", requisition)
+                state_manager.set("orders/PO001", order)
+        """
+        if self._current_transaction() is not None:
+            yield
             return
         
+        self._local.transaction = {}
         try:
-            with open(self._persistence_file, 'w') as f:
-                # Convert state to JSON-serializable format
-                serializable_state = {}
-                for key, value in self._state.items():
-                    if isinstance(value, BaseModel):
-                        serializable_state[key] = value.dict()
-                    elif isinstance(value, datetime):
-                        serializable_state[key] = value.isoformat()
+            yield
+            changes = self._local.transaction
+        finally:
+            self._local.transaction = None
+        
+        if changes:
+            self._commit(list(changes.items()))
+    
+    def in_transaction(self) -> bool:
+        """Check whether the calling thread has a transaction open"""
+        return self._current_transaction() is not None
+    
+    def _current_transaction(self) -> Optional[Dict[str, tuple]]:
+        """Get the calling thread's open transaction buffer, if any"""
+        return getattr(self._local, "transaction", None)
+    
+    def _overlay_keys(self, keys: list, prefix: str) -> list:
+        """
+        Apply the calling thread's buffered mutations to a list of keys.
+        
+        Args:
+            keys: Keys read from the committed state
+            prefix: Prefix the keys were selected by
+            
+        Returns:
+            Keys as seen from inside the transaction
+        """
+        transaction = self._current_transaction()
+        if not transaction:
+            return keys
+        
+        deleted = {key for key, (op, _) in transaction.items() if op == "delete"}
+        result = [key for key in keys if key not in deleted]
+        present = set(result)
+        result.extend(
+            key for key, (op, _) in transaction.items()
+            if op == "set" and key.startswith(prefix) and key not in present
+        )
+        return result
+    
+    def _overlay_existing(self, found: set, keys: set) -> set:
+        """
+        Apply the calling thread's buffered mutations to an existence check.
+        
+        Args:
+            found: Keys found in the committed state
+            keys: Keys that were checked
+            
+        Returns:
+            Existing keys as seen from inside the transaction
+        """
+        transaction = self._current_transaction()
+        if not transaction:
+            return found
+        
+        for key in keys:
+            if key in transaction:
+                if transaction[key][0] == "set":
+                    found.add(key)
+                else:
+                    found.discard(key)
+        return found
+    
+    def _commit(self, changes: list) -> None:
+        """
+        Apply and persist the mutations of a finished transaction.
+        
+        Args:
+            changes: (key, (op, value)) pairs in the order they were last written
+        """
+        with self._key_locks.locked(key for key, _ in changes):
+            events = []
+            with self._rw_lock.write_locked():
+                for key, (op, value) in changes:
+                    if op == "set":
+                        if key not in self._state:
+                            self._index_key(key)
+                        self._state[key] = value
+                    elif key in self._state:
+                        del self._state[key]
+                        self._unindex_key(key)
                     else:
-                        serializable_state[key] = value
-                
-                json.dump(serializable_state, f)
+                        # Deleting a key that didn't exist changes nothing
+                        continue
+                    events.append(StateChange(key, op, self._next_version(key)))
+            
+            self._record_batch([(op, key, value) for key, (op, value) in changes])
+            self._publish(events)
+    
+    def _next_version(self, key: Optional[str]) -> int:
+        """
+        Advance the state version for a change of one key, or of all keys
+        for key None. Must be called while holding the lock that serializes
+        writes of the backend.
+        
+        Args:
+            key: Changed key, or None for a clear
+            
+        Returns:
+            The new state version
+        """
+        self._version += 1
+        if key is None:
+            self._key_versions = {}
+            self._cleared_version = self._version
+        else:
+            self._key_versions[key] = self._version
+        return self._version
+    
+    def _publish(self, events: List[StateChange]) -> None:
+        """
+        Deliver committed changes to the subscribed listeners.
+        
+        Args:
+            events: Changes in the order they were committed
+        """
+        if not self._listeners or not events:
+            return
+        
+        with self._listeners_lock:
+            listeners = list(self._listeners.values())
+        
+        for event in events:
+            for listener, prefix in listeners:
+                if prefix and event.key is not None and not event.key.startswith(prefix):
+                    continue
+                try:
+                    listener(event)
+                except Exception as e:
+                    logger.error(f"Error in state change listener: {e}")
+    
+    def compact(self) -> None:
+        """
+        Write the full state to the persistence file.
+        
+        In "wal" mode this folds the write-ahead log into the state file
+        and truncates the log, so startup doesn't have to replay it.
+        """
+        if not self._persistence_file:
+            return
+        
+        with self._write_lock:
+            try:
+                self._persist_state(raise_errors=True)
+                # Only drop the log once its records are safely in the state file
+                if self._wal is not None:
+                    self._wal.truncate()
+            except Exception as e:
+                logger.error(f"Error compacting state: {e}")
+    
+    def flush(self) -> None:
+        """
+        Write all pending mutations to disk.
+        
+        Blocks until the write has finished. This is a no-op with the
+        "per_write" flush policy, where nothing is ever pending.
+        """
+        if not self._persistence_file:
+            return
+        
+        with self._write_lock:
+            with self._pending_lock:
+                pending, pending_clear = self._pending, self._pending_clear
+                self._pending = {}
+                self._pending_clear = False
+                self._pending_count = 0
+            
+            if not pending and not pending_clear:
+                return
+            
+            # Values are read at flush time, so several writes to the same
+            # key between flushes are persisted as one record
+            records = [
+                (op, key, self._state.get(key) if op == "set" else None)
+                for key, op in pending.items()
+            ]
+            
+            try:
+                if pending_clear and self._wal is not None:
+                    # The snapshot covers everything since the clear
+                    self._persist_state(raise_errors=True)
+                    self._wal.truncate()
+                else:
+                    self._write_records(records)
+            except Exception as e:
+                logger.error(f"Error flushing state: {e}")
+                self._requeue(pending, pending_clear)
+    
+    def close(self) -> None:
+        """Stop the background threads, write pending mutations and release files"""
+        if self._snapshotter is not None:
+            self._snapshotter.stop()
+            self._snapshotter = None
+        if self._flusher is not None:
+            self._flusher.stop()
+            self._flusher = None
+        self.flush()
+        if self._wal is not None:
+            self._wal.close()
+        with self._rw_lock.write_locked():
+            if self._lazy_snapshot is not None:
+                self._lazy_snapshot.close()
+                self._lazy_snapshot = None
+    
+    def _snapshot_if_dirty(self) -> None:
+        """Write pending mutations and fold a non-empty write-ahead log into a snapshot"""
+        self.flush()
+        if self._wal is not None and self._wal.record_count > 0:
+            self.compact()
+    
+    def _hydrate(self, key: str, default: Any = None) -> Any:
+        """
+        Load a value that is still on disk in the lazily loaded snapshot.
+        
+        Args:
+            key: State key
+            default: Default value if the key no longer exists
+            
+        Returns:
+            The loaded value
+        """
+        with self._rw_lock.write_locked():
+            value = self._state.get(key, default)
+            if isinstance(value, SnapshotRecordRef):
+                value = self._lazy_snapshot.load(value)
+                self._state[key] = value
+            return value
+    
+    def _hydrate_all(self) -> None:
+        """Load every value still on disk and close the lazily loaded snapshot"""
+        with self._rw_lock.write_locked():
+            if self._lazy_snapshot is None:
+                return
+            for key, value in list(self._state.items()):
+                if isinstance(value, SnapshotRecordRef):
+                    self._state[key] = self._lazy_snapshot.load(value)
+            self._lazy_snapshot.close()
+            self._lazy_snapshot = None
+    
+    def _index_key(self, key: str) -> None:
+        """Add a key to the key index"""
+        namespace = key_namespace(key)
+        if namespace is not None:
+            self._key_index.setdefault(namespace, {})[key] = None
+    
+    def _unindex_key(self, key: str) -> None:
+        """Remove a key from the key index"""
+        namespace = key_namespace(key)
+        if namespace is not None:
+            self._key_index.get(namespace, {}).pop(key, None)
+    
+    def _rebuild_key_index(self) -> None:
+        """Rebuild the key index from the current state"""
+        self._key_index = {}
+        for key in self._state:
+            self._index_key(key)
+    
+    def _record_mutation(self, op: str, key: Optional[str] = None, value: Any = None) -> None:
+        """
+        Persist or queue a single mutation according to the flush policy.
+        
+        Args:
+            op: Operation name ("set", "delete" or "clear")
+            key: State key affected by the operation
+            value: New value for "set" operations
+        """
+        if not self._persistence_file:
+            return
+        
+        if op != "clear":
+            self._record_batch([(op, key, value)])
+            return
+        
+        if self._flusher is None:
+            with self._write_lock:
+                try:
+                    self._persist_state(raise_errors=True)
+                    if self._wal is not None:
+                        self._wal.truncate()
+                except Exception as e:
+                    logger.error(f"Error persisting state: {e}")
+            return
+        
+        with self._pending_lock:
+            self._pending = {}
+            self._pending_clear = True
+            self._pending_count += 1
+    
+    def _record_batch(self, records: list) -> None:
+        """
+        Persist or queue set/delete mutations according to the flush policy.
+        
+        Records passed together are persisted together: in one snapshot
+        write or one write-ahead log record, or in the same deferred flush.
+        
+        Args:
+            records: (op, key, value) tuples in the order they happened
+        """
+        if not self._persistence_file:
+            return
+        
+        if self._flusher is None:
+            with self._write_lock:
+                try:
+                    self._write_records(records)
+                except Exception as e:
+                    logger.error(f"Error persisting state: {e}")
+            return
+        
+        with self._pending_lock:
+            for op, key, _ in records:
+                # Re-insert so the key moves to the end, keeping the
+                # pending records in the order they were last written
+                self._pending.pop(key, None)
+                self._pending[key] = op
+            self._pending_count += len(records)
+            batch_full = self._pending_count >= self._flush_batch_size
+        
+        if self._flush_policy == "batch" and batch_full:
+            self._flusher.notify()
+    
+    def _write_records(self, records: list) -> None:
+        """
+        Write a batch of mutation records according to the persistence mode.
+        
+        Args:
+            records: (op, key, value) tuples in the order they happened
+            
+        Raises:
+            Exception: If the write fails
+        """
+        if self._wal is None:
+            self._persist_state(raise_errors=True)
+            return
+        
+        self._wal.append_many(records)
+        if self._wal.record_count >= self._wal_compact_threshold:
+            self.compact()
+    
+    def _requeue(self, pending: Dict[str, str], pending_clear: bool) -> None:
+        """
+        Put mutations from a failed flush back in the pending queue.
+        
+        Keys written again since the failed flush keep their newer record.
+        
+        Args:
+            pending: Pending mutations taken by the failed flush
+            pending_clear: Whether the failed flush included a clear
+        """
+        with self._pending_lock:
+            if self._pending_clear:
+                return
+            merged = dict(pending)
+            for key, op in self._pending.items():
+                merged.pop(key, None)
+                merged[key] = op
+            self._pending = merged
+            self._pending_clear = pending_clear
+            self._pending_count += len(pending)
+    
+    def _persist_state(self, raise_errors: bool = False) -> None:
+        """
+        Persist the whole state to file if persistence is enabled.
+        
+        Args:
+            raise_errors: Whether to re-raise write errors instead of logging them
+        """
+        if not self._persistence_file:
+            return
+        
+        try:
+            if self._lazy_snapshot is not None:
+                with self._rw_lock.write_locked():
+                    if self._lazy_snapshot is not None:
+                        # Writing may replace the file the unloaded values live
+                        # in, so this has to happen with hydration locked out
+                        self._persist_lazy_state()
+                        return
+            
+            with self._rw_lock.read_locked():
+                # Copy first so concurrent writers can't change the dict mid-write
+                state = dict(self._state)
+            
+            if self._snapshot_format == "binary":
+                write_binary_snapshot(self._persistence_file, state)
+            else:
+                write_json_snapshot(self._persistence_file, state)
         except Exception as e:
-            print(f"Error persisting state to file: {e}")
+            if raise_errors:
+                raise
+            logger.error(f"Error persisting state to file: {e}")
+    
+    def _persist_lazy_state(self) -> None:
+        """
+        Persist the whole state while some values are still unloaded.
+        
+        Binary snapshots copy unloaded records as raw bytes and the
+        placeholders are re-pointed at the new file; JSON snapshots need
+        every value loaded first. Must be called with the write lock held.
+        """
+        if self._snapshot_format != "binary":
+            self._hydrate_all()
+            write_json_snapshot(self._persistence_file, dict(self._state))
+            return
+        
+        state = dict(self._state)
+        source = self._lazy_snapshot
+        try:
+            index = write_binary_snapshot(self._persistence_file, state, source=source)
+        except Exception:
+            if source.closed:
+                # The old file is still in place if moving the new one failed
+                self._lazy_snapshot = LazyBinarySnapshot(self._persistence_file)
+            raise
+        
+        self._lazy_snapshot = None
+        unloaded = [key for key, value in state.items() if isinstance(value, SnapshotRecordRef)]
+        if unloaded:
+            self._lazy_snapshot = LazyBinarySnapshot(self._persistence_file)
+            for key in unloaded:
+                offset, length = index[key]
+                self._state[key] = SnapshotRecordRef(offset, length)
     
     def _load_state_from_file(self) -> None:
-        """Load state from persistence file"""
-        if not self._persistence_file or not os.path.exists(self._persistence_file):
+        """Load state from the persistence file and replay the write-ahead log"""
+        if not self._persistence_file:
             return
             
         try:
-            with open(self._persistence_file, 'r') as f:
-                self._state = json.load(f)
+            if self._lazy_load and is_binary_snapshot(self._persistence_file):
+                self._lazy_snapshot = LazyBinarySnapshot(self._persistence_file)
+                self._state = self._lazy_snapshot.refs()
+            else:
+                self._state = read_snapshot(self._persistence_file)
         except Exception as e:
-            print(f"Error loading state from file: {e}")
+            logger.error(f"Error loading state from file: {e}")
+        
+        if self._wal is not None:
+            try:
+                for record in self._wal.replay():
+                    apply_wal_record(self._state, record)
+            except Exception as e:
+                logger.error(f"Error replaying write-ahead log: {e}")
+        
+        self._rebuild_key_index()
+
 
+def create_state_manager_from_env() -> StateManager:
+    """
+    Create a state manager configured by environment variables.
+    
+    - SAP_HARNESS_STATE_BACKEND: "memory" (default) or "sqlite"
+    - SAP_HARNESS_STATE_FILE: persistence file, or database file for "sqlite"
+    - SAP_HARNESS_PERSISTENCE_MODE: "snapshot" (default) or "wal"
+    - SAP_HARNESS_FLUSH_POLICY: "per_write" (default), "interval" or "batch"
+    - SAP_HARNESS_SNAPSHOT_FORMAT: "json" (default) or "binary"
+    - SAP_HARNESS_SNAPSHOT_INTERVAL: seconds between background snapshots
+    - SAP_HARNESS_LAZY_LOAD: "true" to load binary snapshot values on first access
+    - SAP_HARNESS_LOCK_STRIPES: number of per-key write locks (default 64)
+    - SAP_HARNESS_POLL_INTERVAL: seconds between checks for changes made by
+      other processes sharing a "sqlite" database
+    
+    Returns:
+        StateManager: A new state manager instance
+    """
+    backend = os.environ.get("SAP_HARNESS_STATE_BACKEND", "memory")
+    state_file = os.environ.get("SAP_HARNESS_STATE_FILE") or None
+    
+    if backend == "sqlite":
+        # Imported here because the SQLite backend subclasses StateManager
+        from services.sqlite_state_manager import SQLiteStateManager
+        return SQLiteStateManager(
+            state_file or "state.db",
+            poll_interval_s=float(os.environ.get("SAP_HARNESS_POLL_INTERVAL", 0)) or None
+        )
+    elif backend != "memory":
+        raise ValueError(f"Unknown state backend '{backend}', expected 'memory' or 'sqlite'")
+    
+    return StateManager(
+        persistence_file=state_file,
+        persistence_mode=os.environ.get("SAP_HARNESS_PERSISTENCE_MODE", "snapshot"),
+        flush_policy=os.environ.get("SAP_HARNESS_FLUSH_POLICY", "per_write"),
+        snapshot_format=os.environ.get("SAP_HARNESS_SNAPSHOT_FORMAT", "json"),
+        snapshot_interval_s=float(os.environ.get("SAP_HARNESS_SNAPSHOT_INTERVAL", 0)) or None,
+        lazy_load=os.environ.get("SAP_HARNESS_LAZY_LOAD", "").lower() == "true",
+        lock_stripes=int(os.environ.get("SAP_HARNESS_LOCK_STRIPES", 64))
+    )
 
 # Initialize global state_manager 
 state_manager = None
@@ -154,11 +968,14 @@ def get_state_manager():
     """
     global state_manager
     if state_manager is None:
-        state_manager = StateManager()
+        state_manager = create_state_manager_from_env()
     return state_manager
 
 # Ensure state_manager is initialized
 state_manager = get_state_manager()
 
 # Export both the class, the getter, and the instance
-__all__ = ["StateManager", "state_manager", "get_state_manager"]
+__all__ = [
+    "StateManager", "StateChange", "state_manager", "get_state_manager",
+    "create_state_manager_from_env", "key_namespace"
+]
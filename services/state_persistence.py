@@ -0,0 +1,565 @@
+# services/state_persistence.py
+"""
+Persistence helpers for the state manager.
+
+This module provides the on-disk formats used by StateManager:
+- Whole-state JSON snapshots (the original persistence format)
+- Versioned binary snapshots of length-prefixed pickle records
+- An append-only write-ahead log (WAL) of individual mutations
+- A background flusher thread for deferred (coalesced) writes
+
+The StateManager decides when to use each format; the functions and
+classes here only know how to read and write them.
+"""
+
+import json
+import logging
+import os
+import pickle
+import struct
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from pydantic import BaseModel
+
+# Configure logging
+logger = logging.getLogger("state_persistence")
+
+# Suffix appended to the persistence file name for the write-ahead log
+WAL_SUFFIX = ".wal"
+
+# Binary snapshot layout:
+#   header:  MAGIC + format version (uint16)
+#   records: record length (uint32) + pickled (key, value), one per state key
+#   index:   pickled [(key, offset, length), ...] for every record
+#   trailer: index offset (uint64) + MAGIC
+BINARY_SNAPSHOT_MAGIC = b"SMSNAP"
+BINARY_SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct(">H")
+_RECORD_LENGTH = struct.Struct(">I")
+_TRAILER = struct.Struct(">Q")
+_PICKLE_PROTOCOL = 5
+
+def serialize_value(value: Any) -> Any:
+    """
+    Convert a state value to a JSON-serializable form.
+
+    Args:
+        value: Value stored in the state manager
+
+    Returns:
+        JSON-serializable representation of the value
+    """
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    elif isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def write_json_snapshot(path: str, state: Dict[str, Any]) -> None:
+    """
+    Write the whole state to a JSON snapshot file.
+
+    The snapshot is written to a temporary file first and then moved into
+    place, so a crash while writing never leaves a truncated snapshot behind.
+
+    Args:
+        path: Snapshot file path
+        state: State dictionary to write
+    """
+    serializable_state = {key: serialize_value(value) for key, value in state.items()}
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(serializable_state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def read_json_snapshot(path: str) -> Dict[str, Any]:
+    """
+    Read a JSON snapshot file.
+
+    Args:
+        path: Snapshot file path
+
+    Returns:
+        State dictionary, empty if the file doesn't exist or is empty
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return {}
+
+    with open(path, 'r') as f:
+        return json.load(f)
+
+class SnapshotRecordRef:
+    """
+    Placeholder for a state value that is still on disk in a binary snapshot.
+
+    Attributes:
+        offset: Byte offset of the record in the snapshot file
+        length: Record length in bytes, including its length prefix
+    """
+    __slots__ = ("offset", "length")
+
+    def __init__(self, offset: int, length: int):
+        self.offset = offset
+        self.length = length
+
+def write_binary_snapshot(path: str, state: Dict[str, Any],
+                          source: Optional["LazyBinarySnapshot"] = None) -> Dict[str, Tuple[int, int]]:
+    """
+    Write the whole state to a binary snapshot file.
+
+    Values are pickled as they are, so models come back as model instances
+    without being re-parsed and re-validated. Like JSON snapshots, the file
+    is written to a temporary file first and then moved into place.
+
+    Values that are still SnapshotRecordRef placeholders are copied from
+    `source` byte for byte, without being unpickled. The source is closed
+    before the new file is moved into place, since it is usually the file
+    being replaced.
+
+    Args:
+        path: Snapshot file path
+        state: State dictionary to write
+        source: Snapshot that SnapshotRecordRef values point into
+
+    Returns:
+        Dictionary mapping each key to its (offset, length) in the new file
+    """
+    temp_path = f"{path}.tmp"
+    index = []
+    with open(temp_path, 'wb') as f:
+        f.write(BINARY_SNAPSHOT_MAGIC + _HEADER.pack(BINARY_SNAPSHOT_VERSION))
+        for key, value in state.items():
+            offset = f.tell()
+            if isinstance(value, SnapshotRecordRef):
+                record = source.read_record(value)
+            else:
+                data = pickle.dumps((key, value), protocol=_PICKLE_PROTOCOL)
+                record = _RECORD_LENGTH.pack(len(data)) + data
+            f.write(record)
+            index.append((key, offset, len(record)))
+
+        index_offset = f.tell()
+        f.write(pickle.dumps(index, protocol=_PICKLE_PROTOCOL))
+        f.write(_TRAILER.pack(index_offset) + BINARY_SNAPSHOT_MAGIC)
+        f.flush()
+        os.fsync(f.fileno())
+
+    if source is not None:
+        source.close()
+    os.replace(temp_path, path)
+
+    return {key: (offset, length) for key, offset, length in index}
+
+def is_binary_snapshot(path: str) -> bool:
+    """
+    Check whether a file is a binary snapshot.
+
+    Args:
+        path: Snapshot file path
+
+    Returns:
+        True if the file starts with the binary snapshot magic bytes
+    """
+    if not os.path.exists(path):
+        return False
+    with open(path, 'rb') as f:
+        return f.read(len(BINARY_SNAPSHOT_MAGIC)) == BINARY_SNAPSHOT_MAGIC
+
+def _read_binary_snapshot_bounds(f, path: str) -> int:
+    """
+    Validate a binary snapshot's header and trailer.
+
+    Args:
+        f: Snapshot file opened in binary mode
+        path: Snapshot file path, for error messages
+
+    Returns:
+        Byte offset of the key index (the end of the records)
+
+    Raises:
+        ValueError: If the file is not a complete binary snapshot of a
+                    supported version
+    """
+    header_size = len(BINARY_SNAPSHOT_MAGIC) + _HEADER.size
+    trailer_size = _TRAILER.size + len(BINARY_SNAPSHOT_MAGIC)
+
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    header = f.read(header_size)
+    if size < header_size + trailer_size or not header.startswith(BINARY_SNAPSHOT_MAGIC):
+        raise ValueError(f"{path} is not a complete binary snapshot")
+
+    version, = _HEADER.unpack_from(header, len(BINARY_SNAPSHOT_MAGIC))
+    if version != BINARY_SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported binary snapshot version {version} in {path}")
+
+    f.seek(size - trailer_size)
+    trailer = f.read(trailer_size)
+    index_offset, = _TRAILER.unpack_from(trailer)
+    if not trailer.endswith(BINARY_SNAPSHOT_MAGIC) \
+            or not header_size <= index_offset <= size - trailer_size:
+        raise ValueError(f"{path} is not a complete binary snapshot")
+
+    return index_offset
+
+def read_binary_snapshot(path: str) -> Dict[str, Any]:
+    """
+    Read a binary snapshot file.
+
+    Snapshots are unpickled, so only files written by this application
+    should ever be loaded.
+
+    Args:
+        path: Snapshot file path
+
+    Returns:
+        State dictionary
+
+    Raises:
+        ValueError: If the file is not a complete binary snapshot of a
+                    supported version
+    """
+    with open(path, 'rb') as f:
+        index_offset = _read_binary_snapshot_bounds(f, path)
+        header_size = len(BINARY_SNAPSHOT_MAGIC) + _HEADER.size
+        f.seek(header_size)
+        data = f.read(index_offset - header_size)
+
+    state = {}
+    offset = 0
+    view = memoryview(data)
+    while offset < len(data):
+        length, = _RECORD_LENGTH.unpack_from(data, offset)
+        offset += _RECORD_LENGTH.size
+        key, value = pickle.loads(view[offset:offset + length])
+        state[key] = value
+        offset += length
+    return state
+
+class LazyBinarySnapshot:
+    """
+    Binary snapshot opened for loading individual records on demand.
+
+    Opening the snapshot reads only its key index; each record is read and
+    unpickled when load() is called for it.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open the snapshot and read its key index.
+
+        Args:
+            path: Snapshot file path
+
+        Raises:
+            ValueError: If the file is not a complete binary snapshot of a
+                        supported version
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'rb')
+        try:
+            index_offset = _read_binary_snapshot_bounds(self._file, path)
+            trailer_size = _TRAILER.size + len(BINARY_SNAPSHOT_MAGIC)
+            self._file.seek(0, os.SEEK_END)
+            index_length = self._file.tell() - trailer_size - index_offset
+            self._file.seek(index_offset)
+            self._index = pickle.loads(self._file.read(index_length))
+        except Exception:
+            self._file.close()
+            raise
+
+    def refs(self) -> Dict[str, SnapshotRecordRef]:
+        """
+        Get a placeholder for every record in the snapshot.
+
+        Returns:
+            Dictionary mapping each key to its record placeholder
+        """
+        return {key: SnapshotRecordRef(offset, length) for key, offset, length in self._index}
+
+    def read_record(self, ref: SnapshotRecordRef) -> bytes:
+        """
+        Read a record's raw bytes, including its length prefix.
+
+        Args:
+            ref: Record placeholder
+
+        Returns:
+            Raw record bytes
+        """
+        with self._lock:
+            self._file.seek(ref.offset)
+            return self._file.read(ref.length)
+
+    def load(self, ref: SnapshotRecordRef) -> Any:
+        """
+        Read and unpickle a record.
+
+        Args:
+            ref: Record placeholder
+
+        Returns:
+            The stored value
+        """
+        record = self.read_record(ref)
+        _, value = pickle.loads(memoryview(record)[_RECORD_LENGTH.size:])
+        return value
+
+    @property
+    def closed(self) -> bool:
+        """Whether the snapshot file has been closed"""
+        return self._file.closed
+
+    def close(self) -> None:
+        """Close the snapshot file"""
+        self._file.close()
+
+def read_snapshot(path: str) -> Dict[str, Any]:
+    """
+    Read a snapshot file in either format.
+
+    Args:
+        path: Snapshot file path
+
+    Returns:
+        State dictionary, empty if the file doesn't exist or is empty
+    """
+    if is_binary_snapshot(path):
+        return read_binary_snapshot(path)
+    return read_json_snapshot(path)
+
+class WriteAheadLog:
+    """
+    Append-only log of state mutations.
+
+    Each mutation is written as one JSON line:
+        {"op": "set", "key": "...", "value": ...}
+        {"op": "delete", "key": "..."}
+        {"op": "clear"}
+
+    Several mutations written together share one line, so a crash can't
+    leave only part of them in the log:
+        {"op": "batch", "records": [{"op": "set", ...}, ...]}
+
+    Appending a record costs O(size of the change) instead of
+    O(size of the whole state).
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        """
+        Initialize the log.
+
+        Args:
+            path: Log file path
+            fsync: Whether to fsync after every append (slower, but durable
+                   across power loss and not just process crashes)
+        """
+        self.path = path
+        self.fsync = fsync
+        self.record_count = 0
+        self._file = None
+
+    def _open(self):
+        """Open the log file for appending if it isn't open yet"""
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def append(self, op: str, key: Optional[str] = None, value: Any = None) -> None:
+        """
+        Append a mutation record to the log.
+
+        Args:
+            op: Operation name ("set", "delete" or "clear")
+            key: State key affected by the operation
+            value: New value for "set" operations
+        """
+        self.append_many([(op, key, value)])
+
+    def append_many(self, records: Iterable[Tuple[str, Optional[str], Any]]) -> None:
+        """
+        Append several mutation records atomically.
+
+        More than one record is written as a single batch line, which is
+        either replayed completely or (if torn by a crash) not at all.
+
+        Args:
+            records: (op, key, value) tuples in the order they happened
+        """
+        entries = []
+        for op, key, value in records:
+            entry = {"op": op}
+            if key is not None:
+                entry["key"] = key
+            if op == "set":
+                entry["value"] = serialize_value(value)
+            entries.append(entry)
+
+        if not entries:
+            return
+
+        line = entries[0] if len(entries) == 1 else {"op": "batch", "records": entries}
+
+        f = self._open()
+        f.write(json.dumps(line) + "\n")
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+        self.record_count += len(entries)
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the records in the log.
+
+        A torn record at the end of the log (from a crash in the middle of
+        an append) is dropped and cut off the file, so later appends start
+        on a clean line.
+
+        Yields:
+            Mutation records in the order they were written
+        """
+        if not os.path.exists(self.path):
+            return
+
+        valid_end = 0
+        torn = False
+        self.record_count = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    valid_end += len(line)
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Ignoring torn record at offset {valid_end} in {self.path}")
+                    torn = True
+                    break
+                if not line.endswith(b"\n"):
+                    # A complete JSON object without its newline is still usable,
+                    # but the newline has to be restored before appending
+                    torn = True
+                valid_end += len(line)
+                self.record_count += len(record.get("records", ())) if record.get("op") == "batch" else 1
+                yield record
+
+        if torn:
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_end)
+                if valid_end and self._ends_without_newline(f, valid_end):
+                    f.seek(valid_end)
+                    f.write(b"\n")
+
+    @staticmethod
+    def _ends_without_newline(f, size: int) -> bool:
+        """Check whether the file's last byte before size is not a newline"""
+        f.seek(size - 1)
+        return f.read(1) != b"\n"
+
+    def truncate(self) -> None:
+        """Discard all records in the log"""
+        self.close()
+        with open(self.path, 'w', encoding='utf-8'):
+            pass
+        self.record_count = 0
+
+    def close(self) -> None:
+        """Close the log file handle"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class BackgroundFlusher:
+    """
+    Daemon thread that calls a flush function in the background.
+
+    The thread wakes up every `interval` seconds, or as soon as notify()
+    is called, so writers only hand off their changes and never wait on
+    the disk themselves.
+    """
+
+    def __init__(self, flush_fn: Callable[[], None], interval: Optional[float] = None,
+                 name: str = "state-flusher"):
+        """
+        Initialize the flusher.
+
+        Args:
+            flush_fn: Function that writes out pending changes
+            interval: Seconds between flushes, or None to flush only when notified
+            name: Thread name
+        """
+        self._flush_fn = flush_fn
+        self._interval = interval
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def notify(self) -> None:
+        """Ask the thread to flush now instead of waiting for the interval"""
+        self._wake.set()
+
+    def stop(self) -> None:
+        """Stop the thread; pending changes are left for the caller to flush"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self) -> None:
+        """Flush loop"""
+        while not self._stopped.is_set():
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self._flush_fn()
+            except Exception as e:
+                logger.error(f"Error in background flush: {e}")
+
+def apply_wal_record(state: Dict[str, Any], record: Dict[str, Any]) -> None:
+    """
+    Apply a single write-ahead log record to a state dictionary.
+
+    Args:
+        state: State dictionary to modify
+        record: Mutation record read from the log
+    """
+    op = record.get("op")
+    if op == "set":
+        state[record["key"]] = record.get("value")
+    elif op == "delete":
+        state.pop(record["key"], None)
+    elif op == "clear":
+        state.clear()
+    elif op == "batch":
+        for entry in record.get("records", []):
+            apply_wal_record(state, entry)
+    else:
+        logger.warning(f"Ignoring unknown write-ahead log operation: {op}")
+
+__all__ = [
+    "WAL_SUFFIX",
+    "serialize_value",
+    "write_json_snapshot",
+    "read_json_snapshot",
+    "BINARY_SNAPSHOT_MAGIC",
+    "BINARY_SNAPSHOT_VERSION",
+    "write_binary_snapshot",
+    "is_binary_snapshot",
+    "read_binary_snapshot",
+    "SnapshotRecordRef",
+    "LazyBinarySnapshot",
+    "read_snapshot",
+    "WriteAheadLog",
+    "BackgroundFlusher",
+    "apply_wal_record"
+]
@@ -121,14 +121,14 @@ class TestMaterialP2PIntegration:
     def test_create_requisition_with_inactive_material(self):
         """Test creating a requisition with an inactive material"""
         
-        # Change material status to DEPRECATED (which should be rejected by validate_material_active)
+        # Change material status to DEPRECATED (which should be rejected by validate_item_materials)
         self.material_service.update_material(
             self.mat001.material_number,
             MaterialStatus.DEPRECATED
         )
         
         # Attempt to create a requisition with the deprecated material
-        with pytest.raises(ValidationError):
+        with pytest.raises(ValidationError) as excinfo:
             self.p2p_service.create_requisition(
                 RequisitionCreate(
                     document_number="REQINACTIVE",
@@ -146,6 +146,7 @@ class TestMaterialP2PIntegration:
                     ]
                 )
             )
+        assert excinfo.value.details["reason"] == "deprecated"
             
     def test_end_to_end_procurement_flow(self):
         """Test the end-to-end procurement flow from requisition to order"""
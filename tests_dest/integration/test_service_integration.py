@@ -416,11 +416,10 @@ class TestServiceIntegration:
     
     def test_error_propagation_between_services(self):
         """Test that errors are properly propagated between services"""
-        # Create a mock material service that raises NotFoundError
+        # Create a mock material service that doesn't find any material
         mock_material_service = MagicMock()
-        mock_material_service.get_material.side_effect = NotFoundError(
-            message="Material not found in mock",
-            details={"material_id": "MOCKMAT001"}
+        mock_material_service.get_materials_status.side_effect = (
+            lambda material_numbers: {number: None for number in material_numbers}
         )
         
         # Create a P2P service with the mock material service
@@ -446,12 +445,14 @@ class TestServiceIntegration:
         with pytest.raises(ValidationError) as excinfo:
             p2p_service.create_requisition(req_data)
         
-        # Verify error message includes information from the material service error
+        # Verify error message includes information from the material service lookup
         assert "Invalid material" in str(excinfo.value.message)
         assert "MOCKMAT001" in str(excinfo.value.message)
+        assert excinfo.value.details["reason"] == "not_found"
         
-        # Verify the material service was called with the correct material ID
-        mock_material_service.get_material.assert_called_with("MOCKMAT001")
+        # Verify the materials were looked up with one call to the material service
+        mock_material_service.get_materials_status.assert_called_once()
+        mock_material_service.get_material.assert_not_called()
 
     # New tests for Monitor Service integration
 
@@ -0,0 +1,588 @@
+# tests-dest/models_tests/test_entity_store.py
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from services.state_manager import StateManager
+from services.sqlite_state_manager import SQLiteStateManager
+from models.common import EntityCollection
+from models.entity_index import EntityIndex, SortedIndex, datetime_value
+from models.entity_query import And, Contains, Eq, In, Or, Predicate, Prefix, Range, where
+from models.entity_store import EntityStore, decode_cursor
+from models.p2p import DocumentStatus, P2PDataLayer, RequisitionCreate, RequisitionUpdate
+from models.material import (
+    Material, MaterialCreate, MaterialDataLayer, MaterialStatus, MaterialType, MaterialUpdate
+)
+
+class TestEntityStore:
+    def setup_method(self):
+        """Set up a store on a fresh state manager"""
+        self.state_manager = StateManager()
+        self.store = EntityStore(self.state_manager, "materials", Material)
+
+    def test_entities_are_stored_per_key(self):
+        """Test that each entity gets its own state key"""
+        self.store.save("MAT001", Material(material_number="MAT001", name="First"))
+        self.store.save("MAT002", Material(material_number="MAT002", name="Second"))
+
+        assert self.state_manager.get_keys("materials/") == ["materials/MAT001", "materials/MAT002"]
+        assert self.store.ids() == ["MAT001", "MAT002"]
+        assert self.store.count() == 2
+        assert self.store.get("MAT002").name == "Second"
+
+    def test_remove(self):
+        """Test removing an entity drops its key from the index"""
+        self.store.save("MAT001", Material(material_number="MAT001", name="First"))
+
+        assert self.store.remove("MAT001") is True
+        assert self.store.remove("MAT001") is False
+        assert self.store.exists("MAT001") is False
+        assert self.store.count() == 0
+
+    def test_legacy_collection_is_migrated(self):
+        """Test that a whole-collection key from older state is split into entity keys"""
+        state_manager = StateManager()
+        collection = EntityCollection(name="Materials")
+        collection.add("MAT001", Material(material_number="MAT001", name="Legacy").model_dump(mode="json"))
+        state_manager.set("materials", collection.model_dump(mode="json"))
+
+        store = EntityStore(state_manager, "materials", Material)
+
+        assert state_manager.get("materials") is None
+        assert store.ids() == ["MAT001"]
+        assert store.get("MAT001").name == "Legacy"
+
+    def test_indexes_without_change_feed(self):
+        """Test that indexes are rebuilt on use when the state manager has no change feed"""
+        class NoFeedStateManager(StateManager):
+            subscribe = None
+
+        state_manager = NoFeedStateManager()
+        store = EntityStore(state_manager, "materials", Material)
+        store.add_index("status")
+        store.save("MAT001", Material(material_number="MAT001", name="First"))
+        assert store.find_ids(status=MaterialStatus.ACTIVE)[0] == ["MAT001"]
+
+        state_manager.set("materials/MAT002", Material(material_number="MAT002", name="Second"))
+        assert sorted(store.find_ids(status=MaterialStatus.ACTIVE)[0]) == ["MAT001", "MAT002"]
+
+    def test_write_touches_only_one_key(self):
+        """Test that updating one material doesn't rewrite the others"""
+        data_layer = MaterialDataLayer(self.state_manager)
+        for i in range(5):
+            data_layer.create(MaterialCreate(material_number=f"MAT{i:03d}", name=f"Material {i}"))
+
+        written = []
+        original_set = self.state_manager.set
+        self.state_manager.set = lambda key, value: (written.append(key), original_set(key, value))
+
+        data_layer.update("MAT003", MaterialUpdate(name="Renamed"))
+
+        assert written == ["materials/MAT003"]
+
+class TestEntityStoreSQLite:
+    def setup_method(self):
+        """Set up a store on a SQLite state manager"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.state_manager = SQLiteStateManager(os.path.join(self.temp_dir, "state.db"))
+
+    def teardown_method(self):
+        """Close the database and remove the temporary directory"""
+        self.state_manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_data_layer_round_trip(self):
+        """Test that the data layer works with per-row storage"""
+        data_layer = MaterialDataLayer(self.state_manager)
+        data_layer.create(MaterialCreate(material_number="MAT001", name="First"))
+        data_layer.create(MaterialCreate(material_number="MAT002", name="Second"))
+        data_layer.update("MAT001", MaterialUpdate(name="Renamed"))
+        data_layer.delete("MAT002")
+
+        assert self.state_manager.get_keys("materials/") == ["materials/MAT001"]
+        assert data_layer.get_by_id("MAT001").name == "Renamed"
+        assert data_layer.count() == 1
+
+class TestEntityIndexes:
+    def setup_method(self):
+        """Set up a material data layer with a few materials"""
+        self.state_manager = StateManager()
+        self.data_layer = MaterialDataLayer(self.state_manager)
+        for i, (material_type, status) in enumerate([
+            (MaterialType.RAW, MaterialStatus.ACTIVE),
+            (MaterialType.RAW, MaterialStatus.DEPRECATED),
+            (MaterialType.FINISHED, MaterialStatus.ACTIVE),
+            (MaterialType.SERVICE, MaterialStatus.INACTIVE),
+        ]):
+            self.data_layer.create(MaterialCreate(
+                material_number=f"MAT{i:03d}", name=f"Material {i}", type=material_type, status=status
+            ))
+
+    def numbers(self, materials):
+        return sorted(material.material_number for material in materials)
+
+    def test_filter_uses_indexes(self):
+        """Test filtering by indexed fields without loading other materials"""
+        loaded = []
+        original_get = self.state_manager.get
+        self.state_manager.get = lambda key, default=None: (loaded.append(key), original_get(key, default))[1]
+
+        assert self.numbers(self.data_layer.filter(status=MaterialStatus.DEPRECATED)) == ["MAT001"]
+        self.data_layer.filter(status="DEPRECATED")
+
+        # The first lookup builds the index, the second loads only the match
+        assert loaded[-1:] == ["materials/MAT001"]
+
+    def test_combined_and_multi_value_filters(self):
+        """Test intersecting indexes and matching any of several values"""
+        assert self.numbers(self.data_layer.filter(type=MaterialType.RAW, status=MaterialStatus.ACTIVE)) == ["MAT000"]
+        assert self.numbers(self.data_layer.filter(
+            status=[MaterialStatus.ACTIVE, MaterialStatus.INACTIVE]
+        )) == ["MAT000", "MAT002", "MAT003"]
+        assert self.numbers(self.data_layer.filter(type=MaterialType.RAW, name="Material 1")) == ["MAT001"]
+
+    def test_indexes_follow_writes(self):
+        """Test that updates, deletes and clears keep the indexes current"""
+        assert self.numbers(self.data_layer.filter(status=MaterialStatus.DEPRECATED)) == ["MAT001"]
+
+        self.data_layer.update("MAT000", MaterialUpdate(status=MaterialStatus.DEPRECATED))
+        self.data_layer.delete("MAT001")
+        # Writes that bypass the data layer are picked up too
+        self.state_manager.set("materials/MAT009", Material(
+            material_number="MAT009", name="Direct", status=MaterialStatus.DEPRECATED
+        ))
+
+        assert self.numbers(self.data_layer.filter(status=MaterialStatus.DEPRECATED)) == ["MAT000", "MAT009"]
+        assert self.numbers(self.data_layer.filter(status=MaterialStatus.ACTIVE)) == ["MAT002"]
+
+        self.state_manager.clear()
+        assert self.data_layer.filter(status=MaterialStatus.DEPRECATED) == []
+
+    def test_indexes_on_sqlite(self):
+        """Test that indexes work with values stored as dictionaries"""
+        temp_dir = tempfile.mkdtemp()
+        state_manager = SQLiteStateManager(os.path.join(temp_dir, "state.db"))
+        try:
+            data_layer = MaterialDataLayer(state_manager)
+            data_layer.create(MaterialCreate(material_number="MAT001", name="First", type=MaterialType.RAW))
+            data_layer.create(MaterialCreate(material_number="MAT002", name="Second"))
+            assert self.numbers(data_layer.filter(type=MaterialType.RAW)) == ["MAT001"]
+
+            data_layer.update("MAT002", MaterialUpdate(type=MaterialType.RAW))
+            assert self.numbers(data_layer.filter(type=MaterialType.RAW)) == ["MAT001", "MAT002"]
+        finally:
+            state_manager.close()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_incomplete_index_cannot_be_created(self):
+        """Test that an index class missing its data structure methods fails up front"""
+        class PartialIndex(EntityIndex):
+            def _reset(self):
+                self.ids = set()
+
+        with pytest.raises(TypeError):
+            PartialIndex("partial")
+
+class TestTextIndex:
+    def setup_method(self):
+        """Set up a material data layer with searchable materials"""
+        self.state_manager = StateManager()
+        self.data_layer = MaterialDataLayer(self.state_manager)
+        self.data_layer.create(MaterialCreate(material_number="BOLT01", name="Steel Bolt", description="M8 hex bolt"))
+        self.data_layer.create(MaterialCreate(material_number="NUT01", name="Steel Nut", type=MaterialType.RAW))
+        self.data_layer.create(MaterialCreate(material_number="OIL01", name="Machine Oil", description="Lubricant"))
+
+    def search(self, term, **filters):
+        return sorted(material.material_number for material in self.data_layer.search(term, **filters))
+
+    def test_substring_semantics(self):
+        """Test that search matches substrings of any field, ignoring case"""
+        assert self.search("steel") == ["BOLT01", "NUT01"]
+        assert self.search("HEX BO") == ["BOLT01"]
+        assert self.search("oil0") == ["OIL01"]
+        assert self.search("ricant") == ["OIL01"]
+        # Every trigram occurs, but not as one substring
+        assert self.search("steel oil") == []
+        assert self.search("copper") == []
+
+    def test_short_terms(self):
+        """Test terms shorter than the n-gram size"""
+        assert self.search("m8") == ["BOLT01"]
+        assert self.search("nu") == ["NUT01"]
+        assert self.search("b") == ["BOLT01", "OIL01"]
+
+    def test_search_with_filters(self):
+        """Test combining search with indexed and plain criteria"""
+        assert self.search("steel", type=MaterialType.RAW) == ["NUT01"]
+        assert self.search("steel", name="Steel Bolt") == ["BOLT01"]
+
+    def test_index_follows_updates(self):
+        """Test that renamed and deleted materials are re-indexed"""
+        assert self.search("bolt") == ["BOLT01"]
+
+        self.data_layer.update("BOLT01", MaterialUpdate(name="Steel Screw", description="M8 screw"))
+        self.data_layer.delete("NUT01")
+
+        assert self.search("bolt") == ["BOLT01"]  # still in the material number
+        assert self.search("hex") == []
+        assert self.search("screw") == ["BOLT01"]
+        assert self.search("steel") == ["BOLT01"]
+
+class TestSortedIndex:
+    def setup_method(self):
+        """Set up an index over documents created a day apart"""
+        self.index = SortedIndex("created_at", key=datetime_value)
+        self.start = datetime(2024, 1, 1)
+        self.index.build(
+            (f"DOC{day}", {"created_at": (self.start + timedelta(days=day)).isoformat()})
+            for day in (3, 0, 2, 1, 4)
+        )
+
+    def day(self, n):
+        return self.start + timedelta(days=n)
+
+    def test_range(self):
+        """Test inclusive and open-ended ranges"""
+        assert self.index.range(self.day(1), self.day(3)) == ["DOC1", "DOC2", "DOC3"]
+        assert self.index.range(self.day(3)) == ["DOC3", "DOC4"]
+        assert self.index.range(hi=self.day(0)) == ["DOC0"]
+        assert self.index.range(self.day(1), self.day(2), reverse=True) == ["DOC2", "DOC1"]
+        assert self.index.range(self.day(5)) == []
+        # Bounds go through the key function too
+        assert self.index.range(self.day(4).isoformat()) == ["DOC4"]
+        assert self.index.count_range(self.day(1)) == 4
+
+    def test_first_and_last(self):
+        """Test taking the lowest and highest values"""
+        assert self.index.first(2) == ["DOC0", "DOC1"]
+        assert self.index.last(2) == ["DOC4", "DOC3"]
+        assert self.index.last(0) == []
+        assert self.index.last(10) == ["DOC4", "DOC3", "DOC2", "DOC1", "DOC0"]
+
+    def test_updates_keep_order(self):
+        """Test moving, adding and removing entries, including equal values"""
+        self.index.update("DOC0", {"created_at": self.day(5)})
+        self.index.update("DOC5", {"created_at": self.day(3)})
+        self.index.update("DOC2", None)
+        self.index.update("DOC6", {"created_at": None})
+
+        assert self.index.range() == ["DOC1", "DOC3", "DOC5", "DOC4", "DOC0"]
+        assert self.index.value_of("DOC6") is None
+
+    def test_after(self):
+        """Test continuing from a (value, ID) position, with equal values ordered by ID"""
+        self.index.update("DOC9", {"created_at": self.day(2)})
+        self.index.update("DOC5", {"created_at": self.day(2)})
+
+        def ids(entries):
+            return [entity_id for _, entity_id in entries]
+
+        assert ids(self.index.after(None, 3)) == ["DOC0", "DOC1", "DOC2"]
+        assert ids(self.index.after((self.day(2), "DOC2"), 3)) == ["DOC5", "DOC9", "DOC3"]
+        assert ids(self.index.after((self.day(2).isoformat(), "DOC5"), 2, reverse=True)) == ["DOC2", "DOC1"]
+        assert ids(self.index.after(None, 2, reverse=True)) == ["DOC4", "DOC3"]
+        # Positions of entities removed since are still valid
+        assert ids(self.index.after((self.day(2), "DOC7"), 1)) == ["DOC9"]
+
+    def test_store_range_queries(self):
+        """Test range queries through a store, mixed with hash criteria"""
+        state_manager = StateManager()
+        data_layer = MaterialDataLayer(state_manager)
+        store = data_layer.store
+        store.add_index(SortedIndex("created_at", key=datetime_value))
+        for number, material_type in [("BOLT01", MaterialType.FINISHED), ("NUT01", MaterialType.RAW),
+                                      ("OIL01", MaterialType.RAW)]:
+            material = data_layer.create(MaterialCreate(material_number=number, name=number, type=material_type))
+            material.created_at = self.day(len(store.ids()))
+            store.save(number, material)
+
+        def numbers(materials):
+            return [material.material_number for material in materials]
+
+        assert numbers(store.find_range("created_at", self.day(2))) == ["NUT01", "OIL01"]
+        assert numbers(store.find_range("created_at", type=MaterialType.RAW, reverse=True)) == ["OIL01", "NUT01"]
+        assert store.count_range("created_at", hi=self.day(2)) == 2
+        assert numbers(store.last("created_at", 2)) == ["OIL01", "NUT01"]
+        assert numbers(store.last("created_at", 1, type=MaterialType.FINISHED)) == ["BOLT01"]
+
+class TestKeysetPagination:
+    def setup_method(self):
+        """Set up a material data layer with 25 materials"""
+        self.state_manager = StateManager()
+        self.data_layer = MaterialDataLayer(self.state_manager)
+        for i in range(25):
+            self.data_layer.create(MaterialCreate(
+                material_number=f"MAT{i:03d}",
+                name=f"Part {i}",
+                type=MaterialType.RAW if i % 5 == 0 else MaterialType.FINISHED
+            ))
+
+    def all_pages(self, limit, **kwargs):
+        """Follow the cursors to the last page, returning the material numbers of each page"""
+        pages = []
+        cursor = None
+        while True:
+            page = self.data_layer.page(limit, cursor, **kwargs)
+            pages.append([material.material_number for material in page.items])
+            if page.next_cursor is None:
+                return pages
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_material_once(self):
+        """Test that pages are ordered, disjoint and complete"""
+        pages = self.all_pages(10)
+
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert sum(pages, []) == [f"MAT{i:03d}" for i in range(25)]
+        # An exact multiple of the limit doesn't leave an empty last page
+        assert [len(page) for page in self.all_pages(5)] == [5] * 5
+
+    def test_filtered_pages(self):
+        """Test paginating filtered and searched listings"""
+        assert self.all_pages(2, type=MaterialType.RAW) == [
+            ["MAT000", "MAT005"], ["MAT010", "MAT015"], ["MAT020"]
+        ]
+        assert self.all_pages(3, search_term="part 1") == [
+            ["MAT001", "MAT010", "MAT011"], ["MAT012", "MAT013", "MAT014"],
+            ["MAT015", "MAT016", "MAT017"], ["MAT018", "MAT019"]
+        ]
+        assert sum(self.all_pages(7, type=MaterialType.FINISHED), []) == [
+            f"MAT{i:03d}" for i in range(25) if i % 5
+        ]
+
+    def test_writes_between_pages(self):
+        """Test that a cursor stays valid when materials are added and removed"""
+        first = self.data_layer.page(10)
+        self.data_layer.delete("MAT009")
+        self.data_layer.delete("MAT010")
+        self.data_layer.create(MaterialCreate(material_number="MAT0105", name="New part"))
+
+        second = self.data_layer.page(10, first.next_cursor)
+        assert [material.material_number for material in second.items][:2] == ["MAT0105", "MAT011"]
+
+    def test_sorted_pages(self):
+        """Test paginating in the order of another sorted index"""
+        # Creation times in reverse material number order
+        start = datetime(2024, 1, 1)
+        for i, material in enumerate(self.data_layer.list_all()):
+            material.created_at = start - timedelta(minutes=int(material.material_number[3:]))
+            self.data_layer.save(material)
+
+        pages = self.all_pages(10, sort="created_at")
+        assert sum(pages, []) == [f"MAT{i:03d}" for i in reversed(range(25))]
+        pages = self.all_pages(4, sort="created_at", descending=True, type=MaterialType.RAW)
+        assert pages == [["MAT000", "MAT005", "MAT010", "MAT015"], ["MAT020"]]
+        # Cursors only continue the listing they came from
+        cursor = self.data_layer.page(2, sort="created_at").next_cursor
+        with pytest.raises(ValueError):
+            self.data_layer.page(2, cursor)
+        with pytest.raises(ValueError):
+            self.data_layer.page(2, sort="name")
+
+    def test_iterate(self):
+        """Test iterating over a listing one material at a time"""
+        materials = self.data_layer.iterate(type=MaterialType.RAW, descending=True)
+        assert next(materials).material_number == "MAT020"
+        assert [material.material_number for material in materials] == ["MAT015", "MAT010", "MAT005", "MAT000"]
+
+        # Iteration continues after a page's cursor, like the next page
+        cursor = self.data_layer.page(20).next_cursor
+        assert [material.material_number for material in self.data_layer.iterate(cursor)] == [
+            f"MAT{i:03d}" for i in range(20, 25)
+        ]
+        assert len(list(self.data_layer.iter_all())) == 25
+        # Arguments are checked before the first material is requested
+        with pytest.raises(ValueError):
+            self.data_layer.iterate(sort="name")
+
+    def test_invalid_cursor(self):
+        """Test that malformed cursors and cursors of other listings are rejected"""
+        cursor = self.data_layer.page(10).next_cursor
+        with pytest.raises(ValueError):
+            self.data_layer.page(10, "not a cursor")
+        assert decode_cursor(cursor, "material_number") == ("MAT009", "MAT009")
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, "created_at")
+
+class TestEntityQuery:
+    def setup_method(self):
+        """Set up a material data layer with 20 materials"""
+        self.state_manager = StateManager()
+        self.data_layer = MaterialDataLayer(self.state_manager)
+        for i in range(20):
+            self.data_layer.create(MaterialCreate(
+                material_number=f"{'BOLT' if i < 10 else 'NUT'}{i:03d}",
+                name=f"{'Steel' if i % 2 else 'Brass'} part {i}",
+                type=MaterialType.SERVICE if i == 7 else MaterialType.FINISHED
+            ))
+
+    def numbers(self, materials):
+        return sorted(material.material_number for material in materials)
+
+    def test_predicates(self):
+        """Test each predicate and their combinations"""
+        query = self.data_layer.query
+
+        assert self.numbers(query(Eq("type", MaterialType.SERVICE))) == ["BOLT007"]
+        assert self.numbers(query(In("material_number", ["NUT012", "BOLT001", "XXX"]))) == ["BOLT001", "NUT012"]
+        assert self.numbers(query(Range("material_number", "BOLT008", "NUT011"))) == [
+            "BOLT008", "BOLT009", "NUT010", "NUT011"
+        ]
+        assert len(query(Prefix("material_number", "NUT"))) == 10
+        assert self.numbers(query(Contains("name", "BRASS PART 1"))) == [
+            "NUT010", "NUT012", "NUT014", "NUT016", "NUT018"
+        ]
+        assert self.numbers(query(
+            Prefix("material_number", "BOLT") & Contains("name", "steel") & Eq("type", MaterialType.FINISHED)
+        )) == [
+            "BOLT001", "BOLT003", "BOLT005", "BOLT009"
+        ]
+        assert self.numbers(query(Eq("type", MaterialType.SERVICE) | Range("material_number", "NUT018"))) == [
+            "BOLT007", "NUT018", "NUT019"
+        ]
+        assert self.numbers(query(where(type=[MaterialType.SERVICE], name="Steel part 7"))) == ["BOLT007"]
+
+    def test_incomplete_predicate_cannot_be_created(self):
+        """Test that a predicate class without matches() fails up front"""
+        class NoMatch(Predicate):
+            pass
+
+        with pytest.raises(TypeError):
+            NoMatch()
+
+    def test_planner_picks_most_selective_index(self):
+        """Test that the planner narrows down by the smallest index result"""
+        store = self.data_layer.store
+
+        plan = store.explain(And(Eq("type", MaterialType.FINISHED), Prefix("material_number", "NUT01")))
+        assert plan.describe() == "sorted index material_number (~10 candidates)"
+        plan = store.explain(And(Eq("type", MaterialType.SERVICE), Contains("name", "part")))
+        assert plan.describe() == "hash index type (~1 candidates)"
+        # An OR is only indexed if every branch is
+        plan = store.explain(Eq("type", MaterialType.SERVICE) | Contains("name", "part 1"))
+        assert plan.access.description == "hash index type | text index text"
+        assert store.explain(Eq("type", MaterialType.SERVICE) | Eq("name", "x")).access is None
+
+    def test_query_loads_only_candidates(self):
+        """Test that predicates without an index are checked only on the candidates"""
+        query = And(Eq("type", MaterialType.SERVICE), Eq("name", "Steel part 7"))
+        self.data_layer.query(query)
+
+        loaded = []
+        original_get = self.state_manager.get
+        self.state_manager.get = lambda key, default=None: (loaded.append(key), original_get(key, default))[1]
+
+        assert self.numbers(self.data_layer.query(query)) == ["BOLT007"]
+        assert loaded == ["materials/BOLT007"]
+        # Without a usable index, every material is checked
+        assert self.numbers(self.data_layer.query(Contains("status", "ACT"))) == self.numbers(
+            self.data_layer.list_all()
+        )
+
+    def test_query_follows_writes(self):
+        """Test that queries see created, updated and deleted materials"""
+        self.data_layer.update("BOLT001", MaterialUpdate(type=MaterialType.SERVICE))
+        self.data_layer.delete("BOLT007")
+        self.data_layer.create(MaterialCreate(material_number="BOLT100", name="Brass", type=MaterialType.SERVICE))
+
+        assert self.numbers(self.data_layer.query(Eq("type", MaterialType.SERVICE))) == ["BOLT001", "BOLT100"]
+
+class TestEntityCache:
+    def setup_method(self):
+        """Set up a store whose entities are stored as dictionaries, as after loading a state file"""
+        self.state_manager = StateManager()
+        self.store = EntityStore(self.state_manager, "materials", Material, cache_size=3)
+        for i in range(5):
+            self.state_manager.set(
+                f"materials/MAT{i:03d}", Material(material_number=f"MAT{i:03d}", name=f"Material {i}").model_dump()
+            )
+
+    def test_repeat_reads_return_cached_instance(self):
+        """Test that an unchanged entity is hydrated once"""
+        first = self.store.get("MAT001")
+        assert self.store.get("MAT001") is first
+        assert self.store.cache.stats()["hits"] == 1
+
+    def test_writes_invalidate(self):
+        """Test that writes through the store or directly to the state are seen"""
+        material = self.store.get("MAT001")
+        material.name = "Renamed"
+        self.store.save("MAT001", material.model_dump())
+        assert self.store.get("MAT001").name == "Renamed"
+
+        # A write the store doesn't know about changes the key's version
+        self.state_manager.set("materials/MAT001", Material(material_number="MAT001", name="Other").model_dump())
+        assert self.store.get("MAT001").name == "Other"
+
+        self.state_manager.delete("materials/MAT001")
+        assert self.store.get("MAT001") is None
+        self.state_manager.clear()
+        assert self.store.get("MAT002") is None
+
+    def test_least_recently_used_are_evicted(self):
+        """Test the size bound and that scans don't evict hot entities"""
+        hot = self.store.get("MAT000")
+        for entity_id in ("MAT001", "MAT002", "MAT000", "MAT003"):
+            self.store.get(entity_id)
+        assert len(self.store.cache) == 3
+        assert self.store.get("MAT000") is hot
+
+        self.store.list_all()
+        assert self.store.get("MAT000") is hot
+        assert len(self.store.cache) == 3
+
+    def test_transaction_reads_own_writes(self):
+        """Test that reads inside a transaction see its buffered writes"""
+        self.store.get("MAT001")
+        with self.state_manager.transaction():
+            self.state_manager.set("materials/MAT001", Material(material_number="MAT001", name="Pending").model_dump())
+            assert self.store.get("MAT001").name == "Pending"
+        assert self.store.get("MAT001").name == "Pending"
+
+    def test_shared_sqlite_state(self):
+        """Test that another process's writes invalidate cached entities"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "state.db")
+            first, second = SQLiteStateManager(path), SQLiteStateManager(path)
+            store = EntityStore(first, "materials", Material)
+            EntityStore(second, "materials", Material).save("MAT001", Material(material_number="MAT001", name="One"))
+
+            assert store.get("MAT001") is store.get("MAT001")
+            EntityStore(second, "materials", Material).save("MAT001", Material(material_number="MAT001", name="Two"))
+            assert store.get("MAT001").name == "Two"
+            first.close()
+            second.close()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_failed_writes_leave_cached_entities_unchanged(self):
+        """Test that updates are applied to copies, not to the shared cached instances"""
+        state_manager = StateManager()
+        data_layer = P2PDataLayer(state_manager)
+        data_layer.create_requisition(RequisitionCreate(
+            document_number="PR001", description="Cached", requester="Tester",
+            items=[{"item_number": 1, "description": "Item", "quantity": 1, "unit": "EA", "price": 1}]
+        ))
+        for status in (DocumentStatus.SUBMITTED, DocumentStatus.APPROVED):
+            data_layer.update_requisition("PR001", RequisitionUpdate(status=status))
+        cached = data_layer.get_requisition("PR001")
+
+        with patch.object(state_manager, "set", side_effect=RuntimeError("write failed")):
+            with pytest.raises(RuntimeError):
+                data_layer.update_requisition("PR001", RequisitionUpdate(notes="Never stored"))
+            with pytest.raises(RuntimeError):
+                data_layer.create_order_from_requisition("PR001", "Acme")
+
+        requisition = data_layer.get_requisition("PR001")
+        assert requisition is cached
+        assert requisition.notes is None
+        assert requisition.status == DocumentStatus.APPROVED
+        assert requisition.items[0].assigned_to_order is None
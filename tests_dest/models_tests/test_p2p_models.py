@@ -1,146 +1,20 @@
-# BEGIN_SNIPPET_INSERTION - DO NOT MODIFY THIS LINE
-# Critical imports that must be preserved
-import os
-import sys
-import logging
-from pathlib import Path
-from typing import Dict, List, Optional, Union, Any
-from types import ModuleType
-
-"""Standard test file imports and setup.
-
-This snippet is automatically added to test files by SnippetForTests.py.
-It provides:
-1. Dynamic project root detection and path setup
-2. Environment variable configuration
-3. Common test imports and fixtures
-4. Service initialization support
-5. Logging configuration
-"""
-        # Add project root to path
-        if str(project_root) not in sys.path:
-            sys.path.insert(0, str(project_root))
-        
-        logging.warning("Could not find import_helper.py. Using fallback configuration.")
-except Exception as e:
-    logging.warning(f"Failed to import import_helper: {{e}}. Using fallback configuration.")
-    # Add project root to path
-    current_file = Path(__file__).resolve()
-    test_dir = current_file.parent.parent
-    project_root = test_dir.parent
-    if str(project_root) not in sys.path:
-        sys.path.insert(0, str(project_root))
-
-# Configure logging first
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-def find_project_root(test_dir: Path) -> Optional[Path]:
-    """Find the project root directory.
-    
-    Args:
-        test_dir: The directory containing the test file
-        
-    Returns:
-        The project root directory or None if not found
-    """
-    try:
-        # Try to find project root by looking for main.py or known directories
-        for parent in [test_dir] + list(test_dir.parents):
-            # Check for main.py as an indicator of project root
-            if (parent / "main.py").exists():
-                return parent
-            # Check for typical project structure indicators
-            if all((parent / d).exists() for d in ["services", "models", "controllers"]):
-                return parent
-        
-        # If we still don't have a project root, use parent of the tests-dest directory
-        for parent in test_dir.parents:
-            if parent.name == "tests-dest":
-                return parent.parent
-                
-        return None
-    except Exception as e:
-        logger.error(f"Error finding project root: {e}")
-        return None
-
-# Find project root dynamically
-test_file = Path(__file__).resolve()
-test_dir = test_file.parent
-project_root = find_project_root(test_dir)
-
-if project_root:
-    logger.info(f"Project root detected at: {project_root}")
-    
-    # Add project root to path if found
-    if str(project_root) not in sys.path:
-        sys.path.insert(0, str(project_root))
-        logger.info(f"Added {project_root} to Python path")
-else:
-    logger.warning("Could not detect project root")
-
-# Import the test_import_helper
-try:
-    from test_import_helper import setup_test_paths, setup_test_env_vars
-    setup_test_paths()
-    logger.info("Successfully initialized test paths from test_import_helper")
-except ImportError as e:
-    # Fall back if test_import_helper is not available
-    if str(test_dir.parent) not in sys.path:
-        sys.path.insert(0, str(test_dir.parent))
-    os.environ.setdefault("SAP_HARNESS_HOME", str(project_root) if project_root else "")
-    logger.warning(f"Failed to import test_import_helper: {e}. Using fallback configuration.")
-
-# Common test imports
-import pytest
-from unittest.mock import MagicMock, AsyncMock, patch
-from fastapi.testclient import TestClient
-
-# Import common fixtures and services
-try:
-    from conftest import test_services
-    from services.base_service import BaseService
-    from services.monitor_service import MonitorService
-    from services.template_service import TemplateService
-    from services.p2p_service import P2PService
-    from models.base_model import BaseModel
-    from models.material import Material
-    from models.requisition import Requisition
-    from fastapi import FastAPI, HTTPException
-    logger.info("Successfully imported test fixtures and services")
-except ImportError as e:
-    # Log import error but continue - not all tests need all imports
-    logger.warning(f"Optional import failed: {e}")
-    logger.debug("Stack trace:", exc_info=True)
-
-@pytest.fixture(autouse=True)
-def setup_test_env(monkeypatch):
-    """Set up test environment for each test."""
-    setup_test_env_vars(monkeypatch)
-    logger.info("Test environment initialized")
-    yield
-    logger.info("Test environment cleaned up")
-# END_SNIPPET_INSERTION - DO NOT MODIFY THIS LINE
-
 # tests-dest/models/test_p2p_models.py
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 import pytest
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from pydantic import ValidationError as PydanticValidationError
 from models.p2p import (
     DocumentStatus, ProcurementType, DocumentItemStatus,
     DocumentItem, RequisitionItem, OrderItem,
     RequisitionCreate, OrderCreate,
     RequisitionUpdate, OrderUpdate,
-    Requisition, Order, P2PDataLayer
+    Requisition, Order, P2PDataLayer, document_total_value
 )
 from models.common import EntityCollection
+from models.entity_query import And, Eq, Or, Range
 from services.state_manager import StateManager
 
 class TestDocumentItemModels:
@@ -412,10 +286,8 @@ class TestP2PDataLayer:
         assert len(requisition.items) == 1
         
         # Check it was added to state
-        collection = self.state_manager.get_model(self.data_layer.requisitions_key, EntityCollection)
-        assert collection is not None
-        assert collection.count() == 1
-        assert collection.get("PR001") is not None
+        assert self.state_manager.get_keys(f"{self.data_layer.requisitions_key}/") == ["requisitions/PR001"]
+        assert self.state_manager.get("requisitions/PR001") is not None
     
     def test_create_order(self):
         """Test creating an order through the data layer"""
@@ -446,10 +318,8 @@ class TestP2PDataLayer:
         assert len(order.items) == 1
         
         # Check it was added to state
-        collection = self.state_manager.get_model(self.data_layer.orders_key, EntityCollection)
-        assert collection is not None
-        assert collection.count() == 1
-        assert collection.get("PO001") is not None
+        assert self.state_manager.get_keys(f"{self.data_layer.orders_key}/") == ["orders/PO001"]
+        assert self.state_manager.get("orders/PO001") is not None
     
     def test_get_requisition(self):
         """Test getting a requisition by ID"""
@@ -569,3 +439,147 @@ class TestP2PDataLayer:
         # Check requisition status updated
         requisition = self.data_layer.get_requisition("PR001")
         assert requisition.status == DocumentStatus.ORDERED
+    
+    def test_filter_uses_indexes(self):
+        """Test filtering documents by indexed fields"""
+        for number, requester, department in [
+            ("PR001", "Alice", "IT"), ("PR002", "Bob", "IT"), ("PR003", "Alice", "Finance")
+        ]:
+            self.data_layer.create_requisition(RequisitionCreate(
+                document_number=number, description="Test", requester=requester, department=department,
+                items=[RequisitionItem(item_number=1, description="Item", quantity=1, unit="EA", price=1.0)]
+            ))
+        for number, vendor, reference in [("PO001", "Acme", "PR001"), ("PO002", "Globex", "PR003")]:
+            order = self.data_layer.create_order(OrderCreate(
+                document_number=number, description="Test", requester="Alice", vendor=vendor,
+                items=[OrderItem(item_number=1, description="Item", quantity=1, unit="EA", price=1.0)]
+            ))
+            order.requisition_reference = reference
+            self.data_layer.orders.save(number, order)
+        self.data_layer.update_requisition("PR002", RequisitionUpdate(status=DocumentStatus.SUBMITTED))
+        
+        def numbers(documents):
+            return sorted(document.document_number for document in documents)
+        
+        assert numbers(self.data_layer.filter_requisitions(requester="Alice", department="IT")) == ["PR001"]
+        assert numbers(self.data_layer.filter_requisitions(status=DocumentStatus.DRAFT)) == ["PR001", "PR003"]
+        assert numbers(self.data_layer.filter_requisitions(status=[DocumentStatus.SUBMITTED])) == ["PR002"]
+        assert numbers(self.data_layer.filter_orders(vendor="Globex")) == ["PO002"]
+        assert numbers(self.data_layer.filter_orders(requisition_reference="PR001", vendor="Acme")) == ["PO001"]
+        
+        self.data_layer.delete_order("PO001")
+        assert self.data_layer.filter_orders(requisition_reference="PR001") == []
+    
+    def test_date_range_uses_sorted_index(self):
+        """Test creation date range filters, counts and newest documents"""
+        now = datetime.now()
+        for days_ago, number, department in [(10, "PR001", "IT"), (5, "PR002", "IT"), (1, "PR003", "Finance")]:
+            requisition = self.data_layer.create_requisition(RequisitionCreate(
+                document_number=number, description="Test", requester="Alice", department=department,
+                items=[RequisitionItem(item_number=1, description="Item", quantity=1, unit="EA", price=1.0)]
+            ))
+            requisition.created_at = now - timedelta(days=days_ago)
+            self.data_layer.requisitions.save(number, requisition)
+        
+        def numbers(documents):
+            return [document.document_number for document in documents]
+        
+        week_ago = now - timedelta(days=7)
+        assert numbers(self.data_layer.filter_requisitions(date_from=week_ago)) == ["PR002", "PR003"]
+        assert numbers(self.data_layer.filter_requisitions(date_to=week_ago)) == ["PR001"]
+        assert numbers(self.data_layer.filter_requisitions(date_from=week_ago, department="IT")) == ["PR002"]
+        assert self.data_layer.count_requisitions(date_from=week_ago) == 2
+        assert numbers(self.data_layer.newest_requisitions(2)) == ["PR003", "PR002"]
+        
+        self.data_layer.delete_requisition("PR003")
+        assert self.data_layer.count_requisitions(date_from=week_ago) == 1
+        assert self.data_layer.count_orders() == 0
+    
+    def test_page_requisitions(self):
+        """Test cursor pagination of requisitions with filters"""
+        now = datetime.now()
+        for i in range(7):
+            requisition = self.data_layer.create_requisition(RequisitionCreate(
+                document_number=f"PR{i:03d}", description=f"Request {i}", requester="Alice",
+                department="IT" if i % 2 else "Finance",
+                items=[RequisitionItem(item_number=1, description="Item", quantity=1, unit="EA", price=1.0)]
+            ))
+            requisition.created_at = now - timedelta(days=i)
+            self.data_layer.requisitions.save(requisition.document_number, requisition)
+        
+        def numbers(page):
+            return [document.document_number for document in page.items]
+        
+        first = self.data_layer.page_requisitions(3)
+        assert numbers(first) == ["PR000", "PR001", "PR002"]
+        second = self.data_layer.page_requisitions(3, first.next_cursor)
+        assert numbers(second) == ["PR003", "PR004", "PR005"]
+        last = self.data_layer.page_requisitions(3, second.next_cursor)
+        assert numbers(last) == ["PR006"] and last.next_cursor is None
+        
+        page = self.data_layer.page_requisitions(2, department="IT", date_from=now - timedelta(days=4))
+        assert numbers(page) == ["PR001", "PR003"] and page.next_cursor is None
+        page = self.data_layer.page_requisitions(2, match=lambda r: r.description.endswith("5"))
+        assert numbers(page) == ["PR005"]
+    
+    def test_sort_by_total_value(self):
+        """Test top-k orders by total value, which isn't a stored field"""
+        for number, quantity in [("PO001", 5), ("PO002", 50), ("PO003", 20), ("PO004", 1)]:
+            self.data_layer.create_order(OrderCreate(
+                document_number=number, description="Test", requester="Alice", vendor="Acme",
+                items=[OrderItem(item_number=1, description="Item", quantity=quantity, unit="EA", price=2.0)]
+            ))
+        
+        page = self.data_layer.page_orders(2, sort="total_value", descending=True)
+        assert [order.document_number for order in page.items] == ["PO002", "PO003"]
+        
+        # Changing the items moves the order in the index
+        self.data_layer.update_order("PO004", OrderUpdate(
+            items=[OrderItem(item_number=1, description="Item", quantity=100, unit="EA", price=2.0)]
+        ))
+        page = self.data_layer.page_orders(1, sort="total_value", descending=True)
+        assert [order.document_number for order in page.items] == ["PO004"]
+        
+        assert document_total_value({"items": [{"quantity": 2, "price": 3.0}, {"quantity": 1, "price": 0.5}]}) == 6.5
+    
+    def test_create_from_stored(self):
+        """Test that trusted hydration matches validated hydration"""
+        order = Order(
+            document_number="PO001", description="Test", requester="Alice", vendor="Acme",
+            items=[OrderItem(item_number=i, description=f"Item {i}", quantity=2, unit="EA", price=1.5,
+                             delivery_date=date(2024, 1, i), received_quantity=1) for i in range(1, 4)]
+        )
+        stored = order.model_dump(mode="json")
+        
+        trusted = Order.create_from_stored(stored)
+        
+        assert trusted == order
+        assert trusted.items[0].status == DocumentItemStatus.OPEN
+        assert trusted.items[2].delivery_date == date(2024, 1, 3)
+        assert trusted.total_value == 9.0
+        # Stored data isn't modified, and older data without an ID gets one
+        assert isinstance(stored["items"][0], dict)
+        del stored["id"]
+        assert Requisition.create_from_stored({**stored, "items": []}).id == "PO001"
+    
+    def test_query_orders(self):
+        """Test querying orders with the planner choosing the index"""
+        for number, vendor, quantity in [("PO001", "Acme", 5), ("PO002", "Acme", 50),
+                                         ("PO003", "Globex", 20), ("PO004", "Initech", 1)]:
+            self.data_layer.create_order(OrderCreate(
+                document_number=number, description="Test", requester="Alice", vendor=vendor,
+                items=[OrderItem(item_number=1, description="Item", quantity=quantity, unit="EA", price=2.0)]
+            ))
+        
+        def numbers(documents):
+            return sorted(document.document_number for document in documents)
+        
+        query = And(Eq("vendor", "Acme"), Range("total_value", 20))
+        assert numbers(self.data_layer.query_orders(query)) == ["PO002"]
+        assert self.data_layer.orders.explain(query).access.description == "hash index vendor"
+        query = Or(Eq("vendor", "Initech"), Range("total_value", 30, 60))
+        assert numbers(self.data_layer.query_orders(query)) == ["PO003", "PO004"]
+        assert numbers(self.data_layer.query_orders(Range("created_at", datetime.now() - timedelta(hours=1)))) == [
+            "PO001", "PO002", "PO003", "PO004"
+        ]
+        assert self.data_layer.query_requisitions(Eq("status", DocumentStatus.DRAFT)) == []
@@ -1,130 +1,3 @@
-# BEGIN_SNIPPET_INSERTION - DO NOT MODIFY THIS LINE
-# Critical imports that must be preserved
-import os
-import sys
-import logging
-from pathlib import Path
-from typing import Dict, List, Optional, Union, Any
-from types import ModuleType
-
-"""Standard test file imports and setup.
-
-This snippet is automatically added to test files by SnippetForTests.py.
-It provides:
-1. Dynamic project root detection and path setup
-2. Environment variable configuration
-3. Common test imports and fixtures
-4. Service initialization support
-5. Logging configuration
-"""
-        # Add project root to path
-        if str(project_root) not in sys.path:
-            sys.path.insert(0, str(project_root))
-        
-        logging.warning("Could not find import_helper.py. Using fallback configuration.")
-except Exception as e:
-    logging.warning(f"Failed to import import_helper: {{e}}. Using fallback configuration.")
-    # Add project root to path
-    current_file = Path(__file__).resolve()
-    test_dir = current_file.parent.parent
-    project_root = test_dir.parent
-    if str(project_root) not in sys.path:
-        sys.path.insert(0, str(project_root))
-
-# Configure logging first
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-def find_project_root(test_dir: Path) -> Optional[Path]:
-    """Find the project root directory.
-    
-    Args:
-        test_dir: The directory containing the test file
-        
-    Returns:
-        The project root directory or None if not found
-    """
-    try:
-        # Try to find project root by looking for main.py or known directories
-        for parent in [test_dir] + list(test_dir.parents):
-            # Check for main.py as an indicator of project root
-            if (parent / "main.py").exists():
-                return parent
-            # Check for typical project structure indicators
-            if all((parent / d).exists() for d in ["services", "models", "controllers"]):
-                return parent
-        
-        # If we still don't have a project root, use parent of the tests-dest directory
-        for parent in test_dir.parents:
-            if parent.name == "tests-dest":
-                return parent.parent
-                
-        return None
-    except Exception as e:
-        logger.error(f"Error finding project root: {e}")
-        return None
-
-# Find project root dynamically
-test_file = Path(__file__).resolve()
-test_dir = test_file.parent
-project_root = find_project_root(test_dir)
-
-if project_root:
-    logger.info(f"Project root detected at: {project_root}")
-    
-    # Add project root to path if found
-    if str(project_root) not in sys.path:
-        sys.path.insert(0, str(project_root))
-        logger.info(f"Added {project_root} to Python path")
-else:
-    logger.warning("Could not detect project root")
-
-# Import the test_import_helper
-try:
-    from test_import_helper import setup_test_paths, setup_test_env_vars
-    setup_test_paths()
-    logger.info("Successfully initialized test paths from test_import_helper")
-except ImportError as e:
-    # Fall back if test_import_helper is not available
-    if str(test_dir.parent) not in sys.path:
-        sys.path.insert(0, str(test_dir.parent))
-    os.environ.setdefault("SAP_HARNESS_HOME", str(project_root) if project_root else "")
-    logger.warning(f"Failed to import test_import_helper: {e}. Using fallback configuration.")
-
-# Common test imports
-import pytest
-from unittest.mock import MagicMock, AsyncMock, patch
-from fastapi.testclient import TestClient
-
-# Import common fixtures and services
-try:
-    from conftest import test_services
-    from services.base_service import BaseService
-    from services.monitor_service import MonitorService
-    from services.template_service import TemplateService
-    from services.p2p_service import P2PService
-    from models.base_model import BaseModel
-    from models.material import Material
-    from models.requisition import Requisition
-    from fastapi import FastAPI, HTTPException
-    logger.info("Successfully imported test fixtures and services")
-except ImportError as e:
-    # Log import error but continue - not all tests need all imports
-    logger.warning(f"Optional import failed: {e}")
-    logger.debug("Stack trace:", exc_info=True)
-
-@pytest.fixture(autouse=True)
-def setup_test_env(monkeypatch):
-    """Set up test environment for each test."""
-    setup_test_env_vars(monkeypatch)
-    logger.info("Test environment initialized")
-    yield
-    logger.info("Test environment cleaned up")
-# END_SNIPPET_INSERTION - DO NOT MODIFY THIS LINE
-
 # tests-dest/services/test_material_service.py
 import sys
 import os
@@ -140,7 +13,7 @@ from models.material import (
 )
 from services.material_service import MaterialService
 from services.state_manager import StateManager
-from utils.error_utils import NotFoundError, ValidationError, ConflictError
+from utils.error_utils import NotFoundError, ValidationError, ConflictError, count_results
 
 class TestMaterialService:
     def setup_method(self):
@@ -171,6 +44,27 @@ class TestMaterialService:
         with pytest.raises(NotFoundError):
             self.material_service.get_material("NONEXISTENT")
     
+    def test_get_materials_status(self):
+        """Test getting the status of several materials with one lookup"""
+        self.material_service.create_material(MaterialCreate(material_number="STAT001", name="Active"))
+        self.material_service.create_material(MaterialCreate(material_number="STAT002", name="Deprecated"))
+        self.material_service.deprecate_material("STAT002")
+        data_layer = self.material_service.data_layer
+        
+        with patch.object(data_layer, "get_many", wraps=data_layer.get_many) as get_many, \
+             patch.object(self.material_service, "_log_error") as log_error:
+            statuses = self.material_service.get_materials_status(
+                ["STAT002", "STAT001", "MISSING", "STAT001"]
+            )
+        
+        assert statuses == {
+            "STAT002": MaterialStatus.DEPRECATED,
+            "STAT001": MaterialStatus.ACTIVE,
+            "MISSING": None
+        }
+        get_many.assert_called_once_with(["STAT002", "STAT001", "MISSING"])
+        log_error.assert_not_called()
+    
     def test_list_materials(self):
         """Test listing materials with filtering"""
         # Create test materials
@@ -198,6 +92,53 @@ class TestMaterialService:
         assert len(search_materials) == 1
         assert search_materials[0].material_number == "FINISHED001"
     
+    def test_list_materials_page(self):
+        """Test listing materials one cursor page at a time"""
+        for number in ("RAW001", "RAW002", "RAW003", "FINISHED001"):
+            self.material_service.create_material(MaterialCreate(material_number=number, name=number))
+        
+        page = self.material_service.list_materials_page(limit=2, search_term="raw")
+        assert [m.material_number for m in page.items] == ["RAW001", "RAW002"]
+        
+        page = self.material_service.list_materials_page(limit=2, cursor=page.next_cursor, search_term="raw")
+        assert [m.material_number for m in page.items] == ["RAW003"]
+        assert page.next_cursor is None
+        
+        with pytest.raises(ValidationError):
+            self.material_service.list_materials_page(limit=2, cursor="garbage")
+    
+    def test_list_materials_sorted(self):
+        """Test listing materials in the order of a sorted index"""
+        for minute, number in enumerate(("SORT002", "SORT001", "SORT003")):
+            material = self.material_service.create_material(MaterialCreate(material_number=number, name=number))
+            material.created_at = datetime(2024, 1, 1, 0, minute)
+            self.material_service.data_layer.save(material)
+        
+        materials = self.material_service.list_materials(descending=True)
+        assert [m.material_number for m in materials] == ["SORT003", "SORT002", "SORT001"]
+        materials = self.material_service.list_materials(sort="created_at")
+        assert [m.material_number for m in materials] == ["SORT002", "SORT001", "SORT003"]
+        
+        with pytest.raises(ValidationError):
+            self.material_service.list_materials(sort="color")
+    
+    def test_iter_materials(self):
+        """Test iterating over a listing lazily"""
+        for number in ("RAW001", "RAW002", "RAW003", "FINISHED001"):
+            self.material_service.create_material(MaterialCreate(material_number=number, name=number))
+        
+        materials = self.material_service.iter_materials(search_term="raw", descending=True)
+        assert not isinstance(materials, list)
+        assert [m.material_number for m in materials] == ["RAW003", "RAW002", "RAW001"]
+        
+        page = self.material_service.list_materials_page(limit=1)
+        rest = self.material_service.iter_materials(cursor=page.next_cursor)
+        assert [m.material_number for m in rest] == ["RAW001", "RAW002", "RAW003"]
+        
+        # Invalid arguments fail before iteration starts
+        with pytest.raises(ValidationError):
+            self.material_service.iter_materials(sort="color")
+    
     def test_create_material(self):
         """Test creating a material"""
         # Create a material with minimal data
@@ -247,6 +188,62 @@ class TestMaterialService:
         with pytest.raises(ConflictError):
             self.material_service.create_material(duplicate_data)
     
+    def test_create_materials(self):
+        """Test creating a batch of materials with per-item results"""
+        self.material_service.create_material(MaterialCreate(material_number="BULK001", name="Existing"))
+        
+        with patch.object(self.state_manager, "transaction", wraps=self.state_manager.transaction) as transaction:
+            results = self.material_service.create_materials([
+                {"material_number": "BULK002", "name": "Second"},
+                MaterialCreate(name="Generated", type=MaterialType.RAW),
+                {"material_number": "BULK001", "name": "Conflict"},
+                {"material_number": "BULK002", "name": "Repeated"},
+                {"material_number": "BULK003", "name": ""}
+            ])
+        
+        assert [r["status"] for r in results] == ["created", "created", "failed", "failed", "failed"]
+        assert results[1]["material_number"].startswith("RAW")
+        assert results[2]["error"]["details"]["conflict_reason"] == "material_number_exists"
+        assert results[3]["error"]["details"]["conflict_reason"] == "duplicate_in_batch"
+        assert "name" in results[4]["error"]["details"]["validation_errors"]
+        assert count_results(results, ("created", "updated", "failed", "skipped")) == {
+            "created": 2, "updated": 0, "failed": 3, "skipped": 0
+        }
+        
+        # Both valid items were written in one transaction
+        transaction.assert_called_once()
+        assert self.material_service.get_material("BULK002").name == "Second"
+        assert self.material_service.get_material("BULK001").name == "Existing"
+    
+    def test_create_materials_upsert_and_atomic(self):
+        """Test updating existing materials in bulk and all-or-nothing batches"""
+        self.material_service.create_material(MaterialCreate(
+            material_number="UPS001", name="Original", description="Kept"
+        ))
+        
+        results = self.material_service.create_materials([
+            {"material_number": "UPS001", "name": "Renamed", "status": "INACTIVE"},
+            {"material_number": "UPS002", "name": "New"}
+        ], upsert=True)
+        assert [r["status"] for r in results] == ["updated", "created"]
+        material = self.material_service.get_material("UPS001")
+        assert material.name == "Renamed"
+        assert material.status == MaterialStatus.INACTIVE
+        # Fields the item doesn't set are left alone
+        assert material.description == "Kept"
+        
+        self.material_service.deprecate_material("UPS002")
+        version = self.state_manager.version
+        results = self.material_service.create_materials([
+            {"material_number": "UPS003", "name": "Third"},
+            {"material_number": "UPS002", "name": "Revived", "status": "ACTIVE"}
+        ], upsert=True, atomic=True)
+        assert [r["status"] for r in results] == ["skipped", "failed"]
+        assert results[1]["error"]["details"]["reason"] == "invalid_status_transition"
+        assert self.state_manager.version == version
+        with pytest.raises(NotFoundError):
+            self.material_service.get_material("UPS003")
+    
     def test_update_material(self):
         """Test updating a material"""
         # Create a material
@@ -0,0 +1,183 @@
+# tests-dest/services_tests/test_p2p_service_batch.py
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from unittest.mock import patch
+
+import pytest
+
+from models.material import MaterialCreate
+from models.p2p import DocumentStatus, OrderCreate, OrderUpdate, RequisitionCreate, RequisitionUpdate
+from services.material_service import MaterialService
+from services.p2p_service import P2PService
+from services.state_manager import StateManager
+from utils.error_utils import ValidationError, count_results
+
+def document_items(material_number):
+    """Build two items, the first referencing a material"""
+    return [
+        {"item_number": 1, "material_number": material_number, "description": "Item 1",
+         "quantity": 4, "unit": "EA", "price": 10},
+        {"item_number": 2, "description": "Item 2", "quantity": 2, "unit": "EA", "price": 5}
+    ]
+
+class TestP2PServiceBatch:
+    def setup_method(self):
+        """Set up services on a fresh state manager with a material"""
+        self.state_manager = StateManager()
+        self.material_service = MaterialService(self.state_manager)
+        self.p2p_service = P2PService(self.state_manager, self.material_service)
+        self.material_service.create_material(MaterialCreate(material_number="MAT001", name="Material"))
+
+    def create_requisition(self, number):
+        """Create a draft requisition"""
+        return self.p2p_service.create_requisition(RequisitionCreate(
+            document_number=number, description=number, requester="Tester", items=document_items("MAT001")
+        ))
+
+    def create_order(self, number):
+        """Create a draft order"""
+        return self.p2p_service.create_order(OrderCreate(
+            document_number=number, description=number, requester="Tester", vendor="Acme",
+            items=document_items("MAT001")
+        ))
+
+    def test_transition_requisitions(self):
+        """Test that valid requisitions are written in one transaction and failures reported"""
+        for number in ("PR001", "PR002", "PR003"):
+            self.create_requisition(number)
+        self.p2p_service.submit_requisition("PR001")
+
+        with patch.object(self.state_manager, "transaction", wraps=self.state_manager.transaction) as transaction:
+            results = self.p2p_service.transition_requisitions(
+                "submit", ["PR002", "PR001", "MISSING", "PR003", "PR002"]
+            )
+
+        assert transaction.call_count == 1
+        assert [(result["document_number"], result["status"]) for result in results] == [
+            ("PR002", "updated"), ("PR001", "failed"), ("MISSING", "failed"),
+            ("PR003", "updated"), ("PR002", "failed")
+        ]
+        assert results[0]["document_status"] == "SUBMITTED"
+        assert results[1]["error"]["error_code"] == "validation_error"
+        assert results[2]["error"]["error_code"] == "not_found"
+        assert results[4]["error"]["details"]["conflict_reason"] == "duplicate_in_batch"
+        assert count_results(results, ("updated", "failed", "skipped")) == {"updated": 2, "failed": 3, "skipped": 0}
+        assert self.p2p_service.get_requisition("PR003").status == DocumentStatus.SUBMITTED
+
+        results = self.p2p_service.transition_requisitions("reject", ["PR001", "PR002"], reason="Over budget")
+        assert [result["status"] for result in results] == ["updated", "updated"]
+        assert "REJECTED: Over budget" in self.p2p_service.get_requisition("PR002").notes
+
+    def test_transition_orders(self):
+        """Test batch receipts with quantities and atomic batches"""
+        numbers = ["PO001", "PO002", "PO003", "PO004"]
+        for number in numbers:
+            self.create_order(number)
+        self.p2p_service.transition_orders("submit", numbers)
+        self.p2p_service.transition_orders("approve", numbers)
+
+        results = self.p2p_service.transition_orders(
+            "receive", ["PO001", "PO002"], received_items={"PO001": {1: 1}}
+        )
+        assert [result["document_status"] for result in results] == ["PARTIALLY_RECEIVED", "RECEIVED"]
+        assert self.p2p_service.get_order("PO001").items[0].received_quantity == 1
+
+        # One invalid receipt keeps the whole atomic batch from being written
+        results = self.p2p_service.transition_orders(
+            "receive", ["PO003", "PO004"], received_items={"PO004": {1: 10}}, atomic=True
+        )
+        assert [result["status"] for result in results] == ["skipped", "failed"]
+        assert results[1]["error"]["details"]["reason"] == "quantity_exceeds_remaining"
+        assert self.p2p_service.get_order("PO003").status == DocumentStatus.APPROVED
+        assert self.p2p_service.get_order("PO004").items[0].received_quantity == 0
+
+        results = self.p2p_service.transition_orders("cancel", ["PO003"])
+        assert results[0]["status"] == "failed"
+        self.p2p_service.transition_orders("cancel", ["PO003"], reason="Not needed")
+        assert self.p2p_service.get_order("PO003").status == DocumentStatus.CANCELED
+
+    def test_invalid_batch(self):
+        """Test that unknown actions and misplaced quantities reject the whole batch"""
+        self.create_order("PO001")
+
+        with pytest.raises(ValidationError):
+            self.p2p_service.transition_orders("ship", ["PO001"])
+        with pytest.raises(ValidationError):
+            self.p2p_service.transition_requisitions("receive", ["PR001"])
+        with pytest.raises(ValidationError):
+            self.p2p_service.transition_orders("submit", ["PO001"], received_items={"PO001": {1: 1}})
+        with pytest.raises(ValidationError):
+            self.p2p_service.transition_orders("receive", ["PO001"], received_items={"PO002": {1: 1}})
+        assert self.p2p_service.get_order("PO001").status == DocumentStatus.DRAFT
+
+    def test_item_materials_checked_together(self):
+        """Test that document items are validated with one material lookup"""
+        self.material_service.create_material(MaterialCreate(material_number="MAT002", name="Old"))
+        self.material_service.deprecate_material("MAT002")
+        items = document_items("MAT001") + [
+            {"item_number": 3, "material_number": "MAT001", "description": "Item 3",
+             "quantity": 1, "unit": "EA", "price": 1}
+        ]
+
+        with patch.object(self.material_service, "get_materials_status",
+                          wraps=self.material_service.get_materials_status) as get_materials_status, \
+             patch.object(self.material_service, "get_material") as get_material:
+            self.p2p_service.create_requisition(RequisitionCreate(
+                document_number="PR001", description="PR001", requester="Tester", items=items
+            ))
+        get_materials_status.assert_called_once()
+        get_material.assert_not_called()
+
+        self.create_order("PO001")
+        items[2]["material_number"] = "MAT002"
+        with pytest.raises(ValidationError) as excinfo:
+            self.p2p_service.update_order("PO001", OrderUpdate(items=items))
+        assert excinfo.value.details == {"item_number": 3, "material_number": "MAT002", "reason": "deprecated"}
+        assert len(self.p2p_service.get_order("PO001").items) == 2
+
+    def test_item_materials_checked_with_status(self):
+        """Test that items sent with a status change are still validated"""
+        self.create_requisition("PR001")
+        self.create_order("PO001")
+        items = document_items("NOPE")
+
+        with pytest.raises(ValidationError) as excinfo:
+            self.p2p_service.update_requisition("PR001", RequisitionUpdate(
+                items=items, status=DocumentStatus.SUBMITTED
+            ))
+        assert excinfo.value.details == {"item_number": 1, "material_number": "NOPE", "reason": "not_found"}
+        with pytest.raises(ValidationError):
+            self.p2p_service.update_order("PO001", OrderUpdate(items=items, status=DocumentStatus.SUBMITTED))
+
+        assert self.p2p_service.get_requisition("PR001").items[0].material_number == "MAT001"
+        assert self.p2p_service.get_order("PO001").status == DocumentStatus.DRAFT
+
+    def test_deprecated_material_does_not_block_workflow(self):
+        """Test that orders whose material was deprecated after ordering can still be received"""
+        for number in ("PO001", "PO002"):
+            self.create_order(number)
+            self.p2p_service.submit_order(number)
+            self.p2p_service.approve_order(number)
+        self.material_service.deprecate_material("MAT001")
+
+        assert self.p2p_service.receive_order("PO001").status == DocumentStatus.RECEIVED
+        results = self.p2p_service.transition_orders("receive", ["PO002"])
+        assert results[0]["document_status"] == "RECEIVED"
+
+    def test_order_items_locked_in_batches(self):
+        """Test that batch and single updates reject item edits of submitted orders alike"""
+        self.create_order("PO001")
+        self.p2p_service.submit_order("PO001")
+        items_update = OrderUpdate(items=document_items("MAT001")[:1])
+
+        with pytest.raises(ValidationError) as excinfo:
+            self.p2p_service.update_order("PO001", items_update)
+        assert excinfo.value.details["reason"] == "items_locked_after_submission"
+
+        with patch.object(self.p2p_service, "_approve_order_update", return_value=items_update):
+            results = self.p2p_service.transition_orders("approve", ["PO001"])
+        assert results[0]["status"] == "failed"
+        assert results[0]["error"]["details"]["reason"] == "items_locked_after_submission"
+        assert len(self.p2p_service.get_order("PO001").items) == 2
@@ -0,0 +1,248 @@
+# tests-dest/services_tests/test_p2p_service_import.py
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from models.material import MaterialCreate, MaterialStatus
+from models.p2p import DocumentStatus
+from services.material_service import MaterialService
+from services.p2p_service import P2PService
+from services.state_manager import StateManager
+from utils.error_utils import BadRequestError, ValidationError
+from services.p2p_service_csv import document_rows, export_columns
+from utils.import_utils import CsvReader, iter_lines
+from utils.stream_utils import iter_csv
+
+def requisition_line(number, *materials):
+    """Build an NDJSON line for a requisition with one item per material"""
+    return json.dumps({
+        "document_number": number,
+        "description": f"Requisition {number}",
+        "requester": "Importer",
+        "items": [
+            {"item_number": i + 1, "material_number": material, "description": f"Item {i + 1}",
+             "quantity": 2, "unit": "EA", "price": 10}
+            for i, material in enumerate(materials)
+        ]
+    })
+
+class TestP2PServiceImport:
+    def setup_method(self):
+        """Set up services on a fresh state manager with a few materials"""
+        self.state_manager = StateManager()
+        self.material_service = MaterialService(self.state_manager)
+        self.p2p_service = P2PService(self.state_manager, self.material_service)
+        for number in ("MAT001", "MAT002", "MAT003"):
+            self.material_service.create_material(MaterialCreate(material_number=number, name=number))
+        self.material_service.deprecate_material("MAT003")
+
+    def test_ndjson_import_in_chunks(self):
+        """Test that each chunk is checked and written as one batch"""
+        lines = [requisition_line(f"PR{i:03d}", "MAT001", "MAT002") for i in range(5)]
+        progress = []
+        data_layer = self.material_service.data_layer
+
+        with patch.object(data_layer, "get_many", wraps=data_layer.get_many) as get_many, \
+             patch.object(self.state_manager, "transaction", wraps=self.state_manager.transaction) as transaction:
+            report = self.p2p_service.import_documents(
+                lines, "requisitions", "ndjson", chunk_size=2, progress=lambda r: progress.append(r.imported)
+            )
+
+        assert (report.documents, report.imported, report.failed, report.chunks) == (5, 5, 0, 3)
+        assert progress == [2, 4, 5]
+        assert get_many.call_count == 3
+        assert sorted(get_many.call_args_list[0].args[0]) == ["MAT001", "MAT002"]
+        assert transaction.call_count == 3
+
+        requisition = self.p2p_service.get_requisition("PR004")
+        assert requisition.status == DocumentStatus.DRAFT
+        assert [item.material_number for item in requisition.items] == ["MAT001", "MAT002"]
+
+    def test_failures_are_reported(self):
+        """Test that invalid documents are reported without stopping the import"""
+        self.p2p_service.import_documents([requisition_line("PR001", "MAT001")], "requisitions", "ndjson")
+
+        report = self.p2p_service.import_documents([
+            requisition_line("PR001", "MAT001"),
+            requisition_line("PR002", "MAT001", "MISSING"),
+            requisition_line("PR003", "MAT003"),
+            "{not json",
+            json.dumps({"document_number": "PR004", "requester": "Importer", "items": []}),
+            requisition_line("PR005", "MAT002"),
+            requisition_line("PR005", "MAT002")
+        ], "requisitions", "ndjson")
+
+        assert (report.documents, report.imported, report.failed) == (7, 1, 6)
+        errors = {error["line"]: error for error in report.errors}
+        assert errors[1]["details"]["conflict_reason"] == "document_number_exists"
+        assert errors[2]["details"] == {"item_number": 2, "material_number": "MISSING", "reason": "not_found"}
+        assert errors[3]["details"]["reason"] == "deprecated"
+        assert errors[4]["details"]["reason"] == "parse_error"
+        assert "description" in errors[5]["details"]["validation_errors"]
+        assert errors[7]["details"]["conflict_reason"] == "duplicate_in_import"
+        assert self.p2p_service.get_requisition("PR005") is not None
+
+    def test_failed_chunk_keeps_earlier_chunks(self):
+        """Test that a failed write stops the import and keeps the chunks written before it"""
+        lines = [requisition_line(f"PR{i:03d}", "MAT001") for i in range(5)]
+        data_layer = self.p2p_service.data_layer
+        save_requisitions = data_layer.save_requisitions
+
+        def save(documents):
+            if documents[0].document_number == "PR002":
+                raise RuntimeError("disk full")
+            return save_requisitions(documents)
+
+        with patch.object(data_layer, "save_requisitions", side_effect=save):
+            with pytest.raises(BadRequestError) as excinfo:
+                self.p2p_service.import_documents(lines, "requisitions", "ndjson", chunk_size=2)
+
+        assert "remain imported" in excinfo.value.message
+        assert (excinfo.value.details["imported"], excinfo.value.details["chunks"]) == (2, 1)
+        assert self.p2p_service.get_requisition("PR001") is not None
+        assert not data_layer.existing_requisition_numbers(["PR002", "PR004"])
+
+    def test_csv_import_groups_rows(self):
+        """Test that consecutive rows of a document become its items"""
+        body = (
+            "document_number,description,requester,vendor,item_number,material_number,"
+            "item_description,quantity,unit,price\n"
+            'PO001,First,Importer,Acme,1,MAT001,"Bolts, zinc",10,EA,1.5\n'
+            'PO001,First,Importer,Acme,2,MAT002,"Two\nlines",5,EA,2\n'
+            "PO002,Second,Importer,Acme,1,,Service,1,HR,100\n"
+        ).encode("utf-8")
+        # Split the body at awkward places, as a request stream may be
+        chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+
+        report = self.p2p_service.import_documents(iter_lines(chunks), "orders", "csv")
+
+        assert (report.documents, report.imported, report.failed) == (2, 2, 0)
+        order = self.p2p_service.get_order("PO001")
+        assert order.vendor == "Acme"
+        assert [item.description for item in order.items] == ["Bolts, zinc", "Two\nlines"]
+        assert order.items[0].quantity == 10
+        assert self.p2p_service.get_order("PO002").items[0].material_number is None
+
+    def test_csv_parse_error_fails_document(self):
+        """Test that a malformed row fails its whole document instead of dropping the item"""
+        body = (
+            "document_number,description,requester,item_number,item_description,quantity,unit,price\n"
+            "PR009,Nine,Importer,1,Bolts,1,EA,1\n"
+            "PR009,Nine,Importer,2,Nuts,1,EA,1,extra\n"
+            "PR009,Nine,Importer,3,Washers,1,EA,1\n"
+            "PR010,Ten,Importer,1,Bolts,1,EA,1\n"
+            "PR011,Eleven,Importer,1,Bolts,1,EA,1,extra\n"
+            "PR011,Eleven,Importer,2,Nuts,1,EA,1\n"
+            'PR012,Twelve,Importer,1,"Bolts,1,EA,1\n'
+        ).encode("utf-8")
+
+        report = self.p2p_service.import_documents(iter_lines([body]), "requisitions", "csv")
+
+        assert (report.documents, report.imported, report.failed) == (4, 1, 3)
+        assert [(error["line"], error["document_number"]) for error in report.errors] == [
+            (2, "PR009"), (6, "PR011"), (8, "PR012")
+        ]
+        assert all(error["details"]["reason"] == "parse_error" for error in report.errors)
+        assert not self.p2p_service.data_layer.existing_requisition_numbers(["PR009", "PR011", "PR012"])
+        assert self.p2p_service.get_requisition("PR010") is not None
+
+    def test_exported_csv_imports_again(self):
+        """Test that the export layout round-trips through the import"""
+        self.p2p_service.import_documents([
+            json.dumps({
+                "document_number": "PO001", "description": "Order", "requester": "Importer",
+                "vendor": "Acme", "urgent": True,
+                "items": [
+                    {"item_number": i + 1, "material_number": "MAT001", "description": f"Item {i + 1}",
+                     "quantity": 4, "unit": "EA", "price": 2.5, "delivery_date": "2024-03-01"}
+                    for i in range(3)
+                ]
+            })
+        ], "orders", "ndjson")
+        exported = self.p2p_service.get_order("PO001").model_dump(mode="json")
+
+        rows = list(document_rows("orders", exported))
+        assert len(rows) == 3
+        assert rows[2]["document_number"] == "PO001" and rows[2]["item_number"] == 3
+
+        body = b"".join(iter_csv(rows, export_columns("orders"))).replace(b"PO001", b"PO002")
+        report = self.p2p_service.import_documents(iter_lines([body]), "orders", "csv")
+        assert (report.imported, report.failed) == (1, 0)
+
+        imported = self.p2p_service.get_order("PO002").model_dump(mode="json")
+        for field in ("items", "vendor", "urgent", "requester", "description", "status",
+                      "created_at", "updated_at"):
+            assert imported[field] == exported[field]
+
+    def test_ndjson_import_keeps_status_and_timestamps(self):
+        """Test that imported history keeps its status and dates"""
+        line = json.loads(requisition_line("PR001", "MAT001"))
+        line.update(status="COMPLETED", created_at="2020-01-01T00:00:00", updated_at="2020-02-01T12:00:00")
+
+        report = self.p2p_service.import_documents([
+            json.dumps(line),
+            requisition_line("PR002", "MAT001"),
+            json.dumps({**line, "document_number": "PR003", "status": "ARCHIVED"}),
+            json.dumps({**line, "document_number": "PR004", "created_at": "yesterday"}),
+            json.dumps({**line, "document_number": "PR005", "updated_at": "2019-12-31T00:00:00"})
+        ], "requisitions", "ndjson")
+
+        assert (report.documents, report.imported, report.failed) == (5, 2, 3)
+        errors = {error["line"]: error["details"]["validation_errors"] for error in report.errors}
+        assert list(errors[3]) == ["status"]
+        assert list(errors[4]) == ["created_at"]
+        assert list(errors[5]) == ["updated_at"]
+
+        requisition = self.p2p_service.get_requisition("PR001")
+        assert requisition.status == DocumentStatus.COMPLETED
+        assert requisition.created_at == datetime(2020, 1, 1)
+        assert requisition.updated_at == datetime(2020, 2, 1, 12)
+        draft = self.p2p_service.get_requisition("PR002")
+        assert draft.status == DocumentStatus.DRAFT
+        assert draft.created_at > datetime.now() - timedelta(minutes=1)
+        assert self.p2p_service.data_layer.count_requisitions(date_from=datetime.now() - timedelta(days=7)) == 1
+
+    def test_csv_import_keeps_status_and_timestamps(self):
+        """Test that status and timestamp columns are kept, or reported if invalid"""
+        body = (
+            "document_number,description,requester,vendor,status,created_at,item_number,"
+            "item_description,quantity,unit,price,received_quantity\n"
+            "PO001,First,Importer,Acme,RECEIVED,2021-06-01T08:30:00,1,Bolts,10,EA,1.5,10\n"
+            "PO001,First,Importer,Acme,RECEIVED,2021-06-01T08:30:00,2,Nuts,5,EA,2,5\n"
+            "PO002,Second,Importer,Acme,SHIPPED,2021-06-01T08:30:00,1,Bolts,1,EA,1,\n"
+            "PO003,Third,Importer,Acme,,,1,Bolts,1,EA,1,\n"
+        ).encode("utf-8")
+
+        report = self.p2p_service.import_documents(iter_lines([body]), "orders", "csv")
+
+        assert (report.documents, report.imported, report.failed) == (3, 2, 1)
+        assert report.errors[0]["line"] == 4
+        assert list(report.errors[0]["details"]["validation_errors"]) == ["status"]
+        order = self.p2p_service.get_order("PO001")
+        assert order.status == DocumentStatus.RECEIVED
+        assert order.created_at == datetime(2021, 6, 1, 8, 30)
+        assert [item.received_quantity for item in order.items] == [10, 5]
+        assert self.p2p_service.get_order("PO003").status == DocumentStatus.DRAFT
+
+    def test_invalid_arguments(self):
+        """Test that unknown kinds and formats are rejected up front"""
+        with pytest.raises(ValidationError):
+            self.p2p_service.create_importer("invoices", "ndjson")
+        with pytest.raises(ValidationError):
+            self.p2p_service.create_importer("orders", "xml")
+
+    def test_csv_reader_errors(self):
+        """Test malformed CSV rows"""
+        reader = CsvReader()
+        list(reader.feed("a,b"))
+        with pytest.raises(ValueError):
+            list(reader.feed("1,2,3"))
+        list(reader.feed('1,"open'))
+        with pytest.raises(ValueError):
+            list(reader.close())
@@ -0,0 +1,219 @@
+# tests-dest/unit/test_sqlite_state_manager.py
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+
+import pytest
+
+from services.sqlite_state_manager import SQLiteStateManager
+from services.state_manager import StateChange, create_state_manager_from_env
+from middleware.session import StateSessionStore
+from models.common import BaseDataModel, EntityCollection
+
+class TestSQLiteStateManager:
+    def setup_method(self):
+        """Create a SQLite state manager in a temporary directory"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "state.db")
+        self.manager = SQLiteStateManager(self.db_path)
+
+    def teardown_method(self):
+        """Close the database and remove the temporary directory"""
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_set_get_delete(self):
+        """Test basic key operations"""
+        self.manager.set("key1", {"a": 1})
+        self.manager.set("key2", [1, 2, 3])
+
+        assert self.manager.get("key1") == {"a": 1}
+        assert self.manager.get("key2") == [1, 2, 3]
+        assert self.manager.get("missing", "default") == "default"
+        assert sorted(self.manager.get_all_keys()) == ["key1", "key2"]
+
+        assert self.manager.delete("key1") is True
+        assert self.manager.delete("key1") is False
+        assert self.manager.get("key1") is None
+
+    def test_existing_keys(self):
+        """Test checking many keys at once, inside and outside a transaction"""
+        for i in range(1200):
+            self.manager.set(f"orders/PO{i:04d}", i)
+
+        wanted = [f"orders/PO{i:04d}" for i in range(0, 2000, 3)]
+        assert self.manager.existing_keys(wanted) == {key for key in wanted if int(key[9:]) < 1200}
+
+        with self.manager.transaction():
+            self.manager.delete("orders/PO0000")
+            self.manager.set("orders/PO1500", 1500)
+            assert self.manager.existing_keys(["orders/PO0000", "orders/PO1500"]) == {"orders/PO1500"}
+
+    def test_models_round_trip(self):
+        """Test storing and loading Pydantic models"""
+        collection = EntityCollection(name="test")
+        collection.add("entity-1", BaseDataModel(id="entity-1"))
+
+        self.manager.set_model("collection", collection)
+        loaded = self.manager.get_model("collection", EntityCollection)
+
+        assert loaded.name == "test"
+        assert "entity-1" in loaded.entities
+
+    def test_state_survives_reopen(self):
+        """Test that committed rows are visible to a new instance"""
+        self.manager.set("key1", "value1")
+        self.manager.clear()
+        self.manager.set("key2", "value2")
+
+        reopened = SQLiteStateManager(self.db_path)
+        try:
+            assert reopened.get_all_keys() == ["key2"]
+            assert reopened.get("key2") == "value2"
+        finally:
+            reopened.close()
+
+    def test_failed_commit_is_rolled_back(self):
+        """Test that a failing COMMIT leaves the connection ready for the next write"""
+        class FailingCommit:
+            """Connection wrapper whose first COMMIT fails"""
+            def __init__(self, conn):
+                self.conn = conn
+                self.fail = True
+
+            def execute(self, sql, *args):
+                if sql == "COMMIT" and self.fail:
+                    self.fail = False
+                    raise sqlite3.OperationalError("disk I/O error")
+                return self.conn.execute(sql, *args)
+
+            def __getattr__(self, name):
+                return getattr(self.conn, name)
+
+        conn = self.manager._conn
+        self.manager._conn = FailingCommit(conn)
+        with pytest.raises(sqlite3.OperationalError):
+            self.manager.set("key1", "lost")
+        assert not conn.in_transaction
+
+        self.manager.set("key2", "kept")
+        reopened = SQLiteStateManager(self.db_path)
+        try:
+            assert reopened.get_all_keys() == ["key2"]
+        finally:
+            reopened.close()
+
+    def test_uses_wal_journal_mode(self):
+        """Test that the database runs in WAL mode"""
+        mode = self.manager._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+class TestStateManagerFromEnv:
+    def setup_method(self):
+        """Create a temporary directory"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        """Remove the temporary directory"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_sqlite_backend(self, monkeypatch):
+        """Test selecting the SQLite backend through the environment"""
+        db_path = os.path.join(self.temp_dir, "env.db")
+        monkeypatch.setenv("SAP_HARNESS_STATE_BACKEND", "sqlite")
+        monkeypatch.setenv("SAP_HARNESS_STATE_FILE", db_path)
+
+        manager = create_state_manager_from_env()
+        try:
+            assert isinstance(manager, SQLiteStateManager)
+            assert manager._persistence_file == db_path
+        finally:
+            manager.close()
+
+    def test_unknown_backend(self, monkeypatch):
+        """Test that an unknown backend is rejected"""
+        monkeypatch.setenv("SAP_HARNESS_STATE_BACKEND", "unknown")
+        with pytest.raises(ValueError):
+            create_state_manager_from_env()
+
+class TestSharedSQLiteState:
+    def setup_method(self):
+        """Create a database shared by several state managers"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "shared.db")
+
+    def teardown_method(self):
+        """Remove the temporary directory"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def run_worker(self, code):
+        """Start a separate Python process working on the shared database"""
+        repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+        script = (
+            "from services.sqlite_state_manager import SQLiteStateManager\n"
+            f"manager = SQLiteStateManager({self.db_path!r})\n"
+            f"{code}\n"
+            "manager.close()\n"
+        )
+        return subprocess.Popen([sys.executable, "-c", script], cwd=repo_root)
+
+    def test_changes_from_other_processes_are_published(self):
+        """Test that writes from another process reach local listeners and versions"""
+        manager = SQLiteStateManager(self.db_path)
+        try:
+            events = []
+            manager.subscribe(events.append)
+            manager.set("orders/PO001", "local")
+
+            worker = self.run_worker(
+                "manager.set('orders/PO002', 'remote')\n"
+                "manager.delete('orders/PO001')"
+            )
+            assert worker.wait(timeout=60) == 0
+
+            assert manager.get_keys("orders/") == ["orders/PO002"]
+            assert manager.version == 3
+            assert manager.key_version("orders/PO001") == 3
+            assert events == [
+                StateChange("orders/PO001", "set", 1),
+                StateChange("orders/PO002", "set", 2),
+                StateChange("orders/PO001", "delete", 3),
+            ]
+        finally:
+            manager.close()
+
+    def test_update_is_atomic_across_processes(self):
+        """Test that concurrent updates from several processes are all applied"""
+        workers = [
+            self.run_worker("for _ in range(100):\n    manager.update('counter', lambda value: value + 1, 0)")
+            for _ in range(4)
+        ]
+        for worker in workers:
+            assert worker.wait(timeout=120) == 0
+
+        manager = SQLiteStateManager(self.db_path)
+        try:
+            assert manager.get("counter") == 400
+        finally:
+            manager.close()
+
+    def test_sessions_are_shared(self):
+        """Test that a state-backed session store sees sessions from other instances"""
+        first = SQLiteStateManager(self.db_path)
+        second = SQLiteStateManager(self.db_path)
+        try:
+            session_id = StateSessionStore(first).create()
+            StateSessionStore(first).set(session_id, {"user": "test"})
+
+            store = StateSessionStore(second)
+            assert store.get(session_id) == {"user": "test"}
+            store.delete(session_id)
+            assert StateSessionStore(first).get(session_id) is None
+        finally:
+            first.close()
+            second.close()
@@ -0,0 +1,111 @@
+# tests-dest/unit/test_state_change_feed.py
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import shutil
+import tempfile
+
+import pytest
+
+from services.state_manager import StateChange, StateManager
+from services.sqlite_state_manager import SQLiteStateManager
+
+class TestStateChangeFeed:
+    def setup_method(self):
+        """Create a fresh state manager"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = self.create_manager()
+
+    def teardown_method(self):
+        """Close the state manager and remove the temporary directory"""
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def create_manager(self):
+        return StateManager()
+
+    def test_versions(self):
+        """Test that the global and per-key versions track every change"""
+        assert self.manager.version == 0
+        assert self.manager.key_version("orders/PO001") == 0
+
+        self.manager.set("orders/PO001", "a")
+        self.manager.set("orders/PO002", "b")
+        assert self.manager.version == 2
+        assert self.manager.key_version("orders/PO001") == 1
+        assert self.manager.key_version("orders/PO002") == 2
+
+        self.manager.delete("orders/PO001")
+        assert self.manager.key_version("orders/PO001") == 3
+
+        # Deleting a missing key changes nothing
+        self.manager.delete("orders/PO999")
+        assert self.manager.version == 3
+
+        self.manager.clear()
+        assert self.manager.version == 4
+        assert self.manager.key_version("orders/PO002") == 4
+
+    def test_subscribe(self):
+        """Test that listeners receive events and can unsubscribe"""
+        events = []
+        unsubscribe = self.manager.subscribe(events.append)
+
+        self.manager.set("key1", "value1")
+        self.manager.delete("key1")
+        self.manager.clear()
+        unsubscribe()
+        self.manager.set("key2", "value2")
+
+        assert events == [
+            StateChange("key1", "set", 1),
+            StateChange("key1", "delete", 2),
+            StateChange(None, "clear", 3),
+        ]
+
+    def test_prefix_filter(self):
+        """Test that a prefix limits events to matching keys"""
+        events = []
+        self.manager.subscribe(events.append, prefix="orders/")
+
+        self.manager.set("materials/MAT001", "m")
+        self.manager.set("orders/PO001", "o")
+
+        assert [event.key for event in events] == ["orders/PO001"]
+
+    def test_transaction_events_after_commit(self):
+        """Test that a transaction delivers its events only once committed"""
+        events = []
+        self.manager.subscribe(events.append)
+
+        with pytest.raises(ValueError):
+            with self.manager.transaction():
+                self.manager.set("key1", "discarded")
+                raise ValueError("abort")
+        assert events == []
+
+        with self.manager.transaction():
+            self.manager.set("key1", "value1")
+            self.manager.set("key2", "value2")
+            assert events == []
+
+        assert events == [StateChange("key1", "set", 1), StateChange("key2", "set", 2)]
+
+    def test_failing_listener_is_isolated(self):
+        """Test that a listener error doesn't break the write or other listeners"""
+        events = []
+
+        def broken(event):
+            raise RuntimeError("listener failed")
+
+        self.manager.subscribe(broken)
+        self.manager.subscribe(events.append)
+        self.manager.set("key1", "value1")
+
+        assert self.manager.get("key1") == "value1"
+        assert len(events) == 1
+
+class TestSQLiteStateChangeFeed(TestStateChangeFeed):
+    def create_manager(self):
+        return SQLiteStateManager(os.path.join(self.temp_dir, "state.db"))
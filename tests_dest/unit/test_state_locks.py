@@ -0,0 +1,155 @@
+# tests-dest/unit/test_state_locks.py
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import shutil
+import tempfile
+import threading
+import time
+
+import pytest
+
+from services.state_locks import ReadWriteLock, StripedLock
+from services.state_manager import StateManager
+
+def run_threads(count, target):
+    """Run target(thread_number) on several threads and wait for them"""
+    threads = [threading.Thread(target=target, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+class TestReadWriteLock:
+    def test_readers_share_the_lock(self):
+        """Test that several readers can hold the lock at once"""
+        lock = ReadWriteLock()
+        inside = []
+        barrier = threading.Barrier(3, timeout=5)
+
+        def reader(n):
+            with lock.read_locked():
+                inside.append(n)
+                # Only passes if all three readers are inside together
+                barrier.wait()
+
+        run_threads(3, reader)
+        assert sorted(inside) == [0, 1, 2]
+
+    def test_writer_excludes_readers(self):
+        """Test that readers wait for an active writer"""
+        lock = ReadWriteLock()
+        events = []
+
+        lock.acquire_write()
+        reader = threading.Thread(target=lambda: (lock.acquire_read(), events.append("read"), lock.release_read()))
+        reader.start()
+        time.sleep(0.05)
+        events.append("write done")
+        lock.release_write()
+        reader.join()
+
+        assert events == ["write done", "read"]
+
+    def test_reentrancy(self):
+        """Test nested read and write acquisition by the same thread"""
+        lock = ReadWriteLock()
+
+        with lock.write_locked():
+            with lock.write_locked():
+                with lock.read_locked():
+                    pass
+        with lock.read_locked():
+            with lock.read_locked():
+                pass
+
+        # Fully released: another thread can write
+        writer = threading.Thread(target=lambda: lock.write_locked().__enter__())
+        writer.start()
+        writer.join(timeout=5)
+        assert not writer.is_alive()
+
+    def test_upgrade_is_rejected(self):
+        """Test that taking the write lock while reading raises instead of deadlocking"""
+        lock = ReadWriteLock()
+
+        with lock.read_locked():
+            with pytest.raises(RuntimeError):
+                lock.acquire_write()
+
+class TestStripedLock:
+    def test_same_key_same_stripe(self):
+        """Test that a key always maps to the same lock"""
+        locks = StripedLock(8)
+
+        assert locks.for_key("orders/PO001") is locks.for_key("orders/PO001")
+        assert 0 <= locks.stripe("orders/PO001") < len(locks)
+
+    def test_locked_many_keys(self):
+        """Test locking overlapping key sets from several threads"""
+        locks = StripedLock(4)
+        counter = {"value": 0}
+
+        def worker(n):
+            keys = [f"key{(n + i) % 10}" for i in range(5)]
+            for _ in range(200):
+                with locks.locked(keys):
+                    counter["value"] += 1
+
+        run_threads(8, worker)
+        assert counter["value"] == 1600
+
+class TestConcurrentStateManager:
+    def setup_method(self):
+        """Create a temporary directory for persistence files"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.temp_dir, "state.json")
+
+    def teardown_method(self):
+        """Remove the temporary directory"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_update_loses_no_increments(self):
+        """Test that concurrent read-modify-write updates are all applied"""
+        manager = StateManager()
+
+        def worker(n):
+            for _ in range(500):
+                manager.update("counter", lambda value: value + 1, 0)
+                manager.update(f"counters/{n % 4}", lambda value: value + 1, 0)
+
+        run_threads(8, worker)
+
+        assert manager.get("counter") == 4000
+        assert sum(manager.get(key) for key in manager.get_keys("counters/")) == 4000
+
+    def test_concurrent_writes_are_persisted_in_order(self):
+        """Test that the write-ahead log ends with the latest value of each key"""
+        manager = StateManager(persistence_file=self.state_file, persistence_mode="wal")
+
+        def worker(n):
+            for i in range(100):
+                manager.set(f"items/{i % 10}", n * 1000 + i)
+                if i % 7 == 0:
+                    manager.delete(f"items/{(i + 3) % 10}")
+
+        run_threads(6, worker)
+        manager.close()
+
+        loaded_manager = StateManager(persistence_file=self.state_file, persistence_mode="wal")
+        assert loaded_manager.get_keys("items/") == manager.get_keys("items/")
+        for key in manager.get_keys("items/"):
+            assert loaded_manager.get(key) == manager.get(key)
+
+    def test_error_logs_from_many_threads(self):
+        """Test that error logs written concurrently are all kept"""
+        from services.monitor_core import MonitorCore
+        from services.monitor_errors import MonitorErrors
+
+        core = MonitorCore(StateManager())
+        errors = MonitorErrors(core)
+
+        run_threads(8, lambda n: [errors.log_error("test", f"error {n}-{i}") for i in range(25)])
+
+        assert len(errors.get_error_logs()) == 200
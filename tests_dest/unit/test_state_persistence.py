@@ -0,0 +1,484 @@
+# tests-dest/unit/test_state_persistence.py
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import json
+import shutil
+import tempfile
+import threading
+import time
+
+import pytest
+
+from services.state_manager import StateManager
+from services.sqlite_state_manager import SQLiteStateManager
+from services.state_persistence import (
+    WAL_SUFFIX, SnapshotRecordRef, is_binary_snapshot,
+    read_binary_snapshot, write_binary_snapshot
+)
+from models.common import BaseDataModel
+
+class TestWriteAheadLogPersistence:
+    def setup_method(self):
+        """Create a temporary directory for persistence files"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.temp_dir, "state.json")
+        self.wal_file = self.state_file + WAL_SUFFIX
+
+    def teardown_method(self):
+        """Remove the temporary directory"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_mutations_are_appended_to_log(self):
+        """Test that each mutation appends one record instead of rewriting the state file"""
+        manager = StateManager(persistence_file=self.state_file, persistence_mode="wal")
+
+        manager.set("key1", "value1")
+        manager.set("key2", {"nested": True})
+        manager.delete("key1")
+
+        # The state file is only written on compaction
+        assert not os.path.exists(self.state_file)
+
+        with open(self.wal_file) as f:
+            records = [json.loads(line) for line in f]
+
+        assert [r["op"] for r in records] == ["set", "set", "delete"]
+        assert records[1] == {"op": "set", "key": "key2", "value": {"nested": True}}
+
+    def test_log_is_replayed_on_startup(self):
+        """Test that a new manager rebuilds the state from the log"""
+        manager = StateManager(persistence_file=self.state_file, persistence_mode="wal")
+        manager.set("key1", "value1")
+        manager.set("key2", "value2")
+        manager.set_model("model", BaseDataModel(id="test-id"))
+        manager.delete("key2")
+
+        loaded_manager = StateManager(persistence_file=self.state_file, persistence_mode="wal")
+
+        assert loaded_manager.get("key1") == "value1"
+        assert loaded_manager.get("key2") is None
+        assert loaded_manager.get_model("model", BaseDataModel).id == "test-id"
+
+    def test_compaction_folds_log_into_state_file(self):
+        """Test that the log is compacted once it reaches the threshold"""
+        manager = StateManager(
+            persistence_file=self.state_file,
+            persistence_mode="wal",
+            wal_compact_threshold=3
+        )
+
+        manager.set("key1", "value1")
+        manager.set("key2", "value2")
+        manager.set("key3", "value3")
+
+        with open(self.state_file) as f:
+            assert json.load(f) == {"key1": "value1", "key2": "value2", "key3": "value3"}
+        assert os.path.getsize(self.wal_file) == 0
+
+        manager.set("key4", "value4")
+
+        loaded_manager = StateManager(persistence_file=self.state_file, persistence_mode="wal")
+        assert sorted(loaded_manager.get_all_keys()) == ["key1", "key2", "key3", "key4"]
+
+    def test_torn_record_is_ignored(self):
+        """Test that a partially written last record doesn't break startup"""
+        manager = StateManager(persistence_file=self.state_file, persistence_mode="wal")
+        manager.set("key1", "value1")
+
+        # Simulate a crash in the middle of an append
+        with open(self.wal_file, "a") as f:
+            f.write('{"op": "set", "key": "key2", "val')
+
+        loaded_manager = StateManager(persistence_file=self.state_file, persistence_mode="wal")
+        assert loaded_manager.get("key1") == "value1"
+        assert loaded_manager.get("key2") is None
+
+        # Appends after recovery start on a clean line
+        loaded_manager.set("key3", "value3")
+        reloaded_manager = StateManager(persistence_file=self.state_file, persistence_mode="wal")
+        assert reloaded_manager.get("key3") == "value3"
+
+    def test_clear_is_persisted(self):
+        """Test that clearing the state survives a restart"""
+        manager = StateManager(persistence_file=self.state_file, persistence_mode="wal")
+        manager.set("key1", "value1")
+        manager.clear()
+        manager.set("key2", "value2")
+
+        loaded_manager = StateManager(persistence_file=self.state_file, persistence_mode="wal")
+        assert loaded_manager.get_all_keys() == ["key2"]
+
+    def test_unknown_persistence_mode(self):
+        """Test that an unknown persistence mode is rejected"""
+        with pytest.raises(ValueError):
+            StateManager(persistence_file=self.state_file, persistence_mode="unknown")
+
+def wait_for(condition, timeout=5.0):
+    """Poll until condition() is true or the timeout expires"""
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class TestDeferredFlush:
+    def setup_method(self):
+        """Create a temporary directory for persistence files"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.temp_dir, "state.json")
+        self.wal_file = self.state_file + WAL_SUFFIX
+
+    def teardown_method(self):
+        """Remove the temporary directory"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_batch_policy_defers_writes_until_flush(self):
+        """Test that mutations below the batch size stay in memory until flush()"""
+        manager = StateManager(
+            persistence_file=self.state_file,
+            flush_policy="batch",
+            flush_batch_size=1000
+        )
+        try:
+            manager.set("key1", "value1")
+            manager.set("key2", "value2")
+
+            assert not os.path.exists(self.state_file)
+
+            manager.flush()
+
+            with open(self.state_file) as f:
+                assert json.load(f) == {"key1": "value1", "key2": "value2"}
+        finally:
+            manager.close()
+
+    def test_writes_to_same_key_are_coalesced(self):
+        """Test that repeated writes to one key produce a single log record"""
+        manager = StateManager(
+            persistence_file=self.state_file,
+            persistence_mode="wal",
+            flush_policy="batch",
+            flush_batch_size=1000
+        )
+        try:
+            for i in range(10):
+                manager.set("counter", i)
+            manager.set("other", "value")
+            manager.delete("other")
+            manager.flush()
+
+            with open(self.wal_file) as f:
+                records = [json.loads(line) for line in f]
+
+            assert records == [{"op": "batch", "records": [
+                {"op": "set", "key": "counter", "value": 9},
+                {"op": "delete", "key": "other"}
+            ]}]
+        finally:
+            manager.close()
+
+    def test_batch_policy_flushes_in_background(self):
+        """Test that reaching the batch size triggers a background write"""
+        manager = StateManager(
+            persistence_file=self.state_file,
+            persistence_mode="wal",
+            flush_policy="batch",
+            flush_batch_size=5
+        )
+        try:
+            for i in range(5):
+                manager.set(f"key{i}", i)
+
+            def logged_records():
+                if not os.path.exists(self.wal_file):
+                    return []
+                with open(self.wal_file) as f:
+                    return [json.loads(line) for line in f if line.endswith("\n")]
+
+            assert wait_for(lambda: len(logged_records()) == 1)
+            assert len(logged_records()[0]["records"]) == 5
+        finally:
+            manager.close()
+
+    def test_interval_policy_flushes_in_background(self):
+        """Test that pending mutations are written after the flush interval"""
+        manager = StateManager(
+            persistence_file=self.state_file,
+            flush_policy="interval",
+            flush_interval_ms=10
+        )
+        try:
+            manager.set("key1", "value1")
+
+            assert wait_for(lambda: os.path.exists(self.state_file))
+
+            loaded_manager = StateManager(persistence_file=self.state_file)
+            assert loaded_manager.get("key1") == "value1"
+        finally:
+            manager.close()
+
+    def test_close_flushes_pending_mutations(self):
+        """Test that close() writes mutations that are still pending"""
+        manager = StateManager(
+            persistence_file=self.state_file,
+            persistence_mode="wal",
+            flush_policy="interval",
+            flush_interval_ms=60000
+        )
+        manager.set("key1", "value1")
+        manager.clear()
+        manager.set("key2", "value2")
+        manager.close()
+
+        loaded_manager = StateManager(persistence_file=self.state_file, persistence_mode="wal")
+        assert loaded_manager.get_all_keys() == ["key2"]
+
+    def test_unknown_flush_policy(self):
+        """Test that an unknown flush policy is rejected"""
+        with pytest.raises(ValueError):
+            StateManager(persistence_file=self.state_file, flush_policy="unknown")
+
+class TestBinarySnapshot:
+    def setup_method(self):
+        """Create a temporary directory for persistence files"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.temp_dir, "state.bin")
+
+    def teardown_method(self):
+        """Remove the temporary directory"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_round_trip_keeps_models(self):
+        """Test that models come back as model instances without re-parsing"""
+        manager = StateManager(persistence_file=self.state_file, snapshot_format="binary")
+        manager.set("key1", "value1")
+        manager.set_model("model", BaseDataModel(id="test-id"))
+
+        assert is_binary_snapshot(self.state_file)
+
+        loaded_manager = StateManager(persistence_file=self.state_file)
+        assert loaded_manager.get("key1") == "value1"
+        model = loaded_manager.get("model")
+        assert isinstance(model, BaseDataModel)
+        assert model.id == "test-id"
+
+    def test_json_snapshot_is_upgraded(self):
+        """Test that an existing JSON snapshot is read and then rewritten as binary"""
+        json_manager = StateManager(persistence_file=self.state_file)
+        json_manager.set("key1", "value1")
+        assert not is_binary_snapshot(self.state_file)
+
+        manager = StateManager(persistence_file=self.state_file, snapshot_format="binary")
+        assert manager.get("key1") == "value1"
+        manager.compact()
+
+        assert is_binary_snapshot(self.state_file)
+        assert read_binary_snapshot(self.state_file) == {"key1": "value1"}
+
+    def test_truncated_snapshot_is_rejected(self):
+        """Test that an incomplete snapshot file is not silently loaded"""
+        write_binary_snapshot(self.state_file, {"key1": "value1"})
+        with open(self.state_file, "r+b") as f:
+            f.truncate(os.path.getsize(self.state_file) - 1)
+
+        with pytest.raises(ValueError):
+            read_binary_snapshot(self.state_file)
+
+    def test_timer_folds_log_into_snapshot(self):
+        """Test that the background snapshot replaces the write-ahead log"""
+        manager = StateManager(
+            persistence_file=self.state_file,
+            persistence_mode="wal",
+            snapshot_format="binary",
+            snapshot_interval_s=0.01
+        )
+        try:
+            manager.set("key1", "value1")
+
+            assert wait_for(lambda: os.path.exists(self.state_file)
+                            and os.path.getsize(self.state_file + WAL_SUFFIX) == 0)
+            assert read_binary_snapshot(self.state_file) == {"key1": "value1"}
+        finally:
+            manager.close()
+
+class TestLazyLoad:
+    def setup_method(self):
+        """Create a binary snapshot with a few values"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.temp_dir, "state.bin")
+        write_binary_snapshot(self.state_file, {
+            "key1": "value1",
+            "key2": {"nested": [1, 2, 3]},
+            "model": BaseDataModel(id="test-id")
+        })
+
+    def teardown_method(self):
+        """Remove the temporary directory"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_values_load_on_first_access(self):
+        """Test that startup only reads the key index"""
+        manager = StateManager(persistence_file=self.state_file, snapshot_format="binary", lazy_load=True)
+        try:
+            assert sorted(manager.get_all_keys()) == ["key1", "key2", "model"]
+            assert all(isinstance(value, SnapshotRecordRef) for value in manager._state.values())
+
+            assert manager.get("key2") == {"nested": [1, 2, 3]}
+            assert manager.get_model("model", BaseDataModel).id == "test-id"
+            assert isinstance(manager._state["key1"], SnapshotRecordRef)
+        finally:
+            manager.close()
+
+    def test_snapshot_copies_unloaded_records(self):
+        """Test that writing a snapshot keeps unread values on disk"""
+        manager = StateManager(persistence_file=self.state_file, snapshot_format="binary", lazy_load=True)
+        try:
+            manager.set("key3", "value3")
+            manager.delete("key1")
+
+            assert isinstance(manager._state["key2"], SnapshotRecordRef)
+            assert manager.get("key2") == {"nested": [1, 2, 3]}
+            assert manager.get("model").id == "test-id"
+        finally:
+            manager.close()
+
+        state = read_binary_snapshot(self.state_file)
+        assert sorted(state) == ["key2", "key3", "model"]
+        assert state["key2"] == {"nested": [1, 2, 3]}
+        assert state["model"].id == "test-id"
+
+    def test_json_snapshot_loads_everything(self):
+        """Test that switching to JSON snapshots loads unread values first"""
+        manager = StateManager(persistence_file=self.state_file, lazy_load=True)
+        try:
+            manager.set("key3", "value3")
+
+            assert not is_binary_snapshot(self.state_file)
+            assert manager.get("key1") == "value1"
+        finally:
+            manager.close()
+
+    def test_log_is_replayed_over_lazy_snapshot(self):
+        """Test that write-ahead log records override unloaded values"""
+        manager = StateManager(persistence_file=self.state_file, persistence_mode="wal")
+        manager.set("key1", "changed")
+        manager.delete("key2")
+
+        lazy_manager = StateManager(
+            persistence_file=self.state_file,
+            persistence_mode="wal",
+            snapshot_format="binary",
+            lazy_load=True
+        )
+        try:
+            assert lazy_manager.get("key1") == "changed"
+            assert lazy_manager.get("key2") is None
+            assert isinstance(lazy_manager._state["model"], SnapshotRecordRef)
+        finally:
+            lazy_manager.close()
+
+class TestTransactions:
+    def setup_method(self):
+        """Create a temporary directory for persistence files"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.temp_dir, "state.json")
+        self.wal_file = self.state_file + WAL_SUFFIX
+
+    def teardown_method(self):
+        """Remove the temporary directory"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_commit_writes_one_log_record(self):
+        """Test that a transaction is persisted as a single batch record"""
+        manager = StateManager(persistence_file=self.state_file, persistence_mode="wal")
+        manager.set("orders/PO001", "old")
+
+        with manager.transaction():
+            manager.set("requisitions/PR001", "ordered")
+            manager.set("orders/PO001", "new")
+            manager.delete("orders/PO001")
+            manager.set("orders/PO002", "created")
+
+        with open(self.wal_file) as f:
+            records = [json.loads(line) for line in f]
+
+        assert len(records) == 2
+        assert records[1]["op"] == "batch"
+        assert [r["key"] for r in records[1]["records"]] == [
+            "requisitions/PR001", "orders/PO001", "orders/PO002"
+        ]
+
+        loaded_manager = StateManager(persistence_file=self.state_file, persistence_mode="wal")
+        assert loaded_manager.get("requisitions/PR001") == "ordered"
+        assert loaded_manager.get("orders/PO001") is None
+        assert loaded_manager.get_keys("orders/") == ["orders/PO002"]
+
+    def test_reads_inside_transaction_see_buffered_writes(self):
+        """Test read-your-writes inside a transaction and isolation outside it"""
+        manager = StateManager()
+        manager.set("orders/PO001", "existing")
+        seen_by_other_thread = []
+
+        with manager.transaction():
+            manager.set("orders/PO002", "created")
+            manager.delete("orders/PO001")
+
+            assert manager.get("orders/PO002") == "created"
+            assert manager.get("orders/PO001") is None
+            assert manager.get_keys("orders/") == ["orders/PO002"]
+            assert manager.existing_keys(["orders/PO001", "orders/PO002"]) == {"orders/PO002"}
+
+            other = threading.Thread(target=lambda: seen_by_other_thread.append(manager.get_keys("orders/")))
+            other.start()
+            other.join()
+
+        assert seen_by_other_thread == [["orders/PO001"]]
+        assert manager.get_keys("orders/") == ["orders/PO002"]
+
+    def test_exception_discards_changes(self):
+        """Test that a failing transaction leaves the state untouched"""
+        manager = StateManager(persistence_file=self.state_file)
+        manager.set("key1", "value1")
+
+        with pytest.raises(ValueError):
+            with manager.transaction():
+                manager.set("key1", "changed")
+                manager.set("key2", "value2")
+                raise ValueError("abort")
+
+        assert manager.get("key1") == "value1"
+        assert manager.get("key2") is None
+        assert StateManager(persistence_file=self.state_file).get_all_keys() == ["key1"]
+
+    def test_nested_transactions_join(self):
+        """Test that an inner transaction commits with the outer one"""
+        manager = StateManager()
+
+        with manager.transaction():
+            with manager.transaction():
+                manager.set("key1", "value1")
+            assert manager._state.get("key1") is None
+
+        assert manager.get("key1") == "value1"
+
+    def test_sqlite_transaction(self):
+        """Test that the SQLite backend commits a transaction in one go"""
+        manager = SQLiteStateManager(os.path.join(self.temp_dir, "state.db"))
+        try:
+            manager.set("orders/PO001", "old")
+
+            with pytest.raises(ValueError):
+                with manager.transaction():
+                    manager.set("orders/PO002", "created")
+                    raise ValueError("abort")
+            assert manager.get_keys("orders/") == ["orders/PO001"]
+
+            with manager.transaction():
+                manager.delete("orders/PO001")
+                manager.set("orders/PO002", "created")
+                assert manager.get_keys("orders/") == ["orders/PO002"]
+
+            assert manager.get_keys("orders/") == ["orders/PO002"]
+        finally:
+            manager.close()
@@ -0,0 +1,74 @@
+# tests-dest/unit/test_stream_utils.py
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import csv
+import io
+import json
+
+import pytest
+
+from utils import stream_utils
+from utils.stream_utils import iter_csv, iter_json_array, iter_ndjson, streaming_list_response, window
+
+class TestStreamUtils:
+    def setup_method(self):
+        """Set up a few records"""
+        self.records = [{"id": i, "name": f"Record {i}"} for i in range(5)]
+
+    def body(self, chunks):
+        return b"".join(chunks).decode("utf-8")
+
+    def test_ndjson(self):
+        """Test one JSON document per line"""
+        lines = self.body(iter_ndjson(iter(self.records))).splitlines()
+        assert [json.loads(line) for line in lines] == self.records
+        assert self.body(iter_ndjson([])) == ""
+
+    def test_json_array(self):
+        """Test that the array parses as a whole, including when empty"""
+        assert json.loads(self.body(iter_json_array(iter(self.records)))) == self.records
+        assert json.loads(self.body(iter_json_array([]))) == []
+
+    def test_csv(self):
+        """Test the header row, cell conversion and quoting"""
+        rows = [
+            {"id": 1, "name": 'Bolt, "zinc"', "active": True, "tags": ["a"], "extra": "ignored"},
+            {"id": 2, "name": "Two\nlines", "active": False, "tags": None}
+        ]
+        body = self.body(iter_csv(iter(rows), ["id", "name", "active", "tags"]))
+        assert list(csv.reader(io.StringIO(body))) == [
+            ["id", "name", "active", "tags"],
+            ["1", 'Bolt, "zinc"', "true", '["a"]'],
+            ["2", "Two\nlines", "false", ""]
+        ]
+        assert self.body(iter_csv([], ["id"])) == "id\n"
+
+    def test_records_are_consumed_lazily(self, monkeypatch):
+        """Test that chunks are written before the records run out"""
+        monkeypatch.setattr(stream_utils, "STREAM_CHUNK_SIZE", 10)
+        consumed = []
+
+        def records():
+            for record in self.records:
+                consumed.append(record["id"])
+                yield record
+
+        chunks = iter_ndjson(records())
+        next(chunks)
+        assert consumed == [0]
+        assert len(list(chunks)) == 4
+
+    def test_window(self):
+        """Test offset and limit over an iterator"""
+        assert list(window(iter(range(10)), 2, 3)) == [2, 3, 4]
+        assert list(window(iter(range(5)), None, None)) == [0, 1, 2, 3, 4]
+        assert list(window(iter(range(5)), 3, None)) == [3, 4]
+
+    def test_streaming_list_response(self):
+        """Test the media type of each format"""
+        assert streaming_list_response([], "ndjson").media_type == "application/x-ndjson"
+        assert streaming_list_response([], "json").media_type == "application/json"
+        with pytest.raises(ValueError):
+            streaming_list_response([], "xml")
@@ -1,5 +1,5 @@
 # utils/error_utils.py
-from typing import Dict, Any, Optional, List, Type
+from typing import Dict, Any, Optional, List, Type, Iterable
 from fastapi import HTTPException, status
 from fastapi.responses import JSONResponse, RedirectResponse
 from fastapi.requests import Request
@@ -154,6 +154,39 @@ def create_error_response(error: AppError) -> JSONResponse:
         }
     )
 
+def fail_result(result: Dict[str, Any], error_code: str, message: str, details: Dict[str, Any]) -> None:
+    """
+    Mark one entry of a bulk or batch operation's results as failed.
+    
+    The error is shaped like an API error response, so clients handle
+    per-entry failures the same way as whole-request ones.
+    
+    Args:
+        result: The entry's result dictionary, updated in place
+        error_code: Error code, e.g. "validation_error"
+        message: Error message
+        details: Error details
+    """
+    result["status"] = "failed"
+    result["error"] = {"error_code": error_code, "message": message, "details": details}
+
+def count_results(results: Iterable[Dict[str, Any]], statuses: Iterable[str]) -> Dict[str, int]:
+    """
+    Count the results of a bulk or batch operation by status.
+    
+    Args:
+        results: Result dictionaries with a "status" entry
+        statuses: Statuses to count, each reported even if no result has it
+        
+    Returns:
+        Dictionary of status to number of results
+    """
+    totals = {status: 0 for status in statuses}
+    for result in results:
+        if result["status"] in totals:
+            totals[result["status"]] += 1
+    return totals
+
 # Global exception handler function to be registered in main.py
 async def app_exception_handler(request: Request, exc: AppError) -> JSONResponse:
     """
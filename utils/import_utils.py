@@ -0,0 +1,213 @@
+# utils/import_utils.py
+"""
+Incremental readers for imports.
+
+An import body can be far larger than memory, so it is never read as a
+whole: byte chunks (from a request body stream or a file) are decoded and
+split into lines as they arrive, and every line is handed on as soon as it
+is complete. The line readers keep at most one partial line; NdjsonReader
+and CsvReader turn lines into records one at a time.
+"""
+
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+class ImportParseError(ValueError):
+    """
+    A line of an import body could not be parsed.
+
+    For CSV, record holds the cells of the failed row that could still be
+    matched to the header, so the row's document can be told.
+    """
+    def __init__(self, line_number: int, message: str, record: Optional[Dict[str, Any]] = None):
+        super().__init__(f"Line {line_number}: {message}")
+        self.line_number = line_number
+        self.message = message
+        self.record = record or {}
+
+class _LineSplitter:
+    """Decodes UTF-8 byte chunks and splits them into lines"""
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._partial = ""
+
+    def feed(self, chunk: bytes) -> List[str]:
+        """Decode a chunk and return the lines it completes"""
+        lines = (self._partial + self._decoder.decode(chunk)).split("\n")
+        self._partial = lines.pop()
+        return lines
+
+    def close(self) -> List[str]:
+        """Return the last line, if the body didn't end with a newline"""
+        rest = self._partial + self._decoder.decode(b"", final=True)
+        self._partial = ""
+        return [rest] if rest else []
+
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """
+    Split a stream of UTF-8 byte chunks into lines.
+
+    Args:
+        chunks: Byte chunks, e.g. a binary file read in blocks
+
+    Yields:
+        Each line without its line terminator
+    """
+    splitter = _LineSplitter()
+    for chunk in chunks:
+        yield from splitter.feed(chunk)
+    yield from splitter.close()
+
+async def aiter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """
+    Split an asynchronous stream of UTF-8 byte chunks into lines.
+
+    Args:
+        chunks: Byte chunks, e.g. request.stream()
+
+    Yields:
+        Each line without its line terminator
+    """
+    splitter = _LineSplitter()
+    async for chunk in chunks:
+        for line in splitter.feed(chunk):
+            yield line
+    for line in splitter.close():
+        yield line
+
+class NdjsonReader:
+    """
+    Parses newline-delimited JSON, one object per line.
+
+    Blank lines are skipped.
+    """
+    def __init__(self):
+        self.line_number = 0
+
+    def feed(self, line: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Parse one line.
+
+        Args:
+            line: Line of the body
+
+        Yields:
+            (line number, record) for a line holding an object
+
+        Raises:
+            ImportParseError: If the line isn't a JSON object
+        """
+        self.line_number += 1
+        line = line.strip()
+        if not line:
+            return
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ImportParseError(self.line_number, f"invalid JSON: {e.msg}")
+        if not isinstance(record, dict):
+            raise ImportParseError(self.line_number, "expected a JSON object")
+        yield self.line_number, record
+
+    def close(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Finish parsing; NDJSON has nothing left over"""
+        return iter(())
+
+class CsvReader:
+    """
+    Parses CSV with a header row into dictionaries.
+
+    Quoted fields may contain line breaks, so physical lines are collected
+    until their quotes balance before a row is parsed. Empty cells are left
+    out of the records, so models fall back to their defaults.
+    """
+    def __init__(self):
+        self.line_number = 0
+        self.header: Optional[List[str]] = None
+        self._pending: List[str] = []
+        self._quotes = 0
+        self._start = 0
+
+    def feed(self, line: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Parse one physical line.
+
+        Args:
+            line: Line of the body
+
+        Yields:
+            (line number of the row's first line, record) once a row is complete
+
+        Raises:
+            ImportParseError: If a row has more cells than the header
+        """
+        self.line_number += 1
+        if not self._pending:
+            self._start = self.line_number
+        self._pending.append(line.rstrip("\r"))
+        # Escaped quotes ("") come in pairs, so an odd count means an open field
+        self._quotes += line.count('"')
+        if self._quotes % 2:
+            return
+        text = "\n".join(self._pending)
+        self._pending = []
+        self._quotes = 0
+        yield from self._row(text)
+
+    def close(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Finish parsing.
+
+        Raises:
+            ImportParseError: If the body ended inside a quoted field
+        """
+        if self._pending:
+            text = "\n".join(self._pending)
+            self._pending = []
+            raise ImportParseError(self._start, "unterminated quoted field", self._partial_record(text))
+        return iter(())
+
+    def _row(self, text: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Parse a complete row; the first one is the header"""
+        if not text.strip():
+            return
+        cells = next(csv.reader([text]))
+        if self.header is None:
+            self.header = [cell.strip() for cell in cells]
+            return
+        if len(cells) > len(self.header):
+            raise ImportParseError(self._start, f"expected {len(self.header)} cells, got {len(cells)}",
+                                   self._record(cells))
+        yield self._start, self._record(cells)
+
+    def _record(self, cells: List[str]) -> Dict[str, Any]:
+        """Match cells to the header, leaving out empty ones"""
+        return {name: cell for name, cell in zip(self.header or [], cells) if cell != ""}
+
+    def _partial_record(self, text: str) -> Dict[str, Any]:
+        """Match what can be read of a malformed row to the header"""
+        try:
+            return self._record(next(csv.reader([text]), []))
+        except csv.Error:
+            return {}
+
+def create_reader(import_format: str):
+    """
+    Create a record reader for an import format.
+
+    Args:
+        import_format: "ndjson" or "csv"
+
+    Returns:
+        NdjsonReader or CsvReader
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if import_format == "ndjson":
+        return NdjsonReader()
+    if import_format == "csv":
+        return CsvReader()
+    raise ValueError(f"Unknown import format: {import_format}")
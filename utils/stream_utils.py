@@ -0,0 +1,163 @@
+# utils/stream_utils.py
+"""
+Streaming encoders for list responses and exports.
+
+The encoders turn an iterator of JSON-ready dictionaries into the chunks
+of a response body, one record at a time, so a listing is never held in
+memory as a whole, neither as models nor as dictionaries nor as one
+serialized string. Records are buffered into chunks of about
+STREAM_CHUNK_SIZE bytes to keep the number of writes down.
+"""
+
+import csv
+import io
+import json
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence
+
+from fastapi.responses import StreamingResponse
+
+# Approximate size of the chunks written to the response body
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Media types of the streaming formats
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+JSON_MEDIA_TYPE = "application/json"
+CSV_MEDIA_TYPE = "text/csv"
+
+def iter_ndjson(records: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Encode records as newline-delimited JSON, one record per line.
+
+    Args:
+        records: JSON-ready dictionaries
+
+    Yields:
+        Chunks of the encoded body
+    """
+    return _chunked(json.dumps(record) + "\n" for record in records)
+
+def iter_json_array(records: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Encode records as one JSON array, written element by element.
+
+    Args:
+        records: JSON-ready dictionaries
+
+    Yields:
+        Chunks of the encoded body
+    """
+    def parts():
+        separator = "["
+        for record in records:
+            yield separator + json.dumps(record)
+            separator = ","
+        # An empty listing never wrote the opening bracket
+        yield "[]" if separator == "[" else "]"
+
+    return _chunked(parts())
+
+def iter_csv(rows: Iterable[Dict[str, Any]], columns: Sequence[str]) -> Iterator[bytes]:
+    """
+    Encode rows as CSV with a header row.
+
+    Cells are written as strings: None as an empty cell, booleans as
+    true/false, and lists and dictionaries as JSON.
+
+    Args:
+        rows: JSON-ready dictionaries; keys outside columns are ignored
+        columns: Column names, in order
+
+    Yields:
+        Chunks of the encoded body
+    """
+    def lines():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(columns)
+        yield buffer.getvalue()
+        for row in rows:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow([_csv_cell(row.get(column)) for column in columns])
+            yield buffer.getvalue()
+
+    return _chunked(lines())
+
+def streaming_csv_response(rows: Iterable[Dict[str, Any]], columns: Sequence[str],
+                           headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """
+    Create a response streaming rows as CSV.
+
+    Args:
+        rows: JSON-ready dictionaries, typically a generator over a
+              data-layer iterator
+        columns: Column names, in order
+        headers: Optional extra response headers
+
+    Returns:
+        Streaming response
+    """
+    return StreamingResponse(iter_csv(rows, columns), media_type=CSV_MEDIA_TYPE, headers=headers)
+
+def streaming_list_response(records: Iterable[Dict[str, Any]], stream_format: str,
+                            headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """
+    Create a response streaming records as NDJSON or as a JSON array.
+
+    Args:
+        records: JSON-ready dictionaries, typically a generator over a
+                 data-layer iterator
+        stream_format: "ndjson" or "json"
+        headers: Optional extra response headers
+
+    Returns:
+        Streaming response
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if stream_format == "ndjson":
+        return StreamingResponse(iter_ndjson(records), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+    if stream_format == "json":
+        return StreamingResponse(iter_json_array(records), media_type=JSON_MEDIA_TYPE, headers=headers)
+    raise ValueError(f"Unknown stream format: {stream_format}")
+
+def window(records: Iterable[Any], offset: Optional[int], limit: Optional[int]) -> Iterator[Any]:
+    """
+    Apply offset and limit to a streamed listing without materializing it.
+
+    Args:
+        records: Listing to select from
+        offset: Optional number of entries to skip
+        limit: Optional maximum number of entries
+
+    Returns:
+        Iterator over the selected entries
+    """
+    start = offset or 0
+    return islice(records, start, None if limit is None else start + limit)
+
+def _csv_cell(value: Any) -> Any:
+    """Convert a JSON-ready value to a CSV cell"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+def _chunked(parts: Iterable[str]) -> Iterator[bytes]:
+    """Join encoded parts into chunks of about STREAM_CHUNK_SIZE bytes"""
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= STREAM_CHUNK_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")